@@ -0,0 +1,117 @@
+import secrets
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header
+
+from app.core.admission import admission
+from app.core.config import settings
+from app.core.secrets import secret_cache
+from app.core.startup import startup_report
+from app.database.database import get_async_replica_set, get_replica_set
+from app.database.pool import pool_stats
+from app.exceptions.app_exceptions import Unauthorized
+from app.schemas.common import APIResponse
+from app.services.user_cache import user_cache
+from app.services.user_changes import change_feed
+from app.services.user_stats import stats_folder
+
+
+def require_internal_token(authorization: Optional[str] = Header(None)):
+    scheme, _, token = (authorization or "").partition(" ")
+    if not (
+        settings.internal_token
+        and scheme.lower() == "bearer"
+        and secrets.compare_digest(
+            token.encode("utf-8"), settings.internal_token.encode("utf-8")
+        )
+    ):
+        raise Unauthorized()
+
+
+router = APIRouter(dependencies=[Depends(require_internal_token)])
+
+
+@router.get("/pool", response_model=APIResponse)
+def read_pool_stats():
+    return APIResponse(
+        status="success",
+        data={name: stats.snapshot() for name, stats in pool_stats.items()},
+        message="Connection pool statistics.",
+        response_time=datetime.now(),
+    )
+
+
+@router.get("/cache", response_model=APIResponse)
+def read_cache_stats():
+    return APIResponse(
+        status="success",
+        data={"users": user_cache.snapshot()},
+        message="Cache statistics.",
+        response_time=datetime.now(),
+    )
+
+
+@router.get("/admission", response_model=APIResponse)
+def read_admission_stats():
+    return APIResponse(
+        status="success",
+        data=admission.snapshot(),
+        message="Admission control statistics.",
+        response_time=datetime.now(),
+    )
+
+
+@router.get("/changes", response_model=APIResponse)
+def read_change_feed_stats():
+    return APIResponse(
+        status="success",
+        data=change_feed.snapshot(),
+        message="Change feed statistics.",
+        response_time=datetime.now(),
+    )
+
+
+@router.get("/stats", response_model=APIResponse)
+def read_stats_folder():
+    return APIResponse(
+        status="success",
+        data=stats_folder.snapshot(),
+        message="User stats journal folding.",
+        response_time=datetime.now(),
+    )
+
+
+@router.get("/replicas", response_model=APIResponse)
+def read_replica_stats():
+    replica_set = (
+        get_async_replica_set() if settings.database_async else get_replica_set()
+    )
+    return APIResponse(
+        status="success",
+        data=replica_set.snapshot(),
+        message="Read replica statistics.",
+        response_time=datetime.now(),
+    )
+
+
+@router.get("/startup", response_model=APIResponse)
+def read_startup_report():
+    return APIResponse(
+        status="success",
+        data=startup_report.phases,
+        message="Startup phase durations in milliseconds.",
+        response_time=datetime.now(),
+    )
+
+
+@router.post("/secrets/refresh", response_model=APIResponse)
+def refresh_secrets():
+    # New connections read the secret again; open ones are left alone
+    secret_cache.refresh()
+    return APIResponse(
+        status="success",
+        data=None,
+        message="Secret cache cleared.",
+        response_time=datetime.now(),
+    )
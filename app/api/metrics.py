@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from app.api.internal import require_internal_token
+from app.core.admission import admission
+from app.core.config import settings
+from app.core.metrics import metric_lines, metrics
+from app.database.pool import pool_stats
+from app.services.user_batching import create_batcher
+
+# Pool, query and route details are as internal as the /internal routes
+router = APIRouter(dependencies=[Depends(require_internal_token)])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+POOL_METRICS = (
+    ("checked_out", "gauge", "Connections currently checked out."),
+    ("overflow", "gauge", "Connections open beyond pool_size."),
+    ("checkouts", "counter", "Connection checkouts."),
+    ("timeouts", "counter", "Checkouts that timed out waiting."),
+    ("slow_checkouts", "counter", "Checkouts slower than the threshold."),
+)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def read_metrics():
+    lines = metrics.render()
+    snapshots = {name: stats.snapshot() for name, stats in pool_stats.items()}
+    for key, kind, help_text in POOL_METRICS:
+        suffix = "_total" if kind == "counter" else ""
+        lines += metric_lines(
+            f"db_pool_{key}{suffix}",
+            kind,
+            help_text,
+            [
+                (f'pool="{name}"', snapshot[key])
+                for name, snapshot in snapshots.items()
+                if key in snapshot
+            ],
+        )
+    lines += admission.metric_lines()
+    if settings.create_batching:
+        lines += create_batcher.metric_lines()
+    return PlainTextResponse(
+        "\n".join(lines) + "\n", media_type=PROMETHEUS_CONTENT_TYPE
+    )
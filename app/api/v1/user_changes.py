@@ -0,0 +1,58 @@
+from typing import Optional
+
+from fastapi import APIRouter, Header, Query, Request
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.core.responses import api_response
+from app.schemas.common import APIResponse
+from app.services.user_changes import change_feed, iter_changes
+
+# Shared by the sync and async APIs: the feed never touches the database
+router = APIRouter()
+
+
+@router.get("/changes", response_model=APIResponse)
+async def read_changes(
+    request: Request,
+    after: Optional[str] = Query(
+        None, description="Event id to resume after (or Last-Event-ID)"
+    ),
+    wait: float = Query(
+        settings.change_feed_poll_timeout,
+        ge=0,
+        le=settings.change_feed_poll_timeout,
+    ),
+    last_event_id: Optional[str] = Header(None),
+):
+    """Server-Sent Events with ``Accept: text/event-stream``, otherwise a
+    long-poll returning as soon as there are changes after ``after``."""
+    resume_from = after or last_event_id
+    if "text/event-stream" in request.headers.get("accept", ""):
+        return StreamingResponse(
+            iter_changes(change_feed, resume_from),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    position = change_feed.parse_event_id(resume_from)
+    events = None
+    if position is not None or not resume_from:
+        if position is None:
+            position = change_feed.last_position
+        events = await change_feed.wait(position, wait)
+    reset = events is None
+    if reset:
+        events, position = [], change_feed.last_position
+    elif events:
+        position = events[-1].position
+    return api_response(
+        {
+            "events": [
+                change.as_dict(change_feed.epoch) for change in events
+            ],
+            "last_event_id": change_feed.event_id(position),
+            "reset": reset,
+        },
+        f"{len(events)} changes.",
+    )
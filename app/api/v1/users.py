@@ -1,92 +1,453 @@
+import json
 from datetime import datetime
+from typing import Any, AsyncIterator, List, Optional, Tuple
 
-from fastapi import APIRouter, Depends, Query, status
+from fastapi import APIRouter, Depends, Query, Request, status
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session
+from starlette.concurrency import run_in_threadpool
 
-from app.database.database import get_session
-from app.schemas.common import APIResponse, PaginatedResponse
-from app.schemas.users import UserCreate, UserUpdate
+from app.core.admission import BULK, CREATE, LIST, LOOKUP, WRITE, admit
+from app.core.conditional import (
+    is_conditional,
+    not_modified,
+    not_modified_response,
+    page_etag,
+    payload_etag,
+    user_etag,
+    validator_headers,
+)
+from app.core.config import settings
+from app.core.responses import (
+    api_response,
+    paginated_response,
+    user_payload,
+    users_by_id_payload,
+    users_payload,
+)
+from app.database.database import (
+    get_read_engine,
+    get_read_session,
+    get_session,
+)
+from app.database.replicas import remember_write
+from app.exceptions.user_exceptions import InvalidBulkPayload, TooManyIds
+from app.models.user import RoleEnum
+from app.schemas.common import (
+    APIResponse,
+    PaginatedResponse,
+    PaginationMode,
+    TotalMode,
+)
+from app.schemas.users import (
+    BulkUserResult,
+    ExportFormat,
+    UserBatchGet,
+    UserBulkDelete,
+    UserBulkUpdate,
+    UserCreate,
+    UserFilter,
+    UserSortField,
+    UserUpdate,
+)
+from app.services.user_batching import create_user_batched
+from app.services.user_bulk import (
+    create_users_bulk,
+    delete_users_bulk,
+    update_users_bulk,
+    validate_bulk_row,
+)
+from app.services.user_count import count_users
+from app.services.user_export import (
+    MEDIA_TYPES,
+    export_statement,
+    gzip_chunks,
+    iter_export,
+)
+from app.services.user_fields import parse_fields
+from app.services.user_stats import get_user_stats
 from app.services.users import (
     create_user,
     delete_user,
     get_user_by_id,
-    get_users_paginated,
+    get_user_version,
+    get_users_by_cursor,
+    get_users_by_ids,
+    get_users_page,
     update_user,
 )
 
 router = APIRouter()
 
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/jsonl")
+
+BULK_REQUEST_BODY = {
+    "required": True,
+    "content": {
+        "application/json": {
+            "schema": {
+                "type": "array",
+                "items": {"$ref": "#/components/schemas/UserCreate"},
+            }
+        },
+        "application/x-ndjson": {
+            "schema": {"$ref": "#/components/schemas/UserCreate"}
+        },
+    },
+}
+
+
+async def iter_bulk_rows(request: Request) -> AsyncIterator[Tuple[int, Any]]:
+    content_type = request.headers.get("content-type", "")
+    if not content_type.startswith(NDJSON_MEDIA_TYPES):
+        try:
+            rows = await request.json()
+        except json.JSONDecodeError:
+            raise InvalidBulkPayload("Body must be a JSON array of users.")
+        if not isinstance(rows, list):
+            raise InvalidBulkPayload("Body must be a JSON array of users.")
+        for index, raw in enumerate(rows):
+            yield index, raw
+        return
+
+    # NDJSON is parsed as it arrives so large imports never sit in memory
+    index = 0
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield index, parse_ndjson_line(index, line)
+                index += 1
+    if buffer.strip():
+        yield index, parse_ndjson_line(index, buffer)
+
+
+def user_filters(
+    role: Optional[RoleEnum] = Query(None),
+    active: Optional[bool] = Query(None),
+    created_from: Optional[datetime] = Query(None),
+    created_to: Optional[datetime] = Query(None),
+    updated_from: Optional[datetime] = Query(None),
+    updated_to: Optional[datetime] = Query(None),
+    username_prefix: Optional[str] = Query(None, min_length=1),
+    email_prefix: Optional[str] = Query(None, min_length=1),
+) -> UserFilter:
+    return UserFilter(
+        role=role,
+        active=active,
+        created_from=created_from,
+        created_to=created_to,
+        updated_from=updated_from,
+        updated_to=updated_to,
+        username_prefix=username_prefix,
+        email_prefix=email_prefix,
+    )
+
+
+def user_fields(
+    fields: Optional[str] = Query(
+        None,
+        description="Comma-separated UserRead fields to return, "
+        "e.g. id,username,role",
+    ),
+) -> Optional[Tuple[str, ...]]:
+    return parse_fields(fields)
+
+
+def parse_ndjson_line(index: int, line: bytes) -> Any:
+    try:
+        return json.loads(line)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return BulkUserResult(
+            index=index,
+            status="error",
+            error="InvalidJSON",
+            message="Line is not valid JSON.",
+        )
+
 
 @router.post(
     "/",
     response_model=APIResponse,
     status_code=status.HTTP_201_CREATED,
+    dependencies=[admit(CREATE)],
 )
 def create_user_endpoint(
     user_create: UserCreate, session: Session = Depends(get_session)
 ):
-    user = create_user(user_create, session)
-    return APIResponse(
-        status="success",
-        data=user.model_dump(),
-        message="User created successfully.",
-        response_time=datetime.now(),
+    if settings.create_batching:
+        user = create_user_batched(user_create)
+    else:
+        user = create_user(user_create, session)
+    response = api_response(
+        user_payload(user),
+        "User created successfully.",
+        status_code=status.HTTP_201_CREATED,
+    )
+    return remember_write(response)
+
+
+@router.post(
+    "/bulk",
+    response_model=APIResponse,
+    openapi_extra={"requestBody": BULK_REQUEST_BODY},
+    dependencies=[admit(BULK)],
+)
+async def create_users_bulk_endpoint(
+    request: Request,
+    chunk_size: int = Query(
+        settings.bulk_create_chunk_size,
+        ge=1,
+        le=settings.bulk_create_max_chunk_size,
+    ),
+    session: Session = Depends(get_session),
+):
+    results: List[BulkUserResult] = []
+    chunk: List[Tuple[int, UserCreate]] = []
+
+    async for index, raw in iter_bulk_rows(request):
+        row = (
+            raw
+            if isinstance(raw, BulkUserResult)
+            else validate_bulk_row(index, raw)
+        )
+        if isinstance(row, BulkUserResult):
+            results.append(row)
+            continue
+        chunk.append((index, row))
+        if len(chunk) >= chunk_size:
+            results.extend(
+                await run_in_threadpool(create_users_bulk, chunk, session)
+            )
+            chunk = []
+    if chunk:
+        results.extend(
+            await run_in_threadpool(create_users_bulk, chunk, session)
+        )
+
+    results.sort(key=lambda result: result.index)
+    created = sum(result.status == "created" for result in results)
+    response = api_response(
+        {
+            "created": created,
+            "failed": len(results) - created,
+            "results": [result.model_dump() for result in results],
+        },
+        f"{created} of {len(results)} users created.",
+    )
+    return remember_write(response)
+
+
+@router.patch(
+    "/bulk", response_model=APIResponse, dependencies=[admit(BULK)]
+)
+def update_users_bulk_endpoint(
+    bulk_update: UserBulkUpdate,
+    chunk_size: int = Query(
+        settings.bulk_write_chunk_size,
+        ge=1,
+        le=settings.bulk_create_max_chunk_size,
+    ),
+    session: Session = Depends(get_session),
+):
+    result = update_users_bulk(bulk_update, session, chunk_size)
+    response = api_response(
+        result.model_dump(), f"{result.affected} users updated."
     )
+    return remember_write(response)
 
 
-@router.get("/{user_id}", response_model=APIResponse)
-def read_user(user_id: int, session: Session = Depends(get_session)):
-    user = get_user_by_id(user_id, session)
-    return APIResponse(
-        status="success",
-        data=user.model_dump(),
-        message="User fetched successfully.",
-        response_time=datetime.now(),
+@router.post(
+    "/bulk/delete",
+    response_model=APIResponse,
+    dependencies=[admit(BULK)],
+)
+def delete_users_bulk_endpoint(
+    bulk_delete: UserBulkDelete,
+    chunk_size: int = Query(
+        settings.bulk_write_chunk_size,
+        ge=1,
+        le=settings.bulk_create_max_chunk_size,
+    ),
+    session: Session = Depends(get_session),
+):
+    result = delete_users_bulk(bulk_delete, session, chunk_size)
+    action = "deactivated" if bulk_delete.soft else "deleted"
+    response = api_response(
+        result.model_dump(), f"{result.affected} users {action}."
+    )
+    return remember_write(response)
+
+
+@router.get("/export", dependencies=[admit(BULK)])
+def export_users(
+    request: Request,
+    format: ExportFormat = Query(ExportFormat.ndjson),
+    role: Optional[RoleEnum] = Query(None),
+    active: Optional[bool] = Query(None),
+    since: Optional[datetime] = Query(None),
+):
+    # The stream opens its own connection: it outlives the request scope
+    statement = export_statement(role, active, since)
+    chunks = iter_export(get_read_engine(), statement, format)
+    headers = {
+        "Content-Disposition": f'attachment; filename="users.{format.value}"',
+        "Vary": "Accept-Encoding",
+    }
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        chunks = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        chunks, media_type=MEDIA_TYPES[format], headers=headers
     )
 
 
-@router.get("/", response_model=PaginatedResponse)
+@router.post(
+    "/batch-get", response_model=APIResponse, dependencies=[admit(LOOKUP)]
+)
+def batch_get_users(
+    batch: UserBatchGet,
+    session: Session = Depends(get_read_session),
+):
+    if len(batch.ids) > settings.batch_get_max_ids:
+        raise TooManyIds(settings.batch_get_max_ids)
+    users = get_users_by_ids(batch.ids, session)
+    found = sum(user is not None for user in users.values())
+    return api_response(
+        users_by_id_payload(users),
+        f"{found} of {len(users)} users found.",
+    )
+
+
+@router.get(
+    "/stats", response_model=APIResponse, dependencies=[admit(LOOKUP)]
+)
+def read_user_stats(
+    request: Request,
+    days: int = Query(settings.user_stats_days, ge=1, le=366),
+    session: Session = Depends(get_read_session),
+):
+    # Counters kept up to date by the writes: no scan of the user table
+    data = get_user_stats(session, days).model_dump()
+    etag = payload_etag(data)
+    if not_modified(request, etag):
+        return not_modified_response(etag)
+    return api_response(
+        data, "User statistics fetched successfully.", headers={"ETag": etag}
+    )
+
+
+@router.get(
+    "/{user_id}", response_model=APIResponse, dependencies=[admit(LOOKUP)]
+)
+def read_user(
+    user_id: int,
+    request: Request,
+    fields: Optional[Tuple[str, ...]] = Depends(user_fields),
+    session: Session = Depends(get_read_session),
+):
+    # Revalidation only needs (id, updated_at), not the full row
+    if is_conditional(request):
+        _, updated_at = get_user_version(user_id, session)
+        etag = user_etag(user_id, updated_at)
+        if not_modified(request, etag, updated_at):
+            return not_modified_response(etag, updated_at)
+
+    user = get_user_by_id(user_id, session, fields)
+    etag = user_etag(user.id, user.updated_at)
+    return api_response(
+        user_payload(user, fields),
+        "User fetched successfully.",
+        headers=validator_headers(etag, user.updated_at),
+    )
+
+
+@router.get(
+    "/", response_model=PaginatedResponse, dependencies=[admit(LIST)]
+)
 def list_users(
+    request: Request,
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1),
-    session: Session = Depends(get_session),
+    pagination: PaginationMode = Query(PaginationMode.offset),
+    cursor: Optional[str] = Query(None),
+    sort: UserSortField = Query(UserSortField.id),
+    include_total: bool = Query(True),
+    total_mode: TotalMode = Query(TotalMode.exact),
+    filters: UserFilter = Depends(user_filters),
+    fields: Optional[Tuple[str, ...]] = Depends(user_fields),
+    session: Session = Depends(get_read_session),
 ):
-    users, total = get_users_paginated(session, page, limit)
-    return PaginatedResponse(
-        status="success",
-        data=[user.model_dump() for user in users],
+    next_cursor = prev_cursor = None
+    if cursor or pagination == PaginationMode.cursor:
+        users, next_cursor, prev_cursor = get_users_by_cursor(
+            session, limit, cursor, sort, filters, fields
+        )
+        page = None
+    else:
+        users = get_users_page(
+            session, page, limit, sort, filters, fields
+        )
+
+    total = total_exact = None
+    if include_total:
+        total, total_exact = count_users(
+            session, total_mode, filters
+        )
+
+    if fields is None:
+        etag = page_etag(
+            ((user.id, user.updated_at) for user in users),
+            total,
+            next_cursor,
+            prev_cursor,
+        )
+    else:
+        # Sparse rows may lack updated_at: validate what is returned
+        data = users_payload(users, fields)
+        etag = payload_etag(data, total, next_cursor, prev_cursor)
+    if not_modified(request, etag):
+        return not_modified_response(etag)
+    if fields is None:
+        data = users_payload(users)
+
+    return paginated_response(
+        data,
         total=total,
+        total_exact=total_exact,
         page=page,
         limit=limit,
+        next_cursor=next_cursor,
+        prev_cursor=prev_cursor,
         message="Users fetched successfully.",
-        response_time=datetime.now(),
+        headers={"ETag": etag},
     )
 
 
-@router.put("/{user_id}", response_model=APIResponse)
+@router.put(
+    "/{user_id}", response_model=APIResponse, dependencies=[admit(WRITE)]
+)
 def update_user_fields(
     user_id: int,
     update_data: UserUpdate,
     session: Session = Depends(get_session),
 ):
     user = update_user(user_id, update_data, session)
-    return APIResponse(
-        status="success",
-        data=user.model_dump(),
-        message="User updated successfully.",
-        response_time=datetime.now(),
-    )
+    response = api_response(user_payload(user), "User updated successfully.")
+    return remember_write(response)
 
 
-@router.delete("/{user_id}", response_model=APIResponse)
+@router.delete(
+    "/{user_id}", response_model=APIResponse, dependencies=[admit(WRITE)]
+)
 def delete_user_endpoint(
     user_id: int, session: Session = Depends(get_session)
 ):
     delete_user(user_id, session)
 
-    return APIResponse(
-        status="success",
-        data=None,
-        message=f"User with ID {user_id} deleted successfully.",
-        response_time=datetime.now(),
+    response = api_response(
+        None, f"User with ID {user_id} deleted successfully."
     )
+    return remember_write(response)
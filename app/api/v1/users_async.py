@@ -0,0 +1,361 @@
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.api.v1.users import (
+    BULK_REQUEST_BODY,
+    iter_bulk_rows,
+    user_fields,
+    user_filters,
+)
+from app.core.admission import BULK, CREATE, LIST, LOOKUP, WRITE, admit
+from app.core.conditional import (
+    is_conditional,
+    not_modified,
+    not_modified_response,
+    page_etag,
+    payload_etag,
+    user_etag,
+    validator_headers,
+)
+from app.core.config import settings
+from app.core.responses import (
+    api_response,
+    paginated_response,
+    user_payload,
+    users_by_id_payload,
+    users_payload,
+)
+from app.database.database import (
+    get_async_read_engine,
+    get_async_read_session,
+    get_async_session,
+)
+from app.database.replicas import remember_write
+from app.exceptions.user_exceptions import TooManyIds
+from app.models.user import RoleEnum
+from app.schemas.common import (
+    APIResponse,
+    PaginatedResponse,
+    PaginationMode,
+    TotalMode,
+)
+from app.schemas.users import (
+    BulkUserResult,
+    ExportFormat,
+    UserBatchGet,
+    UserBulkDelete,
+    UserBulkUpdate,
+    UserCreate,
+    UserFilter,
+    UserSortField,
+    UserUpdate,
+)
+from app.services.user_batching import acreate_user_batched
+from app.services.user_bulk import validate_bulk_row
+from app.services.user_export import (
+    MEDIA_TYPES,
+    agzip_chunks,
+    aiter_export,
+    export_statement,
+)
+from app.services.users_async import (
+    count_users,
+    create_user,
+    create_users_bulk,
+    delete_user,
+    delete_users_bulk,
+    get_user_by_id,
+    get_user_stats,
+    get_user_version,
+    get_users_by_cursor,
+    get_users_by_ids,
+    get_users_page,
+    update_user,
+    update_users_bulk,
+)
+
+router = APIRouter()
+
+
+@router.post(
+    "/",
+    response_model=APIResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[admit(CREATE)],
+)
+async def create_user_endpoint(
+    user_create: UserCreate,
+    session: AsyncSession = Depends(get_async_session),
+):
+    if settings.create_batching:
+        user = await acreate_user_batched(user_create)
+    else:
+        user = await create_user(user_create, session)
+    response = api_response(
+        user_payload(user),
+        "User created successfully.",
+        status_code=status.HTTP_201_CREATED,
+    )
+    return remember_write(response)
+
+
+@router.post(
+    "/bulk",
+    response_model=APIResponse,
+    openapi_extra={"requestBody": BULK_REQUEST_BODY},
+    dependencies=[admit(BULK)],
+)
+async def create_users_bulk_endpoint(
+    request: Request,
+    chunk_size: int = Query(
+        settings.bulk_create_chunk_size,
+        ge=1,
+        le=settings.bulk_create_max_chunk_size,
+    ),
+    session: AsyncSession = Depends(get_async_session),
+):
+    results: List[BulkUserResult] = []
+    chunk: List[Tuple[int, UserCreate]] = []
+
+    async for index, raw in iter_bulk_rows(request):
+        row = (
+            raw
+            if isinstance(raw, BulkUserResult)
+            else validate_bulk_row(index, raw)
+        )
+        if isinstance(row, BulkUserResult):
+            results.append(row)
+            continue
+        chunk.append((index, row))
+        if len(chunk) >= chunk_size:
+            results.extend(await create_users_bulk(chunk, session))
+            chunk = []
+    if chunk:
+        results.extend(await create_users_bulk(chunk, session))
+
+    results.sort(key=lambda result: result.index)
+    created = sum(result.status == "created" for result in results)
+    response = api_response(
+        {
+            "created": created,
+            "failed": len(results) - created,
+            "results": [result.model_dump() for result in results],
+        },
+        f"{created} of {len(results)} users created.",
+    )
+    return remember_write(response)
+
+
+@router.patch(
+    "/bulk", response_model=APIResponse, dependencies=[admit(BULK)]
+)
+async def update_users_bulk_endpoint(
+    bulk_update: UserBulkUpdate,
+    chunk_size: int = Query(
+        settings.bulk_write_chunk_size,
+        ge=1,
+        le=settings.bulk_create_max_chunk_size,
+    ),
+    session: AsyncSession = Depends(get_async_session),
+):
+    result = await update_users_bulk(bulk_update, session, chunk_size)
+    response = api_response(
+        result.model_dump(), f"{result.affected} users updated."
+    )
+    return remember_write(response)
+
+
+@router.post(
+    "/bulk/delete",
+    response_model=APIResponse,
+    dependencies=[admit(BULK)],
+)
+async def delete_users_bulk_endpoint(
+    bulk_delete: UserBulkDelete,
+    chunk_size: int = Query(
+        settings.bulk_write_chunk_size,
+        ge=1,
+        le=settings.bulk_create_max_chunk_size,
+    ),
+    session: AsyncSession = Depends(get_async_session),
+):
+    result = await delete_users_bulk(bulk_delete, session, chunk_size)
+    action = "deactivated" if bulk_delete.soft else "deleted"
+    response = api_response(
+        result.model_dump(), f"{result.affected} users {action}."
+    )
+    return remember_write(response)
+
+
+@router.get("/export", dependencies=[admit(BULK)])
+async def export_users(
+    request: Request,
+    format: ExportFormat = Query(ExportFormat.ndjson),
+    role: Optional[RoleEnum] = Query(None),
+    active: Optional[bool] = Query(None),
+    since: Optional[datetime] = Query(None),
+):
+    statement = export_statement(role, active, since)
+    chunks = aiter_export(get_async_read_engine(), statement, format)
+    headers = {
+        "Content-Disposition": f'attachment; filename="users.{format.value}"',
+        "Vary": "Accept-Encoding",
+    }
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        chunks = agzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        chunks, media_type=MEDIA_TYPES[format], headers=headers
+    )
+
+
+@router.post(
+    "/batch-get", response_model=APIResponse, dependencies=[admit(LOOKUP)]
+)
+async def batch_get_users(
+    batch: UserBatchGet,
+    session: AsyncSession = Depends(get_async_read_session),
+):
+    if len(batch.ids) > settings.batch_get_max_ids:
+        raise TooManyIds(settings.batch_get_max_ids)
+    users = await get_users_by_ids(batch.ids, session)
+    found = sum(user is not None for user in users.values())
+    return api_response(
+        users_by_id_payload(users),
+        f"{found} of {len(users)} users found.",
+    )
+
+
+@router.get(
+    "/stats", response_model=APIResponse, dependencies=[admit(LOOKUP)]
+)
+async def read_user_stats(
+    request: Request,
+    days: int = Query(settings.user_stats_days, ge=1, le=366),
+    session: AsyncSession = Depends(get_async_read_session),
+):
+    # Counters kept up to date by the writes: no scan of the user table
+    data = (await get_user_stats(session, days)).model_dump()
+    etag = payload_etag(data)
+    if not_modified(request, etag):
+        return not_modified_response(etag)
+    return api_response(
+        data, "User statistics fetched successfully.", headers={"ETag": etag}
+    )
+
+
+@router.get(
+    "/{user_id}", response_model=APIResponse, dependencies=[admit(LOOKUP)]
+)
+async def read_user(
+    user_id: int,
+    request: Request,
+    fields: Optional[Tuple[str, ...]] = Depends(user_fields),
+    session: AsyncSession = Depends(get_async_read_session),
+):
+    if is_conditional(request):
+        _, updated_at = await get_user_version(user_id, session)
+        etag = user_etag(user_id, updated_at)
+        if not_modified(request, etag, updated_at):
+            return not_modified_response(etag, updated_at)
+
+    user = await get_user_by_id(user_id, session, fields)
+    etag = user_etag(user.id, user.updated_at)
+    return api_response(
+        user_payload(user, fields),
+        "User fetched successfully.",
+        headers=validator_headers(etag, user.updated_at),
+    )
+
+
+@router.get(
+    "/", response_model=PaginatedResponse, dependencies=[admit(LIST)]
+)
+async def list_users(
+    request: Request,
+    page: int = Query(1, ge=1),
+    limit: int = Query(10, ge=1),
+    pagination: PaginationMode = Query(PaginationMode.offset),
+    cursor: Optional[str] = Query(None),
+    sort: UserSortField = Query(UserSortField.id),
+    include_total: bool = Query(True),
+    total_mode: TotalMode = Query(TotalMode.exact),
+    filters: UserFilter = Depends(user_filters),
+    fields: Optional[Tuple[str, ...]] = Depends(user_fields),
+    session: AsyncSession = Depends(get_async_read_session),
+):
+    next_cursor = prev_cursor = None
+    if cursor or pagination == PaginationMode.cursor:
+        users, next_cursor, prev_cursor = await get_users_by_cursor(
+            session, limit, cursor, sort, filters, fields
+        )
+        page = None
+    else:
+        users = await get_users_page(
+            session, page, limit, sort, filters, fields
+        )
+
+    total = total_exact = None
+    if include_total:
+        total, total_exact = await count_users(
+            session, total_mode, filters
+        )
+
+    if fields is None:
+        etag = page_etag(
+            ((user.id, user.updated_at) for user in users),
+            total,
+            next_cursor,
+            prev_cursor,
+        )
+    else:
+        # Sparse rows may lack updated_at: validate what is returned
+        data = users_payload(users, fields)
+        etag = payload_etag(data, total, next_cursor, prev_cursor)
+    if not_modified(request, etag):
+        return not_modified_response(etag)
+    if fields is None:
+        data = users_payload(users)
+
+    return paginated_response(
+        data,
+        total=total,
+        total_exact=total_exact,
+        page=page,
+        limit=limit,
+        next_cursor=next_cursor,
+        prev_cursor=prev_cursor,
+        message="Users fetched successfully.",
+        headers={"ETag": etag},
+    )
+
+
+@router.put(
+    "/{user_id}", response_model=APIResponse, dependencies=[admit(WRITE)]
+)
+async def update_user_fields(
+    user_id: int,
+    update_data: UserUpdate,
+    session: AsyncSession = Depends(get_async_session),
+):
+    user = await update_user(user_id, update_data, session)
+    response = api_response(user_payload(user), "User updated successfully.")
+    return remember_write(response)
+
+
+@router.delete(
+    "/{user_id}", response_model=APIResponse, dependencies=[admit(WRITE)]
+)
+async def delete_user_endpoint(
+    user_id: int, session: AsyncSession = Depends(get_async_session)
+):
+    await delete_user(user_id, session)
+
+    response = api_response(
+        None, f"User with ID {user_id} deleted successfully."
+    )
+    return remember_write(response)
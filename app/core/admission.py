@@ -0,0 +1,276 @@
+"""Admission control for the database-backed routes.
+
+Every user route belongs to a class with its own concurrency limit and
+a bounded queue, and all classes share a global budget sized to the
+connection pool. A request that cannot start waits in its class queue
+for at most ``ADMISSION_QUEUE_TIMEOUT`` seconds; when the queue is full,
+or the wait runs out, it is shed with a ``503`` and ``Retry-After``
+instead of piling up inside ``get_session`` until the pool times out.
+Freed slots go to the waiting class with the highest priority, so cheap
+lookups keep flowing while lists, exports and bulk jobs back off.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, List
+
+from fastapi import Depends
+
+from app.core.config import settings
+from app.core.logging_config import SAMPLED
+from app.core.metrics import Histogram, metric_lines
+from app.exceptions.app_exceptions import ServiceOverloaded
+
+logger = logging.getLogger(__name__)
+
+# Route classes from highest to lowest priority
+LOOKUP = "lookup"
+WRITE = "write"
+# POST /users: admitted as WRITE unless CREATE_BATCHING is on
+CREATE = "create"
+LIST = "list"
+BULK = "bulk"
+ROUTE_CLASSES = (LOOKUP, WRITE, CREATE, LIST, BULK)
+
+DEFAULT_LIMITS = {LOOKUP: 30, WRITE: 20, CREATE: 20, LIST: 10, BULK: 2}
+DEFAULT_QUEUES = {LOOKUP: 200, WRITE: 100, CREATE: 100, LIST: 20, BULK: 2}
+
+QUEUE_FULL = "queue_full"
+QUEUE_TIMEOUT = "timeout"
+
+
+class RouteClass:
+    """``pooled`` classes hold a connection each and count against the
+    controller's capacity; the others only against their own limit."""
+
+    def __init__(
+        self,
+        name: str,
+        priority: int,
+        limit: int,
+        queue: int,
+        pooled: bool = True,
+    ):
+        self.name = name
+        self.priority = priority
+        self.limit = limit
+        self.queue = queue
+        self.pooled = pooled
+        self.in_flight = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+        self.admitted = 0
+        self.shed: Dict[str, int] = {QUEUE_FULL: 0, QUEUE_TIMEOUT: 0}
+        self.queue_wait = Histogram()
+
+
+class AdmissionController:
+    """Concurrency limits and priority queues, driven from the event
+    loop: every acquire/release runs on it, so no lock is needed."""
+
+    def __init__(
+        self,
+        capacity: int,
+        queue_timeout: float,
+        retry_after: int,
+        classes: List[RouteClass],
+    ):
+        self.capacity = capacity
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.classes = {
+            route_class.name: route_class for route_class in classes
+        }
+        self._by_priority = sorted(classes, key=lambda c: c.priority)
+
+    def _has_room(self, route_class: RouteClass) -> bool:
+        return route_class.in_flight < route_class.limit and (
+            not route_class.pooled or self.in_flight < self.capacity
+        )
+
+    def _admit(self, route_class: RouteClass) -> None:
+        route_class.in_flight += 1
+        route_class.admitted += 1
+        if route_class.pooled:
+            self.in_flight += 1
+
+    def _shed(self, route_class: RouteClass, reason: str):
+        route_class.shed[reason] += 1
+        logger.warning(
+            "Shedding %s request (%s): %d in flight, %d queued",
+            route_class.name,
+            reason,
+            route_class.in_flight,
+            len(route_class.waiters),
+            extra=SAMPLED,
+        )
+        return ServiceOverloaded(self.retry_after)
+
+    async def acquire(self, name: str) -> None:
+        route_class = self.classes[name]
+        # Waiters are woken eagerly, so any queued request means no room
+        if not route_class.waiters and self._has_room(route_class):
+            self._admit(route_class)
+            route_class.queue_wait.observe(0.0)
+            return
+        if len(route_class.waiters) >= route_class.queue:
+            raise self._shed(route_class, QUEUE_FULL)
+
+        waiter = asyncio.get_running_loop().create_future()
+        route_class.waiters.append(waiter)
+        started = time.perf_counter()
+        try:
+            await asyncio.wait({waiter}, timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            # Client went away: hand back a slot granted in the meantime
+            if waiter.done() and not waiter.cancelled():
+                self.release(name)
+            else:
+                self._drop(route_class, waiter)
+            raise
+        route_class.queue_wait.observe(time.perf_counter() - started)
+        if not waiter.done():
+            self._drop(route_class, waiter)
+            raise self._shed(route_class, QUEUE_TIMEOUT)
+
+    def _drop(self, route_class: RouteClass, waiter: asyncio.Future) -> None:
+        waiter.cancel()
+        try:
+            route_class.waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self, name: str) -> None:
+        route_class = self.classes[name]
+        route_class.in_flight -= 1
+        if route_class.pooled:
+            self.in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        for route_class in self._by_priority:
+            while route_class.waiters and self._has_room(route_class):
+                waiter = route_class.waiters.popleft()
+                if waiter.done():
+                    continue
+                self._admit(route_class)
+                waiter.set_result(None)
+
+    def snapshot(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "in_flight": self.in_flight,
+            "classes": {
+                route_class.name: {
+                    "priority": route_class.priority,
+                    "pooled": route_class.pooled,
+                    "limit": route_class.limit,
+                    "queue": route_class.queue,
+                    "in_flight": route_class.in_flight,
+                    "queued": len(route_class.waiters),
+                    "admitted": route_class.admitted,
+                    "shed": dict(route_class.shed),
+                }
+                for route_class in self._by_priority
+            },
+        }
+
+    def metric_lines(self) -> List[str]:
+        classes = self._by_priority
+        lines = metric_lines(
+            "admission_in_flight",
+            "gauge",
+            "Requests currently admitted.",
+            [(f'class="{c.name}"', c.in_flight) for c in classes],
+        )
+        lines += metric_lines(
+            "admission_queued",
+            "gauge",
+            "Requests waiting for a slot.",
+            [(f'class="{c.name}"', len(c.waiters)) for c in classes],
+        )
+        lines += metric_lines(
+            "admission_admitted_total",
+            "counter",
+            "Requests admitted.",
+            [(f'class="{c.name}"', c.admitted) for c in classes],
+        )
+        lines += metric_lines(
+            "admission_shed_total",
+            "counter",
+            "Requests rejected with 503.",
+            [
+                (f'class="{c.name}",reason="{reason}"', count)
+                for c in classes
+                for reason, count in c.shed.items()
+            ],
+        )
+        lines += [
+            "# HELP admission_queue_wait_seconds Time spent queued.",
+            "# TYPE admission_queue_wait_seconds histogram",
+        ]
+        for c in classes:
+            lines.extend(
+                c.queue_wait.lines(
+                    "admission_queue_wait_seconds", f'class="{c.name}"'
+                )
+            )
+        return lines
+
+
+def build_admission_controller() -> AdmissionController:
+    capacity = settings.admission_capacity or (
+        settings.db_pool_size + settings.db_max_overflow
+    )
+    limits = dict(DEFAULT_LIMITS)
+    queues = dict(DEFAULT_QUEUES)
+    if settings.create_batching:
+        # Batched creates wait on the writer thread, which holds the one
+        # connection, so a limit below the batch size would cap every
+        # batch at it. Sync routes still hold a threadpool thread each
+        # while they wait, which keeps their batches at ~40 regardless.
+        limits[CREATE] = settings.create_batch_max_size
+        queues[CREATE] = 2 * settings.create_batch_max_size
+    limits.update(settings.admission_limits)
+    queues.update(settings.admission_queues)
+    classes = [
+        RouteClass(
+            name,
+            priority,
+            limits[name],
+            queues[name],
+            pooled=name != CREATE or not settings.create_batching,
+        )
+        for priority, name in enumerate(ROUTE_CLASSES)
+    ]
+    return AdmissionController(
+        capacity,
+        settings.admission_queue_timeout,
+        settings.admission_retry_after,
+        classes,
+    )
+
+
+admission = build_admission_controller()
+
+
+def admit(name: str):
+    """Route dependency holding a slot of class ``name`` until the
+    response, including a streamed body, has been sent."""
+
+    async def admission_slot():
+        if not settings.admission_enabled:
+            yield
+            return
+        route = name
+        if name == CREATE and not settings.create_batching:
+            route = WRITE
+        await admission.acquire(route)
+        try:
+            yield
+        finally:
+            admission.release(route)
+
+    return Depends(admission_slot)
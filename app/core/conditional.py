@@ -0,0 +1,95 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterable, Optional, Tuple
+
+import orjson
+from fastapi import Request, Response, status
+
+
+def _as_utc(value: datetime) -> datetime:
+    # Timestamps are stored naive in server local time
+    if value.tzinfo is None:
+        value = value.astimezone()
+    return value.astimezone(timezone.utc)
+
+
+def user_etag(user_id: int, updated_at: datetime) -> str:
+    version = int(_as_utc(updated_at).timestamp() * 1_000_000)
+    return f'"u{user_id}-{version:x}"'
+
+
+def page_etag(
+    versions: Iterable[Tuple[int, datetime]], *extra: object
+) -> str:
+    """Validator for a page: changes whenever a row on it is updated,
+    rows enter or leave it, or the total/cursors change."""
+    digest = hashlib.sha1()
+    for user_id, updated_at in versions:
+        digest.update(f"{user_id}:{updated_at.isoformat()};".encode())
+    digest.update(repr(extra).encode())
+    return f'"p-{digest.hexdigest()}"'
+
+
+def payload_etag(payload: object, *extra: object) -> str:
+    """Validator for a sparse fieldset page, whose rows may not carry
+    ``updated_at``: a digest of exactly what is returned."""
+    digest = hashlib.sha1(orjson.dumps(payload))
+    digest.update(repr(extra).encode())
+    return f'"f-{digest.hexdigest()}"'
+
+
+def http_date(value: datetime) -> str:
+    return format_datetime(_as_utc(value), usegmt=True)
+
+
+def is_conditional(request: Request) -> bool:
+    headers = request.headers
+    return "if-none-match" in headers or "if-modified-since" in headers
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    # If-None-Match uses weak comparison, so W/ prefixes are ignored
+    return etag in {candidate.removeprefix("W/") for candidate in candidates}
+
+
+def not_modified(
+    request: Request, etag: str, last_modified: Optional[datetime] = None
+) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    # HTTP dates have one-second resolution
+    modified = _as_utc(last_modified).replace(microsecond=0)
+    return modified <= since
+
+
+def validator_headers(
+    etag: str, last_modified: Optional[datetime] = None
+) -> dict:
+    headers = {"ETag": etag}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def not_modified_response(
+    etag: str, last_modified: Optional[datetime] = None
+) -> Response:
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers=validator_headers(etag, last_modified),
+    )
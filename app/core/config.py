@@ -0,0 +1,145 @@
+from typing import Dict, Literal, Optional
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+    # Full SQLAlchemy URL; overrides the Cloud SQL DB_* variables
+    # (e.g. sqlite:///./local.db for local runs)
+    database_url: Optional[str] = None
+    # Serve the API with async routes on an asyncpg/aiosqlite engine
+    database_async: bool = False
+    # app.server adds the indexes missing from existing tables once
+    # before forking (see app/database/init_db.py)
+    db_create_indexes_on_start: bool = True
+
+    # Logging: level, text or json lines, and whether records are written
+    # by a background thread instead of the thread that logs them
+    log_level: str = "INFO"
+    log_format: Literal["text", "json"] = "text"
+    log_queue: bool = True
+    # Repetitive client-triggered warnings (404s, 422s) logged per message
+    # per interval; the rest are counted and reported with the next one
+    log_sample_burst: int = 5
+    log_sample_interval: float = 60.0
+
+    # Bearer token required by the /internal routes (pool, cache, replica
+    # stats, secret refresh) and /metrics; when unset they are not
+    # mounted at all
+    internal_token: str = ""
+
+    # Seconds a Secret Manager value is reused before it is read again
+    secret_cache_ttl: float = 300.0
+
+    # Comma-separated read replica URLs for the GET routes
+    database_replica_urls: str = ""
+    # Seconds an unreachable replica is skipped before it is tried again
+    replica_failure_cooldown: float = 30.0
+    # Seconds after a write during which that client reads the primary
+    read_your_writes_window: float = 5.0
+
+    # Connection pool (ignored for SQLite)
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: float = 10.0
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_pool_use_lifo: bool = True
+    # Checkouts waiting longer than this are logged and counted as slow
+    db_pool_slow_checkout_ms: float = 100.0
+
+    # Admission control: concurrent requests per route class (lookup,
+    # write, create, list, bulk) and how many may wait for a slot, within a shared
+    # budget that defaults to db_pool_size + db_max_overflow. Requests
+    # that find the queue full or wait longer than the timeout get a 503.
+    # The limit/queue maps override the defaults in app.core.admission,
+    # e.g. ADMISSION_LIMITS='{"list": 4}'.
+    admission_enabled: bool = True
+    admission_capacity: int = 0
+    admission_limits: Dict[str, int] = {}
+    admission_queues: Dict[str, int] = {}
+    admission_queue_timeout: float = 2.0
+    # Seconds sent in Retry-After on shed requests
+    admission_retry_after: int = 1
+
+    # Multi-process server (python -m app.server): bind address, worker
+    # processes (0 = one per CPU the container may use) and the database
+    # connections all workers may hold together, split between their
+    # pools (0 = every worker keeps db_pool_size + db_max_overflow).
+    # Workers are replaced gracefully after max_requests (+ jitter).
+    host: str = "0.0.0.0"
+    port: int = 8080
+    web_concurrency: int = 0
+    db_max_connections: int = 0
+    worker_max_requests: int = 10000
+    worker_max_requests_jitter: int = 1000
+    worker_graceful_timeout: int = 30
+
+    # Seconds a cached COUNT(*) of the user table stays valid
+    total_count_cache_ttl: float = 30.0
+
+    # Read-through cache for GET /users/{id}: none, memory or redis
+    # (redis is sync only: it is rejected with database_async)
+    user_cache_backend: Literal["none", "memory", "redis"] = "none"
+    user_cache_ttl: float = 60.0
+    # Short TTL for 404s, absorbing ID-enumeration scans
+    user_cache_not_found_ttl: float = 5.0
+    # Seconds an invalidated entry refuses fills from reads that started
+    # before the write; longer than any single read should take
+    user_cache_tombstone_ttl: float = 5.0
+    user_cache_max_entries: int = 10000
+    user_cache_redis_url: str = "redis://localhost:6379/0"
+    user_cache_redis_prefix: str = "users:"
+
+    # Encode responses with orjson straight from the ORM rows instead of
+    # validating them through the pydantic envelope models
+    fast_responses: bool = True
+
+    # Request metrics at GET /metrics and Server-Timing response headers
+    metrics_enabled: bool = True
+    server_timing: bool = True
+    # Requests slower than this are logged with their SQL breakdown
+    slow_request_ms: float = 1000.0
+
+    # Change feed at GET /users/changes: events kept for resuming clients,
+    # seconds between SSE keepalives, and the longest long-poll wait.
+    # With notify on (Postgres), changes are shared across processes
+    # through LISTEN/NOTIFY, which more than one process requires.
+    change_feed_buffer_size: int = 10000
+    change_feed_heartbeat: float = 15.0
+    change_feed_poll_timeout: float = 30.0
+    change_feed_notify: bool = False
+
+    # GET /users/stats: created-per-day buckets returned by default,
+    # seconds between folds of the stats journal into the counters and
+    # the most journal rows folded per transaction. app.server recounts
+    # the counters from the user table once before forking, unless
+    # reconcile on start is off.
+    user_stats_days: int = 30
+    user_stats_fold_interval: float = 5.0
+    user_stats_fold_batch_size: int = 10000
+    user_stats_reconcile_on_start: bool = True
+
+    # Rows fetched per server-side cursor batch by GET /users/export
+    export_batch_size: int = 1000
+
+    # Largest id list accepted by POST /users/batch-get
+    batch_get_max_ids: int = 100
+
+    # Group commit for POST /users: concurrent creates are queued for up
+    # to the linger time and inserted together in one transaction
+    create_batching: bool = False
+    create_batch_max_size: int = 200
+    create_batch_linger_ms: float = 5.0
+
+    # Rows per INSERT/commit for POST /users/bulk
+    bulk_create_chunk_size: int = 1000
+    bulk_create_max_chunk_size: int = 5000
+    # Rows per UPDATE/DELETE and commit for the bulk update/delete routes,
+    # bounding how many row locks one transaction holds
+    bulk_write_chunk_size: int = 500
+
+
+settings = Settings()
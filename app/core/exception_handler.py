@@ -5,6 +5,7 @@ from fastapi import Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 
+from app.core.logging_config import SAMPLED
 from app.exceptions.app_exceptions import AppException
 
 logger = logging.getLogger(__name__)
@@ -19,20 +20,29 @@ def exception_handler(request: Request, exc: AppException):
             "message": exc.message,
             "response_time": datetime.now().isoformat(),
         },
+        headers=exc.headers,
     )
 
 
 def validation_exception_handler(
     request: Request, exc: RequestValidationError
 ):
+    errors = exc.errors()
+    # The offending fields only at DEBUG: a client looping on a bad payload
+    # should not turn every request into a large stdout write
     logger.warning(
-        f"422 Validation error at {request.method} {request.url.path}: {exc.errors()}"
+        "422 Validation error at %s %s: %d errors",
+        request.method,
+        request.url.path,
+        len(errors),
+        extra=SAMPLED,
     )
+    logger.debug("Validation errors: %s", errors)
     return JSONResponse(
         status_code=422,
         content={
             "status": "error",
-            "data": exc.errors(),
+            "data": errors,
             "message": "Validation error",
             "response_time": datetime.now().isoformat(),
         },
@@ -1,27 +1,165 @@
+import atexit
+import copy
+import logging
+import queue
+import threading
+import time
+from datetime import datetime, timezone
 from logging.config import dictConfig
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+
+import orjson
+
+from app.core.config import settings
+
+# Pass as ``extra=SAMPLED`` on warnings a client can trigger at will (404s,
+# 422s): only LOG_SAMPLE_BURST of them per message per interval get through
+SAMPLED = {"sampled": True}
+
+_listener: Optional[QueueListener] = None
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, for log collectors."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(
+                record.created, tz=timezone.utc
+            ).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            entry["suppressed"] = suppressed
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return orjson.dumps(entry).decode("utf-8")
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        message = super().format(record)
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            message += f" ({suppressed} similar messages suppressed)"
+        return message
+
+
+class DeferredQueueHandler(QueueHandler):
+    """Enqueue records with only their message interpolated; the
+    listener thread does the formatting and the write.
+
+    ``msg % args`` is rendered here, on the logging thread, so arguments
+    (ORM instances, lists) are shown as they were when logged and never
+    touched from the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class SampledFilter(logging.Filter):
+    """Let through at most ``burst`` sampled records per message template
+    every ``interval`` seconds; the next one through reports how many
+    were dropped."""
+
+    def __init__(self, burst: int, interval: float):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self._windows: Dict[Tuple[str, object], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "sampled", False):
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+                record.suppressed = suppressed
+                return True
+            if window[1] < self.burst:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
 
 
 def setup_logging():
+    """Configure the root logger from LOG_LEVEL/LOG_FORMAT/LOG_QUEUE.
+
+    With the queue enabled, request threads only enqueue records; a
+    background listener formats them and writes to stderr, so a burst of
+    log lines never blocks the event loop or a threadpool worker on I/O.
+    """
+    global _listener
+    formatter = "json" if settings.log_format == "json" else "default"
     logging_config = {
         "version": 1,
         "disable_existing_loggers": False,
         "formatters": {
             "default": {
-                "()": "logging.Formatter",
+                "()": TextFormatter,
                 "fmt": "[%(asctime)s] [%(levelname)s] %(name)s: %(message)s",
                 "datefmt": "%Y-%m-%d %H:%M:%S",
-            }
+            },
+            "json": {"()": JSONFormatter},
+        },
+        "filters": {
+            "sampled": {
+                "()": SampledFilter,
+                "burst": settings.log_sample_burst,
+                "interval": settings.log_sample_interval,
+            },
         },
         "handlers": {
             "console": {
                 "class": "logging.StreamHandler",
-                "formatter": "default",
+                "formatter": formatter,
+                "filters": ["sampled"],
             },
         },
         "root": {
-            "level": "INFO",
+            "level": settings.log_level.upper(),
             "handlers": ["console"],
         },
     }
 
+    stop_logging()
     dictConfig(logging_config)
+    if not settings.log_queue:
+        return
+
+    root = logging.getLogger()
+    console = root.handlers[0]
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(records)
+    # Sample before enqueueing so dropped records cost nothing downstream
+    for log_filter in console.filters:
+        queue_handler.addFilter(log_filter)
+    console.filters.clear()
+    root.handlers = [queue_handler]
+    _listener = QueueListener(records, console, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging():
+    """Flush and stop the background listener, if one is running."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
@@ -0,0 +1,276 @@
+"""Request and SQL metrics, exported in the Prometheus text format.
+
+``MetricsMiddleware`` times every request and keeps a ``RequestTiming``
+in a context variable; the engine hooks from ``instrument_queries`` and
+the pool checkout timer add to it, so each response can report how much
+of its time went to SQL and to waiting for a connection. Routes are
+labelled by their template (``/api/v1/users/{user_id}``), never the raw
+path, to keep the series count bounded.
+"""
+
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+UNMATCHED_ROUTE = "unmatched"
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        index = 0
+        for bound in self.buckets:
+            if value <= bound:
+                break
+            index += 1
+        self.counts[index] += 1
+        self.sum += value
+
+    def lines(self, name: str, labels: str) -> Iterable[str]:
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        cumulative += self.counts[-1]
+        yield f'{name}_bucket{{{labels},le="+Inf"}} {cumulative}'
+        yield f"{name}_sum{{{labels}}} {self.sum:.6f}"
+        yield f"{name}_count{{{labels}}} {cumulative}"
+
+
+class RequestTiming:
+    __slots__ = ("pool_wait_seconds", "queries", "sql_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.pool_wait_seconds = 0.0
+
+
+current_timing: ContextVar[Optional[RequestTiming]] = ContextVar(
+    "current_timing", default=None
+)
+
+
+def record_pool_wait(seconds: float) -> None:
+    timing = current_timing.get()
+    if timing is not None:
+        timing.pool_wait_seconds += seconds
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.sql_latency: Dict[Tuple[str, str], Histogram] = {}
+        self.requests: Dict[Tuple[str, str, int], int] = {}
+        self.queries: Dict[Tuple[str, str], int] = {}
+
+    def record(
+        self,
+        method: str,
+        route: str,
+        status_code: int,
+        seconds: float,
+        timing: RequestTiming,
+    ) -> None:
+        key = (method, route)
+        with self._lock:
+            histogram = self.latency.get(key)
+            if histogram is None:
+                histogram = self.latency[key] = Histogram()
+                self.sql_latency[key] = Histogram()
+                self.queries[key] = 0
+            histogram.observe(seconds)
+            self.sql_latency[key].observe(timing.sql_seconds)
+            self.queries[key] += timing.queries
+            status_key = (method, route, status_code)
+            self.requests[status_key] = self.requests.get(status_key, 0) + 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            lines = [
+                "# HELP http_requests_total Requests by route and status.",
+                "# TYPE http_requests_total counter",
+            ]
+            for (method, route, status_code), count in sorted(
+                self.requests.items()
+            ):
+                lines.append(
+                    f'http_requests_total{{method="{method}",route="{route}",'
+                    f'status="{status_code}"}} {count}'
+                )
+            lines += [
+                "# HELP http_request_duration_seconds Request latency.",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            for (method, route), histogram in sorted(self.latency.items()):
+                labels = f'method="{method}",route="{route}"'
+                lines.extend(
+                    histogram.lines("http_request_duration_seconds", labels)
+                )
+            lines += [
+                "# HELP http_request_sql_seconds SQL time spent per request.",
+                "# TYPE http_request_sql_seconds histogram",
+            ]
+            for (method, route), histogram in sorted(self.sql_latency.items()):
+                labels = f'method="{method}",route="{route}"'
+                lines.extend(
+                    histogram.lines("http_request_sql_seconds", labels)
+                )
+            lines += [
+                "# HELP db_queries_total SQL statements executed by route.",
+                "# TYPE db_queries_total counter",
+            ]
+            for (method, route), count in sorted(self.queries.items()):
+                lines.append(
+                    f'db_queries_total{{method="{method}",route="{route}"}} '
+                    f"{count}"
+                )
+        return lines
+
+
+metrics = MetricsRegistry()
+
+
+def metric_lines(
+    name: str,
+    kind: str,
+    help_text: str,
+    samples: Iterable[Tuple[str, float]],
+) -> List[str]:
+    """Lines for a gauge/counter kept elsewhere (e.g. ``PoolStats``)."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    lines.extend(f"{name}{{{labels}}} {value}" for labels, value in samples)
+    return lines
+
+
+def instrument_queries(engine) -> None:
+    """Count statements and sum their time into the current request."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_execute(
+        connection, cursor, statement, parameters, context, executemany
+    ):
+        connection.info.setdefault("query_started", []).append(
+            time.perf_counter()
+        )
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_execute(
+        connection, cursor, statement, parameters, context, executemany
+    ):
+        started = connection.info["query_started"].pop()
+        timing = current_timing.get()
+        if timing is not None:
+            timing.queries += 1
+            timing.sql_seconds += time.perf_counter() - started
+
+
+def server_timing(timing: RequestTiming, seconds: float) -> str:
+    return (
+        f"db;dur={timing.sql_seconds * 1000:.2f};"
+        f'desc="{timing.queries} queries", '
+        f"pool;dur={timing.pool_wait_seconds * 1000:.2f}, "
+        f"app;dur={seconds * 1000:.2f}"
+    )
+
+
+def route_templates(router, prefix: str = "") -> Dict[object, str]:
+    """Map each endpoint of ``router`` to its full path template."""
+    return {
+        route.endpoint: prefix + route.path
+        for route in router.routes
+        if hasattr(route, "endpoint")
+    }
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so it adds no task or body buffering."""
+
+    def __init__(
+        self,
+        app,
+        route_labels: Optional[Dict[object, str]] = None,
+        long_lived: Iterable[str] = (),
+    ):
+        self.app = app
+        # Matched routes may carry the path relative to their router
+        self.route_labels = route_labels or {}
+        # Streams and long-polls: timed, but never reported as slow
+        self.long_lived = frozenset(long_lived)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if settings.server_timing:
+                    elapsed = time.perf_counter() - started
+                    headers = list(message.get("headers", []))
+                    headers.append(
+                        (
+                            b"server-timing",
+                            server_timing(timing, elapsed).encode("latin-1"),
+                        )
+                    )
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            elapsed = time.perf_counter() - started
+            current_timing.reset(token)
+            route = scope.get("route")
+            route_path = self.route_labels.get(
+                getattr(route, "endpoint", None),
+                getattr(route, "path", UNMATCHED_ROUTE),
+            )
+            method = scope["method"]
+            metrics.record(method, route_path, status_code, elapsed, timing)
+            if (
+                elapsed * 1000 >= settings.slow_request_ms
+                and route_path not in self.long_lived
+            ):
+                logger.warning(
+                    "Slow request %s %s: %.1fms, %d queries, %.1fms SQL, "
+                    "%.1fms pool wait",
+                    method,
+                    route_path,
+                    elapsed * 1000,
+                    timing.queries,
+                    timing.sql_seconds * 1000,
+                    timing.pool_wait_seconds * 1000,
+                )
+            elif logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "%s %s %s: %s",
+                    method,
+                    route_path,
+                    status_code,
+                    server_timing(timing, elapsed),
+                )
@@ -0,0 +1,127 @@
+"""Response envelopes serialized straight to bytes.
+
+Routes keep ``response_model`` for the OpenAPI schema, but return these
+``Response`` objects so FastAPI does not validate and encode the
+envelope a second time. With ``FAST_RESPONSES`` on, users are read with
+a precomputed attribute getter and encoded by orjson; otherwise the
+envelope goes through the pydantic models as before.
+"""
+
+from datetime import datetime
+from functools import lru_cache
+from operator import attrgetter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+from fastapi import Response, status
+
+from app.core.config import settings
+from app.schemas.common import APIResponse, PaginatedResponse
+from app.schemas.users import UserRead
+
+USER_FIELDS = tuple(UserRead.model_fields)
+_user_values = attrgetter(*USER_FIELDS)
+
+
+class JSONBytesResponse(Response):
+    media_type = "application/json"
+
+
+@lru_cache(maxsize=256)
+def _fields_getter(fields: Tuple[str, ...]):
+    getter = attrgetter(*fields)
+    if len(fields) == 1:
+        return lambda user: (getter(user),)
+    return getter
+
+
+def user_payload(
+    user: Any, fields: Optional[Tuple[str, ...]] = None
+) -> dict:
+    """``UserRead``-shaped dict from an ORM row or ``UserRead``, or just
+    ``fields`` of it (the row may then be a partial column tuple)."""
+    if fields is not None:
+        return dict(zip(fields, _fields_getter(fields)(user)))
+    if not settings.fast_responses:
+        return user.model_dump()
+    return dict(zip(USER_FIELDS, _user_values(user)))
+
+
+def users_payload(
+    users: Iterable[Any], fields: Optional[Tuple[str, ...]] = None
+) -> List[dict]:
+    if fields is not None:
+        values = _fields_getter(fields)
+        return [dict(zip(fields, values(user))) for user in users]
+    if not settings.fast_responses:
+        return [user.model_dump() for user in users]
+    return [dict(zip(USER_FIELDS, _user_values(user))) for user in users]
+
+
+def users_by_id_payload(users: Dict[int, Optional[Any]]) -> dict:
+    """Batch lookup result: every requested id (as a string key, as JSON
+    requires), with ``null`` for the ones that do not exist."""
+    return {
+        "users": {
+            str(user_id): None if user is None else user_payload(user)
+            for user_id, user in users.items()
+        },
+        "not_found": [
+            user_id for user_id, user in users.items() if user is None
+        ],
+    }
+
+
+def api_response(
+    data: Any,
+    message: str,
+    status_code: int = status.HTTP_200_OK,
+    headers: Optional[dict] = None,
+) -> Response:
+    if settings.fast_responses:
+        body = orjson.dumps(
+            {
+                "status": "success",
+                "data": data,
+                "message": message,
+                "response_time": datetime.now(),
+            }
+        )
+    else:
+        body = APIResponse(
+            status="success",
+            data=data,
+            message=message,
+            response_time=datetime.now(),
+        ).model_dump_json()
+    return JSONBytesResponse(body, status_code=status_code, headers=headers)
+
+
+def paginated_response(
+    data: List[dict],
+    total: Optional[int],
+    total_exact: Optional[bool],
+    page: Optional[int],
+    limit: int,
+    next_cursor: Optional[str],
+    prev_cursor: Optional[str],
+    message: str,
+    headers: Optional[dict] = None,
+) -> Response:
+    envelope = {
+        "status": "success",
+        "data": data,
+        "total": total,
+        "total_exact": total_exact,
+        "page": page,
+        "limit": limit,
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor,
+        "message": message,
+        "response_time": datetime.now(),
+    }
+    if settings.fast_responses:
+        body = orjson.dumps(envelope)
+    else:
+        body = PaginatedResponse(**envelope).model_dump_json()
+    return JSONBytesResponse(body, headers=headers)
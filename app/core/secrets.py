@@ -0,0 +1,80 @@
+"""Secret Manager access with a TTL cache.
+
+The google-cloud client is imported and built on first use, so processes
+that never read a secret (local runs, tests) do not pay for the import.
+Values are cached for ``SECRET_CACHE_TTL`` seconds; a rotated secret is
+picked up once the entry expires, or straight away after ``refresh()``.
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SecretCache:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[str, float]] = {}
+        self._client = None
+        self._lock = threading.Lock()
+        # Duration of the last Secret Manager round trip, for the boot report
+        self.last_fetch_ms: Optional[float] = None
+
+    def _secret_client(self):
+        if self._client is None:
+            from google.cloud import secretmanager
+
+            self._client = secretmanager.SecretManagerServiceClient()
+        return self._client
+
+    def _fetch(self, name: str) -> Optional[str]:
+        started = time.perf_counter()
+        try:
+            response = self._secret_client().access_secret_version(
+                request={"name": name}
+            )
+            return response.payload.data.decode("UTF-8")
+        except Exception as exc:
+            logger.warning("Unable to read secret %s: %s", name, exc)
+            return None
+        finally:
+            self.last_fetch_ms = (time.perf_counter() - started) * 1000
+
+    def get(
+        self, project_id, secret_id, version_id="latest"
+    ) -> Optional[str]:
+        name = f"projects/{project_id}/secrets/{secret_id}/versions/{version_id}"
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry[1] > time.monotonic():
+                return entry[0]
+            value = self._fetch(name)
+            if value is not None:
+                self._entries[name] = (value, time.monotonic() + self.ttl)
+            elif entry is not None:
+                # Keep serving the last good value through an outage
+                return entry[0]
+            return value
+
+    def refresh(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def after_fork(self) -> None:
+        """Drop what a forked worker inherited: the client's gRPC channel
+        does not survive a fork, and the lock may have been held."""
+        self._lock = threading.Lock()
+        self._client = None
+        self._entries = {}
+
+
+secret_cache = SecretCache(settings.secret_cache_ttl)
+
+
+def get_secret(project_id, secret_id, version_id="latest"):
+    return secret_cache.get(project_id, secret_id, version_id)
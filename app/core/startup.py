@@ -0,0 +1,35 @@
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+logger = logging.getLogger(__name__)
+
+
+class StartupReport:
+    """Durations of the boot phases, logged once the app is serving."""
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+
+    def record(self, phase: str, milliseconds: float) -> None:
+        self.phases[phase] = milliseconds
+
+    @contextmanager
+    def measure(self, phase: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, (time.perf_counter() - started) * 1000)
+
+    def log(self) -> None:
+        total = sum(self.phases.values())
+        phases = ", ".join(
+            f"{phase} {milliseconds:.1f}ms"
+            for phase, milliseconds in self.phases.items()
+        )
+        logger.info("Startup took %.1fms (%s)", total, phases)
+
+
+startup_report = StartupReport()
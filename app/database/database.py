@@ -1,22 +1,46 @@
 import os
+import threading
+from typing import Optional
 
 from dotenv import load_dotenv
-from google.cloud import secretmanager
+from fastapi import Request
+from sqlalchemy import Engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import NullPool
 from sqlmodel import Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import instrument_queries
+from app.core.secrets import get_secret
+from app.database.pool import instrument_engine, pool_options
+from app.database.replicas import (
+    REPLICA_SESSION,
+    Replica,
+    ReplicaSet,
+    pinned_to_primary,
+    replica_urls,
+)
 
 load_dotenv()
 
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
 
-def get_secret(project_id, secret_id, version_id="latest"):
-    try:
-        client = secretmanager.SecretManagerServiceClient()
-        name = f"projects/{project_id}/secrets/{secret_id}/versions/{version_id}"
-        response = client.access_secret_version(
-            request={"name": name}
-        )
-        return response.payload.data.decode("UTF-8")
-    except Exception:
-        return None
+
+def to_async_url(url: str) -> str:
+    """Swap the sync DBAPI driver for its asyncio counterpart."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend}")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(
+        hide_password=False
+    )
 
 
 GCP_PROJECT_ID = os.getenv("GOOGLE_CLOUD_PROJECT")
@@ -27,20 +51,212 @@ DB_PASSWORD = os.getenv("DB_PASSWORD")
 DB_HOST = os.getenv("DB_HOST")
 DB_PORT = os.getenv("DB_PORT", "5432")
 DB_NAME = os.getenv("DB_NAME")
-DB_PASSWORD = get_secret(GCP_PROJECT_ID, DB_PASSWORD_SECRET_ID)
 
-DATABASE_URL = (
-    f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@/"
-    f"?host={DB_HOST}"
-    f"&database={DB_NAME}"
-)
+# Engines are built on first use (normally from the lifespan hook), so
+# importing this module never touches the network
+_engine: Optional[Engine] = None
+_async_engine: Optional[AsyncEngine] = None
+_replica_set: Optional[ReplicaSet] = None
+_async_replica_set: Optional[ReplicaSet] = None
+_engine_lock = threading.Lock()
+
+
+def db_password() -> Optional[str]:
+    if DB_PASSWORD_SECRET_ID:
+        return get_secret(GCP_PROJECT_ID, DB_PASSWORD_SECRET_ID)
+    return DB_PASSWORD
+
+
+def database_url() -> str:
+    if settings.database_url:
+        return settings.database_url
+    if not (DB_USER and DB_HOST and DB_NAME and db_password()):
+        raise RuntimeError("Unable to init database engine")
+    # The password is added per connection, see _use_secret_password
+    return (
+        f"postgresql+psycopg2://{DB_USER}@/"
+        f"?host={DB_HOST}"
+        f"&database={DB_NAME}"
+    )
+
+
+def database_backend() -> str:
+    if settings.database_url:
+        return make_url(settings.database_url).get_backend_name()
+    return "postgresql"
+
+
+def _use_secret_password(engine: Engine) -> None:
+    @event.listens_for(engine, "do_connect")
+    def provide_password(dialect, connection_record, cargs, cparams):
+        # Read through the secret cache, so a rotated password reaches
+        # new connections without restarting the process
+        cparams["password"] = db_password()
+
+
+def get_engine() -> Engine:
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                engine = create_engine(
+                    database_url(), **pool_options(database_backend())
+                )
+                if not settings.database_url:
+                    _use_secret_password(engine)
+                instrument_engine(engine, "primary")
+                instrument_queries(engine)
+                _engine = engine
+    return _engine
+
+
+def create_standalone_engine() -> Engine:
+    """An engine without a pool, for one-off jobs such as the ones the
+    server master runs before forking; dispose of it when done."""
+    engine = create_engine(database_url(), poolclass=NullPool)
+    if not settings.database_url:
+        _use_secret_password(engine)
+    return engine
+
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine
+    if _async_engine is None:
+        with _engine_lock:
+            if _async_engine is None:
+                engine = create_async_engine(
+                    to_async_url(database_url()),
+                    **pool_options(database_backend(), is_async=True),
+                )
+                if not settings.database_url:
+                    _use_secret_password(engine.sync_engine)
+                instrument_engine(engine.sync_engine, "primary_async")
+                instrument_queries(engine.sync_engine)
+                _async_engine = engine
+    return _async_engine
+
+
+def _build_replica_set(is_async: bool) -> ReplicaSet:
+    replicas = []
+    for index, url in enumerate(replica_urls()):
+        backend = make_url(url).get_backend_name()
+        name = f"replica{index}_async" if is_async else f"replica{index}"
+        if is_async:
+            engine = create_async_engine(
+                to_async_url(url), **pool_options(backend, is_async=True)
+            )
+            sync_engine = engine.sync_engine
+        else:
+            engine = sync_engine = create_engine(url, **pool_options(backend))
+        instrument_engine(sync_engine, name)
+        instrument_queries(sync_engine)
+        replicas.append(Replica(name, engine))
+    return ReplicaSet(replicas, settings.replica_failure_cooldown)
 
-if DB_USER and DB_PASSWORD and DB_HOST and DB_NAME:
-    engine = create_engine(DATABASE_URL)
-else:
-    raise Exception("Unable to init database engine")
+
+def get_replica_set() -> ReplicaSet:
+    global _replica_set
+    if _replica_set is None:
+        with _engine_lock:
+            if _replica_set is None:
+                _replica_set = _build_replica_set(is_async=False)
+    return _replica_set
+
+
+def get_async_replica_set() -> ReplicaSet:
+    global _async_replica_set
+    if _async_replica_set is None:
+        with _engine_lock:
+            if _async_replica_set is None:
+                _async_replica_set = _build_replica_set(is_async=True)
+    return _async_replica_set
+
+
+def _connect_replica():
+    """A connection to the next healthy replica, or None to use the
+    primary. Connecting up front is what lets a dead replica be skipped
+    before the request has run any query on it."""
+    replica_set = get_replica_set()
+    for replica in replica_set.candidates():
+        try:
+            connection = replica.engine.connect()
+        except DBAPIError as exc:
+            replica_set.mark_down(replica, exc)
+            continue
+        replica_set.record_read(replica)
+        return connection
+    if replica_set.replicas:
+        replica_set.record_fallback()
+    return None
+
+
+async def _connect_async_replica():
+    replica_set = get_async_replica_set()
+    for replica in replica_set.candidates():
+        try:
+            connection = await replica.engine.connect()
+        except DBAPIError as exc:
+            replica_set.mark_down(replica, exc)
+            continue
+        replica_set.record_read(replica)
+        return connection
+    if replica_set.replicas:
+        replica_set.record_fallback()
+    return None
+
+
+def get_read_engine() -> Engine:
+    """Engine for long reads that open their own connection (exports)."""
+    candidates = get_replica_set().candidates()
+    return candidates[0].engine if candidates else get_engine()
+
+
+def get_async_read_engine() -> AsyncEngine:
+    candidates = get_async_replica_set().candidates()
+    return candidates[0].engine if candidates else get_async_engine()
 
 
 def get_session():
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
+        yield session
+
+
+def get_read_session(request: Request):
+    connection = None if pinned_to_primary(request) else _connect_replica()
+    if connection is None:
+        with Session(get_engine()) as session:
+            yield session
+        return
+    with connection, Session(
+        bind=connection, info={REPLICA_SESSION: True}
+    ) as session:
+        yield session
+
+
+async def get_async_session():
+    # Rows are serialized after commit, so skip the implicit reload
+    async with AsyncSession(
+        get_async_engine(), expire_on_commit=False
+    ) as session:
         yield session
+
+
+async def get_async_read_session(request: Request):
+    connection = (
+        None if pinned_to_primary(request) else await _connect_async_replica()
+    )
+    if connection is None:
+        async with AsyncSession(
+            get_async_engine(), expire_on_commit=False
+        ) as session:
+            yield session
+        return
+    try:
+        async with AsyncSession(
+            bind=connection,
+            expire_on_commit=False,
+            info={REPLICA_SESSION: True},
+        ) as session:
+            yield session
+    finally:
+        await connection.close()
@@ -1,10 +1,88 @@
+"""Schema setup.
+
+``create_all`` creates missing tables, but never adds an index to a table
+that already exists. ``ensure_indexes`` does, so a deployment over an
+existing ``user`` table gets the indexes the list filters, cursors and
+exports rely on. On Postgres they are built with ``CREATE INDEX
+CONCURRENTLY``, which does not block writes. ``python -m app.server``
+runs it once before forking its workers; ``python -m
+app.database.init_db`` runs it on demand.
+"""
+
+import logging
+
+from sqlalchemy import Engine, text
+from sqlalchemy.schema import CreateIndex
 from sqlmodel import SQLModel
 
-from app.database.database import engine
+from app.database.database import (
+    create_standalone_engine,
+    get_async_engine,
+    get_engine,
+)
+from app.models.user import User
+from app.models.user_stats import UserStat, UserStatDelta
+
+logger = logging.getLogger(__name__)
 
-# Model registration, do not remove this import
-from app.models.user import User  # noqa: F401
+# Importing the models registers their tables with SQLModel.metadata
+MODELS = (User, UserStat, UserStatDelta)
+
+INVALID_INDEXES = text(
+    "SELECT c.relname FROM pg_index i "
+    "JOIN pg_class c ON c.oid = i.indexrelid "
+    "WHERE NOT i.indisvalid AND c.relname = ANY(:names)"
+)
 
 
 def init_db():
+    SQLModel.metadata.create_all(get_engine())
+
+
+async def init_db_async():
+    async with get_async_engine().begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+
+
+def _index_ddl(index, dialect) -> str:
+    ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=dialect))
+    if dialect.name == "postgresql":
+        ddl = ddl.replace("INDEX", "INDEX CONCURRENTLY", 1)
+    return ddl
+
+
+def ensure_indexes(engine: Engine) -> None:
+    """Create the model indexes missing from existing tables."""
     SQLModel.metadata.create_all(engine)
+    indexes = sorted(
+        (index for model in MODELS for index in model.__table__.indexes),
+        key=lambda index: index.name,
+    )
+    # CONCURRENTLY cannot run inside a transaction
+    with engine.connect().execution_options(
+        isolation_level="AUTOCOMMIT"
+    ) as connection:
+        if engine.dialect.name == "postgresql":
+            # An interrupted concurrent build leaves an invalid index
+            # that IF NOT EXISTS would skip; build it again
+            names = [index.name for index in indexes]
+            for name in connection.execute(
+                INVALID_INDEXES, {"names": names}
+            ).scalars():
+                logger.warning("Rebuilding invalid index %s", name)
+                connection.execute(
+                    text(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"')
+                )
+        for index in indexes:
+            connection.execute(text(_index_ddl(index, engine.dialect)))
+
+
+if __name__ == "__main__":
+    from app.core.logging_config import setup_logging
+
+    setup_logging()
+    engine = create_standalone_engine()
+    try:
+        ensure_indexes(engine)
+    finally:
+        engine.dispose()
@@ -0,0 +1,186 @@
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+from app.core.config import settings
+from app.core.metrics import record_pool_wait
+
+logger = logging.getLogger(__name__)
+
+
+class PoolStats:
+    """Counters for one engine's pool, updated from pool events."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pool: Optional[Pool] = None
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.slow_checkouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.peak_checked_out = 0
+        self.peak_overflow = 0
+
+    def increment(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def record_wait(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+            elif seconds * 1000 >= settings.db_pool_slow_checkout_ms:
+                self.slow_checkouts += 1
+
+    def record_checkout(self) -> None:
+        with self._lock:
+            self.checkouts += 1
+            if self.pool is not None:
+                self.peak_checked_out = max(
+                    self.peak_checked_out, self.pool.checkedout()
+                )
+                self.peak_overflow = max(
+                    self.peak_overflow, self.pool.overflow()
+                )
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            waits = self.checkouts + self.timeouts
+            data = {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "slow_checkouts": self.slow_checkouts,
+                "wait_ms_avg": (
+                    round(self.wait_seconds_total / waits * 1000, 3)
+                    if waits
+                    else 0.0
+                ),
+                "wait_ms_max": round(self.wait_seconds_max * 1000, 3),
+                "peak_checked_out": self.peak_checked_out,
+                "peak_overflow": self.peak_overflow,
+            }
+        if isinstance(self.pool, QueuePool):
+            data.update(
+                size=self.pool.size(),
+                checked_out=self.pool.checkedout(),
+                checked_in=self.pool.checkedin(),
+                overflow=max(self.pool.overflow(), 0),
+            )
+        return data
+
+
+pool_stats: Dict[str, PoolStats] = {}
+
+
+class CheckoutTimingMixin:
+    """Time how long callers wait for a connection from the queue."""
+
+    stats: Optional[PoolStats] = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            waited = time.perf_counter() - started
+            if self.stats is not None:
+                self.stats.record_wait(waited, timed_out=True)
+            logger.warning(
+                "Pool %s timed out after %.3fs waiting for a connection",
+                self.status(),
+                waited,
+            )
+            raise
+        waited = time.perf_counter() - started
+        record_pool_wait(waited)
+        if self.stats is not None:
+            self.stats.record_wait(waited)
+        if waited * 1000 >= settings.db_pool_slow_checkout_ms:
+            logger.warning(
+                "Slow connection checkout: waited %.1fms (%s)",
+                waited * 1000,
+                self.status(),
+            )
+        return connection
+
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool; keep counting into ours
+        pool = super().recreate()
+        pool.stats = self.stats
+        if self.stats is not None:
+            self.stats.pool = pool
+        return pool
+
+
+class InstrumentedQueuePool(CheckoutTimingMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(CheckoutTimingMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_options(backend: str, is_async: bool = False) -> dict:
+    """Engine keyword arguments for the configured pool.
+
+    SQLite keeps SQLAlchemy's default pool, which for in-memory
+    databases does not accept sizing arguments.
+    """
+    if backend == "sqlite":
+        return {}
+    return {
+        "poolclass": (
+            InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool
+        ),
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "pool_use_lifo": settings.db_pool_use_lifo,
+    }
+
+
+def instrument_engine(engine, name: str) -> PoolStats:
+    """Attach pool event listeners to a sync ``Engine``."""
+    stats = PoolStats(name)
+    stats.pool = engine.pool
+    if isinstance(engine.pool, CheckoutTimingMixin):
+        engine.pool.stats = stats
+    pool_stats[name] = stats
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        stats.increment("connects")
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        stats.record_checkout()
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        stats.increment("checkins")
+
+    @event.listens_for(engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        stats.increment("invalidations")
+        logger.warning(
+            "Pool %s invalidated a connection: %s", name, exception
+        )
+
+    return stats
@@ -0,0 +1,140 @@
+"""Read replicas and the read-your-writes window.
+
+GET routes take their session from a replica picked round-robin among
+the ones not cooling down after a failed connect; when none is
+reachable they fall back to the primary. A client that has just written
+is pinned to the primary for ``READ_YOUR_WRITES_WINDOW`` seconds, using
+the time of its last write echoed back in a cookie or header, so it
+never reads a replica that has not caught up with its own change yet.
+"""
+
+import itertools
+import logging
+import threading
+import time
+from typing import List, Optional
+
+from fastapi import Request, Response
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+LAST_WRITE_COOKIE = "last_write"
+LAST_WRITE_HEADER = "x-last-write"
+# Session.info key set on sessions bound to a replica connection
+REPLICA_SESSION = "replica"
+
+
+class Replica:
+    def __init__(self, name: str, engine):
+        self.name = name
+        self.engine = engine
+        self.down_until = 0.0
+        self.reads = 0
+        self.failures = 0
+
+
+class ReplicaSet:
+    def __init__(self, replicas: List[Replica], cooldown: float):
+        self.replicas = replicas
+        self.cooldown = cooldown
+        self.fallbacks = 0
+        self._next = itertools.count()
+        self._lock = threading.Lock()
+
+    def candidates(self) -> List[Replica]:
+        """Healthy replicas in round-robin order."""
+        if not self.replicas:
+            return []
+        start = next(self._next) % len(self.replicas)
+        ordered = self.replicas[start:] + self.replicas[:start]
+        now = time.monotonic()
+        return [replica for replica in ordered if replica.down_until <= now]
+
+    def record_read(self, replica: Replica) -> None:
+        with self._lock:
+            replica.reads += 1
+
+    def mark_down(self, replica: Replica, exc: Exception) -> None:
+        with self._lock:
+            replica.failures += 1
+            replica.down_until = time.monotonic() + self.cooldown
+        logger.warning(
+            "Replica %s unreachable, skipping it for %.0fs: %s",
+            replica.name,
+            self.cooldown,
+            exc,
+        )
+
+    def record_fallback(self) -> None:
+        with self._lock:
+            self.fallbacks += 1
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "fallbacks": self.fallbacks,
+                "replicas": {
+                    replica.name: {
+                        "reads": replica.reads,
+                        "failures": replica.failures,
+                        "healthy": replica.down_until <= now,
+                    }
+                    for replica in self.replicas
+                },
+            }
+
+
+def replica_urls() -> List[str]:
+    return [
+        url.strip()
+        for url in settings.database_replica_urls.split(",")
+        if url.strip()
+    ]
+
+
+def _last_write(request: Request) -> Optional[float]:
+    value = request.headers.get(LAST_WRITE_HEADER) or request.cookies.get(
+        LAST_WRITE_COOKIE
+    )
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def pinned_to_primary(request: Request) -> bool:
+    last_write = _last_write(request)
+    if last_write is None:
+        return False
+    # A stamp from the future is forged, not a recent write: it would
+    # otherwise pin every read of that client to the primary for good
+    elapsed = time.time() - last_write
+    return 0 <= elapsed < settings.read_your_writes_window
+
+
+def from_replica(session) -> bool:
+    """Whether ``session`` reads a replica, which may lag behind writes
+    already visible to (and invalidated in) the shared caches."""
+    return session.info.get(REPLICA_SESSION, False)
+
+
+def remember_write(response: Response) -> Response:
+    """Stamp a write response so the client's next reads stay on the
+    primary until the replicas have had time to catch up."""
+    if not replica_urls():
+        return response
+    written_at = f"{time.time():.3f}"
+    response.headers[LAST_WRITE_HEADER] = written_at
+    response.set_cookie(
+        LAST_WRITE_COOKIE,
+        written_at,
+        max_age=max(1, int(settings.read_your_writes_window)),
+        httponly=True,
+        samesite="lax",
+    )
+    return response
@@ -1,4 +1,39 @@
+from typing import Optional
+
+
 class AppException(Exception):
-    def __init__(self, message: str, status_code: int = 400):
+    def __init__(
+        self,
+        message: str,
+        status_code: int = 400,
+        headers: Optional[dict] = None,
+    ):
         self.message = message
         self.status_code = status_code
+        self.headers = headers
+
+
+class InvalidCursor(AppException):
+    def __init__(self):
+        super().__init__(
+            message="Invalid or expired pagination cursor.",
+            status_code=400,
+        )
+
+
+class Unauthorized(AppException):
+    def __init__(self):
+        super().__init__(
+            message="Missing or invalid credentials.",
+            status_code=401,
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+class ServiceOverloaded(AppException):
+    def __init__(self, retry_after: int):
+        super().__init__(
+            message="The service is overloaded, please retry shortly.",
+            status_code=503,
+            headers={"Retry-After": str(retry_after)},
+        )
@@ -24,3 +24,37 @@ class NoFieldsToUpdate(AppException):
             message="No valid fields were provided to update.",
             status_code=400,
         )
+
+
+class InvalidBulkPayload(AppException):
+    def __init__(self, message: str):
+        super().__init__(message=message, status_code=422)
+
+
+class InvalidFields(AppException):
+    def __init__(self, unknown, valid):
+        super().__init__(
+            message=(
+                f"Unknown fields: {', '.join(unknown) or '(none given)'}. "
+                f"Valid fields: {', '.join(valid)}."
+            ),
+            status_code=400,
+        )
+
+
+class UnsupportedUserFilter(AppException):
+    def __init__(self, message: str):
+        super().__init__(message=message, status_code=400)
+
+
+class TooManyIds(AppException):
+    def __init__(self, limit: int):
+        super().__init__(
+            message=f"At most {limit} ids can be requested at once.",
+            status_code=422,
+        )
+
+
+class InvalidBulkSelection(AppException):
+    def __init__(self, message: str):
+        super().__init__(message=message, status_code=400)
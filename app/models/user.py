@@ -2,6 +2,9 @@ from datetime import datetime
 from enum import Enum
 from typing import Optional
 
+from sqlalchemy import Index, Sequence, String
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
 from sqlmodel import Field, SQLModel
 
 
@@ -12,6 +15,16 @@ class RoleEnum(str, Enum):
 
 
 class User(SQLModel, table=True):
+    # Composite indexes backing keyset pagination on each sort key and
+    # the list filters (see app/services/user_query.py)
+    __table_args__ = (
+        Index("ix_user_created_at_id", "created_at", "id"),
+        Index("ix_user_updated_at_id", "updated_at", "id"),
+        Index("ix_user_role_id", "role", "id"),
+        Index("ix_user_role_active_id", "role", "active", "id"),
+        Index("ix_user_active_id", "active", "id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     username: str = Field(index=True, unique=True)
     email: str = Field(index=True, unique=True)
@@ -21,3 +34,43 @@ class User(SQLModel, table=True):
     created_at: datetime = Field(default_factory=datetime.now())
     updated_at: datetime = Field(default_factory=datetime.now())
     active: bool = True
+
+
+class prefix_key(FunctionElement):
+    """``lower(column)`` as the prefix indexes store it.
+
+    Postgres compares it in the "C" collation, where ``LIKE 'abc%'`` is a
+    range of the index and ``ORDER BY`` follows the index order whatever
+    the database collation; SQLite's default collation already does both.
+    """
+
+    type = String()
+    name = "prefix_key"
+    inherit_cache = True
+
+
+@compiles(prefix_key)
+def _compile_prefix_key(element, compiler, **kw):
+    return "lower(%s)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(prefix_key, "postgresql")
+def _compile_prefix_key_postgresql(element, compiler, **kw):
+    return 'lower(%s) COLLATE "C"' % compiler.process(element.clauses, **kw)
+
+
+# Case-insensitive prefix search, in (prefix, id) order for its pages
+Index(
+    "ix_user_username_lower",
+    prefix_key(User.__table__.c.username),
+    User.__table__.c.id,
+)
+Index(
+    "ix_user_email_lower",
+    prefix_key(User.__table__.c.email),
+    User.__table__.c.id,
+)
+
+# Ids of the change feed's events with CHANGE_FEED_NOTIFY, drawn by the
+# writing transaction so every process labels an event the same way
+user_change_seq = Sequence("user_change_seq", metadata=SQLModel.metadata)
@@ -0,0 +1,29 @@
+from typing import Optional
+
+from sqlmodel import Field, SQLModel
+
+
+class UserStat(SQLModel, table=True):
+    """One folded counter of the user statistics, e.g. ``("role",
+    "admin")``. See app/services/user_stats.py for how it is kept."""
+
+    __tablename__ = "user_stats"
+
+    dimension: str = Field(primary_key=True)
+    bucket: str = Field(primary_key=True)
+    count: int = 0
+
+
+class UserStatDelta(SQLModel, table=True):
+    """A change to one counter not folded into ``user_stats`` yet.
+
+    Writes only ever insert these, so concurrent writers never wait on
+    each other's counters.
+    """
+
+    __tablename__ = "user_stats_journal"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    dimension: str
+    bucket: str
+    delta: int
@@ -1,9 +1,21 @@
 from datetime import datetime
+from enum import Enum
 from typing import Any, List, Optional, Union
 
 from pydantic import BaseModel
 
 
+class PaginationMode(str, Enum):
+    offset = "offset"
+    cursor = "cursor"
+
+
+class TotalMode(str, Enum):
+    exact = "exact"
+    cached = "cached"
+    estimate = "estimate"
+
+
 class APIResponse(BaseModel):
     status: str
     data: Optional[Union[dict, list]] = None
@@ -14,8 +26,11 @@ class APIResponse(BaseModel):
 class PaginatedResponse(BaseModel):
     status: str
     data: List[Any]
-    total: int
-    page: int
+    total: Optional[int] = None
+    total_exact: Optional[bool] = None
+    page: Optional[int] = None
     limit: int
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
     message: Optional[str]
     response_time: datetime
@@ -1,5 +1,6 @@
 from datetime import datetime
-from typing import Optional
+from enum import Enum
+from typing import Dict, List, Optional
 
 from pydantic import EmailStr
 from sqlmodel import SQLModel
@@ -33,3 +34,69 @@ class UserUpdate(SQLModel):
     last_name: Optional[str] = None
     role: Optional[RoleEnum] = None
     active: Optional[bool] = None
+
+
+class UserSortField(str, Enum):
+    id = "id"
+    username = "username"
+    email = "email"
+    created_at = "created_at"
+    updated_at = "updated_at"
+
+
+class UserFilter(SQLModel):
+    role: Optional[RoleEnum] = None
+    active: Optional[bool] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+    updated_from: Optional[datetime] = None
+    updated_to: Optional[datetime] = None
+    username_prefix: Optional[str] = None
+    email_prefix: Optional[str] = None
+
+
+class UserBatchGet(SQLModel):
+    ids: List[int]
+
+
+class UserSelection(SQLModel):
+    """Users targeted by a bulk write: an id list or a filter, not both."""
+
+    ids: Optional[List[int]] = None
+    filter: Optional[UserFilter] = None
+
+
+class UserBulkUpdate(UserSelection):
+    changes: UserUpdate
+
+
+class UserBulkDelete(UserSelection):
+    # Deactivate the users instead of deleting their rows
+    soft: bool = False
+
+
+class BulkWriteResult(SQLModel):
+    affected: int
+    ids: List[int]
+    not_found: List[int] = []
+
+
+class BulkUserResult(SQLModel):
+    index: int
+    status: str
+    id: Optional[int] = None
+    error: Optional[str] = None
+    message: Optional[str] = None
+
+
+class UserStats(SQLModel):
+    total: int
+    by_role: Dict[str, int]
+    by_active: Dict[str, int]
+    # ISO date -> users created that day, oldest first
+    created_per_day: Dict[str, int]
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
@@ -0,0 +1,271 @@
+"""Production entry point: ``python -m app.server``.
+
+Runs the API under gunicorn with uvicorn workers, one per CPU the
+container may actually use (affinity mask and cgroup CPU quota, not the
+host's core count) unless ``WEB_CONCURRENCY`` says otherwise.
+
+``DB_MAX_CONNECTIONS`` is the connection budget of the whole server: it
+is split between the workers' pools, so ``N`` workers never open more
+than the database allows however the load is spread. More than one
+worker turns ``CHANGE_FEED_NOTIFY`` on, and needs Postgres for it. The
+app is imported once in the master before forking, so the workers share
+its modules copy-on-write; engines, threads and the change listener are
+only started by each worker's lifespan, after the fork. Missing indexes
+are created and the user stats reconciled once, in the master, before
+the workers start (see app/database/init_db.py and
+app/services/user_stats.py). Workers are replaced one at a time after
+``WORKER_MAX_REQUESTS`` (plus jitter), finishing their in-flight
+requests first, to cap memory growth.
+"""
+
+import gc
+import importlib
+import logging
+import math
+import os
+from typing import Optional, Tuple
+
+from gunicorn.app.base import BaseApplication
+
+from app.core.config import settings
+from app.core.logging_config import setup_logging
+from app.core.secrets import secret_cache
+from app.core.startup import startup_report
+
+logger = logging.getLogger(__name__)
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path) as file:
+            return file.read().strip()
+    except OSError:
+        return None
+
+
+def cgroup_cpu_limit(root: str = CGROUP_ROOT) -> Optional[float]:
+    """CPUs allowed by the cgroup quota, ``None`` when unlimited."""
+    # cgroup v2: "<quota> <period>", or "max <period>"
+    cpu_max = _read(os.path.join(root, "cpu.max"))
+    if cpu_max:
+        quota, _, period = cpu_max.partition(" ")
+        if quota == "max":
+            return None
+        return int(quota) / int(period)
+    # cgroup v1: a quota of -1 means unlimited
+    quota = _read(os.path.join(root, "cpu", "cpu.cfs_quota_us"))
+    period = _read(os.path.join(root, "cpu", "cpu.cfs_period_us"))
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+    return None
+
+
+def available_cpus(root: str = CGROUP_ROOT) -> int:
+    if hasattr(os, "sched_getaffinity"):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+    limit = cgroup_cpu_limit(root)
+    if limit is not None:
+        # A 1.5 CPU quota still leaves room for two busy workers
+        cpus = min(cpus, math.ceil(limit))
+    return max(1, cpus)
+
+
+def worker_count(max_connections: int = 0, per_worker: int = 1) -> int:
+    """Workers to start, at most one per ``per_worker`` connections of
+    the budget."""
+    workers = settings.web_concurrency or available_cpus()
+    fit = max_connections // per_worker
+    if max_connections > 0 and fit < workers:
+        fit = max(1, fit)
+        logger.warning(
+            "DB_MAX_CONNECTIONS=%d cannot give %d workers %d "
+            "connection(s) each, starting %d",
+            max_connections,
+            workers,
+            per_worker,
+            fit,
+        )
+        workers = fit
+    return workers
+
+
+def primary_pools() -> int:
+    """Pools each worker opens on the primary.
+
+    Async mode serves requests from the async engine, while the create
+    batcher, the stats folder and the change listener use the sync one:
+    each gets its own pool. Replicas get one pool per worker each, with
+    the same sizing, so a replica with the primary's connection limit
+    stays within the budget too.
+    """
+    return 2 if settings.database_async else 1
+
+
+def split_pool(
+    workers: int,
+    max_connections: int,
+    pool_size: int,
+    max_overflow: int,
+    reserved: int = 0,
+    engines: int = 1,
+) -> Tuple[int, int]:
+    """Per-engine ``(pool_size, max_overflow)`` within the budget.
+
+    Each worker's share, less ``reserved`` connections held outside the
+    pools, is divided between its ``engines``. The configured values are
+    kept when they already fit; otherwise each engine's share is divided
+    in the same size/overflow proportion.
+    """
+    configured = pool_size + max_overflow
+    if max_connections <= 0:
+        return pool_size, max_overflow
+    share = max(1, (max_connections // workers - reserved) // engines)
+    if share >= configured:
+        return pool_size, max_overflow
+    size = max(1, share * pool_size // configured)
+    return size, share - size
+
+
+def share_change_feed(workers: int) -> int:
+    """Worker count the change feed can serve consistently.
+
+    Each worker's feed only sees the writes it commits itself, unless
+    they come through Postgres NOTIFY: it is switched on for more than
+    one worker, and without Postgres a single worker is started.
+    """
+    from app.database.database import database_backend
+
+    if workers == 1 or settings.change_feed_notify:
+        return workers
+    if database_backend() == "postgresql":
+        logger.info(
+            "%d workers share the change feed, enabling CHANGE_FEED_NOTIFY",
+            workers,
+        )
+        settings.change_feed_notify = True
+        return workers
+    logger.warning(
+        "The change feed needs Postgres NOTIFY to span workers, "
+        "starting 1 worker instead of %d",
+        workers,
+    )
+    return 1
+
+
+def reserved_connections() -> int:
+    # The change feed's LISTEN connection lives outside the pool
+    from app.database.database import database_backend
+
+    if settings.change_feed_notify and database_backend() == "postgresql":
+        return 1
+    return 0
+
+
+def apply_pool_budget(workers: int) -> None:
+    """Resize the pool settings before the app (and its engines) load."""
+    reserved = reserved_connections()
+    engines = primary_pools()
+    pool_size, max_overflow = split_pool(
+        workers,
+        settings.db_max_connections,
+        settings.db_pool_size,
+        settings.db_max_overflow,
+        reserved,
+        engines,
+    )
+    settings.db_pool_size = pool_size
+    settings.db_max_overflow = max_overflow
+    logger.info(
+        "%d workers, each with %d pool(s) of %d + %d overflow connections "
+        "(%d at most across the server)",
+        workers,
+        engines,
+        pool_size,
+        max_overflow,
+        workers * (engines * (pool_size + max_overflow) + reserved),
+    )
+
+
+def post_fork(server, worker) -> None:
+    # The log listener thread stays behind in the master
+    setup_logging()
+    # So does the Secret Manager client the master used, e.g. for the
+    # stats reconciliation
+    secret_cache.after_fork()
+
+
+class Server(BaseApplication):
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self) -> None:
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        with startup_report.measure("imports"):
+            app = importlib.import_module("main").app
+        # Keep the collector from touching the preloaded objects, which
+        # would copy their pages into every worker
+        gc.collect()
+        gc.freeze()
+        return app
+
+
+def create_indexes() -> None:
+    if not settings.db_create_indexes_on_start:
+        return
+    from app.database.database import create_standalone_engine
+    from app.database.init_db import ensure_indexes
+
+    engine = create_standalone_engine()
+    try:
+        ensure_indexes(engine)
+    except Exception:
+        # Queries still work without them, only slower
+        logger.exception("Creating the missing indexes failed")
+    finally:
+        engine.dispose()
+
+
+def reconcile_stats() -> None:
+    if not settings.user_stats_reconcile_on_start:
+        return
+    from app.services.user_stats import reconcile_on_deploy
+
+    try:
+        reconcile_on_deploy()
+    except Exception:
+        # The counters stay as they are; serving must not depend on it
+        logger.exception("Reconciling the user stats failed")
+
+
+def main() -> None:
+    setup_logging()
+    workers = share_change_feed(
+        worker_count(settings.db_max_connections, primary_pools())
+    )
+    apply_pool_budget(workers)
+    create_indexes()
+    reconcile_stats()
+    Server(
+        {
+            "bind": f"{settings.host}:{settings.port}",
+            "workers": workers,
+            "worker_class": "uvicorn_worker.UvicornWorker",
+            "preload_app": True,
+            "max_requests": settings.worker_max_requests,
+            "max_requests_jitter": settings.worker_max_requests_jitter,
+            "graceful_timeout": settings.worker_graceful_timeout,
+            "post_fork": post_fork,
+        }
+    ).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Optional, Tuple
+
+from app.exceptions.app_exceptions import InvalidCursor
+from app.schemas.users import UserSortField
+
+NEXT = "n"
+PREV = "p"
+
+
+def encode_cursor(
+    sort: UserSortField, value: Any, user_id: int, direction: str
+) -> str:
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = {"s": sort.value, "v": value, "i": user_id, "d": direction}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(
+    cursor: str, sort: UserSortField
+) -> Tuple[Any, int, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        cursor_sort = UserSortField(payload["s"])
+        value = payload["v"]
+        user_id = int(payload["i"])
+        direction = payload["d"]
+        if cursor_sort in (
+            UserSortField.created_at,
+            UserSortField.updated_at,
+        ):
+            value = datetime.fromisoformat(value)
+    except (
+        binascii.Error,
+        json.JSONDecodeError,
+        UnicodeDecodeError,
+        KeyError,
+        TypeError,
+        ValueError,
+    ):
+        raise InvalidCursor()
+
+    if cursor_sort != sort or direction not in (NEXT, PREV):
+        raise InvalidCursor()
+    return value, user_id, direction
+
+
+def cursor_value(user: Any, sort: UserSortField) -> Any:
+    return getattr(user, sort.value)
+
+
+def make_cursor(
+    user: Optional[Any], sort: UserSortField, direction: str
+) -> Optional[str]:
+    if user is None:
+        return None
+    return encode_cursor(
+        sort, cursor_value(user, sort), user.id, direction
+    )
@@ -0,0 +1,177 @@
+"""Group commit for ``POST /users``.
+
+With ``CREATE_BATCHING`` on, create requests are handed to one writer
+thread instead of each committing its own transaction. The writer waits
+up to ``CREATE_BATCH_LINGER_MS`` after the oldest pending request for
+others to arrive, then inserts up to ``CREATE_BATCH_MAX_SIZE`` of them
+with one multi-row ``INSERT ... RETURNING`` and a single commit, so a
+burst of signups pays for one fsync per batch rather than one per user.
+Every caller still gets its own ``User`` or its own conflict error.
+
+The writer uses the sync engine in both modes; async routes await the
+result without holding a threadpool worker, so they form larger batches.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Tuple
+
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.logging_config import SAMPLED
+from app.core.metrics import Histogram
+from app.database.database import get_engine
+from app.exceptions.app_exceptions import AppException
+from app.models.user import User
+from app.schemas.users import UserCreate
+from app.services.user_bulk import insert_users
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+PendingCreate = Tuple[UserCreate, Future, float]
+
+
+class CreateBatcher:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        max_batch_size: int,
+        linger: float,
+    ):
+        self.session_factory = session_factory
+        self.max_batch_size = max_batch_size
+        self.linger = linger
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait = Histogram()
+        self.created = 0
+        self.failed = 0
+        self._pending: List[PendingCreate] = []
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    def submit(self, user_create: UserCreate) -> Future:
+        future: Future = Future()
+        with self._condition:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(
+                    target=self._run, name="create-batcher", daemon=True
+                )
+                self._thread.start()
+            self._pending.append((user_create, future, time.monotonic()))
+            self._condition.notify()
+        return future
+
+    def stop(self) -> None:
+        """Flush what is pending and stop the writer thread."""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def _next_batch(self) -> List[PendingCreate]:
+        with self._condition:
+            while not self._pending and not self._stopping:
+                self._condition.wait()
+            # Linger is counted from the oldest request, so one that queued
+            # behind the previous flush is not made to wait twice
+            while (
+                self._pending
+                and len(self._pending) < self.max_batch_size
+                and not self._stopping
+            ):
+                oldest = self._pending[0][2]
+                remaining = oldest + self.linger - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            batch = self._pending[: self.max_batch_size]
+            del self._pending[: self.max_batch_size]
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            self._flush(batch)
+
+    def _flush(self, batch: List[PendingCreate]) -> None:
+        flushed_at = time.monotonic()
+        for _, _, queued_at in batch:
+            self.queue_wait.observe(flushed_at - queued_at)
+        self.batch_sizes.observe(len(batch))
+        try:
+            with self.session_factory() as session:
+                outcomes = insert_users(
+                    [(index, row[0]) for index, row in enumerate(batch)],
+                    session,
+                )
+        except Exception as exc:
+            logger.exception("Group commit of %d users failed", len(batch))
+            self.failed += len(batch)
+            for _, future, _ in batch:
+                future.set_exception(exc)
+            return
+
+        created = 0
+        for index, (user_create, future, _) in enumerate(batch):
+            outcome = outcomes[index]
+            if isinstance(outcome, AppException):
+                logger.warning(
+                    "Attempt to create user %s <%s> failed: %s",
+                    user_create.username,
+                    user_create.email,
+                    outcome.message,
+                    extra=SAMPLED,
+                )
+                future.set_exception(outcome)
+            else:
+                created += 1
+                future.set_result(outcome)
+        self.created += created
+        self.failed += len(batch) - created
+        logger.info(
+            "Group commit: %d created, %d failed",
+            created,
+            len(batch) - created,
+        )
+
+    def metric_lines(self) -> List[str]:
+        labels = 'mode="group"'
+        return [
+            "# HELP user_create_batch_size Creates per group commit.",
+            "# TYPE user_create_batch_size histogram",
+            *self.batch_sizes.lines("user_create_batch_size", labels),
+            "# HELP user_create_batch_wait_seconds Queue time before flush.",
+            "# TYPE user_create_batch_wait_seconds histogram",
+            *self.queue_wait.lines("user_create_batch_wait_seconds", labels),
+            "# HELP user_create_batched_total Batched creates by outcome.",
+            "# TYPE user_create_batched_total counter",
+            f'user_create_batched_total{{outcome="created"}} {self.created}',
+            f'user_create_batched_total{{outcome="failed"}} {self.failed}',
+        ]
+
+
+create_batcher = CreateBatcher(
+    lambda: Session(get_engine()),
+    max_batch_size=settings.create_batch_max_size,
+    linger=settings.create_batch_linger_ms / 1000,
+)
+
+
+def create_user_batched(user_create: UserCreate) -> User:
+    return create_batcher.submit(user_create).result()
+
+
+async def acreate_user_batched(user_create: UserCreate) -> User:
+    return await asyncio.wrap_future(create_batcher.submit(user_create))
@@ -0,0 +1,331 @@
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Tuple, Union
+
+from pydantic import ValidationError
+from sqlalchemy import delete, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+
+from app.exceptions.app_exceptions import AppException
+from app.exceptions.user_exceptions import (
+    InvalidBulkSelection,
+    NoFieldsToUpdate,
+    UsernameAlreadyExists,
+)
+from app.models.user import User
+from app.schemas.users import (
+    BulkUserResult,
+    BulkWriteResult,
+    UserBulkDelete,
+    UserBulkUpdate,
+    UserCreate,
+    UserSelection,
+)
+from app.services.user_cache import user_cache
+from app.services.user_changes import (
+    CREATED,
+    DELETED,
+    UPDATED,
+    record_change,
+)
+from app.services.user_count import total_count_cache
+from app.services.user_query import apply_user_filters, filter_key
+from app.services.user_stats import (
+    STATS_COLUMNS,
+    added,
+    execute_tracking_moves,
+    moved,
+    moves_stats,
+    record_stats,
+    removed,
+)
+from app.services.users import (
+    conflict_for,
+    conflict_from_integrity_error,
+    existing_user_keys,
+    is_unique_violation,
+    update_changes,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def bulk_error(index: int, exc: AppException) -> BulkUserResult:
+    return BulkUserResult(
+        index=index,
+        status="error",
+        error=type(exc).__name__,
+        message=exc.message,
+    )
+
+
+def validate_bulk_row(
+    index: int, raw: Any
+) -> Union[UserCreate, BulkUserResult]:
+    try:
+        return UserCreate.model_validate(raw)
+    except ValidationError as exc:
+        details = "; ".join(
+            f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}"
+            for error in exc.errors()
+        )
+        return BulkUserResult(
+            index=index,
+            status="error",
+            error="ValidationError",
+            message=details or "Invalid user payload",
+        )
+
+
+def bulk_result(
+    index: int, outcome: Union[User, AppException]
+) -> BulkUserResult:
+    if isinstance(outcome, AppException):
+        return bulk_error(index, outcome)
+    return BulkUserResult(index=index, status="created", id=outcome.id)
+
+
+def _insert_rows(
+    rows: List[Tuple[int, UserCreate]], session: Session
+) -> List[User]:
+    now = datetime.now()
+    values = [
+        {**user_create.model_dump(), "created_at": now, "updated_at": now}
+        for _, user_create in rows
+    ]
+    # insertmanyvalues turns this into multi-row INSERT ... RETURNING
+    statement = insert(User).returning(
+        *User.__table__.columns, sort_by_parameter_order=True
+    )
+    inserted = session.execute(statement, values).mappings()
+    return [User(**row) for row in inserted]
+
+
+def _insert_one_by_one(
+    rows: List[Tuple[int, UserCreate]], session: Session
+) -> Dict[int, Union[User, AppException]]:
+    """Fallback when a concurrent writer claimed a key mid-chunk."""
+    outcomes: Dict[int, Union[User, AppException]] = {}
+    for index, user_create in rows:
+        try:
+            with session.begin_nested():
+                (user,) = _insert_rows([(index, user_create)], session)
+        except IntegrityError as exc:
+            if not is_unique_violation(exc):
+                raise
+            outcomes[index] = (
+                conflict_for(
+                    user_create,
+                    *existing_user_keys([user_create], session),
+                )
+                or conflict_from_integrity_error(exc)
+                or UsernameAlreadyExists()
+            )
+            continue
+        outcomes[index] = user
+    return outcomes
+
+
+def insert_users(
+    rows: List[Tuple[int, UserCreate]], session: Session
+) -> Dict[int, Union[User, AppException]]:
+    """Insert ``(index, UserCreate)`` rows in one transaction and return
+    the created ``User`` or the conflict for each index, instead of
+    aborting the whole batch on the first duplicate.
+    """
+    if not rows:
+        return {}
+
+    taken_usernames, taken_emails = existing_user_keys(
+        [user_create for _, user_create in rows], session
+    )
+    outcomes: Dict[int, Union[User, AppException]] = {}
+    to_insert = []
+    for index, user_create in rows:
+        conflict = conflict_for(user_create, taken_usernames, taken_emails)
+        if conflict:
+            outcomes[index] = conflict
+            continue
+        # Later duplicates inside the same batch lose to the first one
+        taken_usernames.add(user_create.username)
+        taken_emails.add(user_create.email)
+        to_insert.append((index, user_create))
+
+    if to_insert:
+        try:
+            users = _insert_rows(to_insert, session)
+        except IntegrityError:
+            session.rollback()
+            logger.warning(
+                "Bulk insert hit a concurrent conflict, retrying row by row"
+            )
+            inserted = _insert_one_by_one(to_insert, session)
+        else:
+            inserted = {
+                index: user for (index, _), user in zip(to_insert, users)
+            }
+        created = [
+            outcome for outcome in inserted.values()
+            if isinstance(outcome, User)
+        ]
+        record_stats(session, added(created))
+        for user in created:
+            record_change(session, CREATED, user.id, user)
+        session.commit()
+        outcomes.update(inserted)
+        for user in created:
+            user_cache.invalidate(user.id)
+        total_count_cache.invalidate()
+    return outcomes
+
+
+def create_users_bulk(
+    rows: List[Tuple[int, UserCreate]], session: Session
+) -> List[BulkUserResult]:
+    """Create one chunk of ``(index, UserCreate)`` rows in a single
+    transaction, reporting conflicts per row instead of aborting.
+    """
+    outcomes = insert_users(rows, session)
+    results = [bulk_result(index, outcomes[index]) for index, _ in rows]
+    created = sum(result.status == "created" for result in results)
+    if results:
+        logger.info(
+            "Bulk create chunk: %d created, %d failed",
+            created,
+            len(results) - created,
+        )
+    return results
+
+
+def check_selection(selection: UserSelection) -> None:
+    if (selection.ids is None) == (selection.filter is None):
+        raise InvalidBulkSelection("Provide either ids or a filter.")
+    if selection.ids is not None and not selection.ids:
+        raise InvalidBulkSelection("ids must not be empty.")
+    # An empty filter would silently target the whole table
+    if selection.filter is not None and filter_key(selection.filter) == "all":
+        raise InvalidBulkSelection("filter must set at least one field.")
+
+
+def _id_chunks(
+    selection: UserSelection, session: Session, chunk_size: int
+) -> Iterator[List[int]]:
+    if selection.ids is not None:
+        # Sorted so concurrent bulk writes lock rows in the same order
+        ids = sorted(set(selection.ids))
+        for start in range(0, len(ids), chunk_size):
+            yield ids[start : start + chunk_size]
+        return
+
+    # Walk the matching ids on the primary key, one chunk at a time
+    last_id = None
+    while True:
+        statement = apply_user_filters(select(User.id), selection.filter)
+        if last_id is not None:
+            statement = statement.where(User.id > last_id)
+        ids = list(
+            session.exec(statement.order_by(User.id).limit(chunk_size)).all()
+        )
+        if ids:
+            yield ids
+        if len(ids) < chunk_size:
+            return
+        last_id = ids[-1]
+
+
+def _write_in_chunks(
+    selection: UserSelection,
+    base_statement: Any,
+    kind: str,
+    session: Session,
+    chunk_size: int,
+    track_moves: bool = False,
+) -> BulkWriteResult:
+    """Run one ``UPDATE``/``DELETE ... RETURNING`` per chunk and commit
+    after each, so no transaction holds more than ``chunk_size`` row
+    locks. The filter is re-applied to every statement: a row that
+    stopped matching since its id was read is left alone.
+
+    With ``track_moves``, the update also returns the chunk's previous
+    role/active so the stats can follow it.
+    """
+    check_selection(selection)
+    affected: List[int] = []
+    for chunk in _id_chunks(selection, session, chunk_size):
+        statement = apply_user_filters(
+            base_statement.where(User.id.in_(chunk)), selection.filter
+        ).returning(*STATS_COLUMNS)
+        if track_moves:
+            rows = execute_tracking_moves(
+                session, statement, User.id.in_(chunk)
+            )
+        else:
+            rows = session.execute(statement).mappings().all()
+        if kind == DELETED:
+            record_stats(session, removed(rows))
+        elif track_moves:
+            record_stats(session, moved(rows))
+        chunk_ids = [row["id"] for row in rows]
+        for user_id in chunk_ids:
+            record_change(session, kind, user_id)
+        session.commit()
+        affected.extend(chunk_ids)
+
+    for user_id in affected:
+        user_cache.invalidate(user_id)
+    not_found = []
+    if selection.ids is not None:
+        not_found = sorted(set(selection.ids) - set(affected))
+    return BulkWriteResult(
+        affected=len(affected), ids=sorted(affected), not_found=not_found
+    )
+
+
+def update_users_bulk(
+    bulk_update: UserBulkUpdate, session: Session, chunk_size: int
+) -> BulkWriteResult:
+    changes = update_changes(bulk_update.changes)
+    if not changes:
+        raise NoFieldsToUpdate()
+    now = datetime.now()
+    result = _write_in_chunks(
+        bulk_update,
+        update(User).values(**changes, updated_at=now),
+        UPDATED,
+        session,
+        chunk_size,
+        track_moves=moves_stats(changes),
+    )
+    if "role" in changes or "active" in changes:
+        total_count_cache.invalidate()
+    logger.info("Bulk update: %d users updated", result.affected)
+    return result
+
+
+def delete_users_bulk(
+    bulk_delete: UserBulkDelete, session: Session, chunk_size: int
+) -> BulkWriteResult:
+    if bulk_delete.soft:
+        statement = update(User).values(
+            active=False, updated_at=datetime.now()
+        )
+        kind = UPDATED
+    else:
+        statement = delete(User)
+        kind = DELETED
+    result = _write_in_chunks(
+        bulk_delete,
+        statement,
+        kind,
+        session,
+        chunk_size,
+        track_moves=bulk_delete.soft,
+    )
+    total_count_cache.invalidate()
+    logger.info(
+        "Bulk %s: %d users",
+        "deactivate" if bulk_delete.soft else "delete",
+        result.affected,
+    )
+    return result
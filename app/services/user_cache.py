@@ -0,0 +1,154 @@
+import logging
+from typing import Dict, List, Optional, Union
+
+from app.core.cache import CacheStats, MemoryCache, RedisCache, redis_client
+from app.core.config import settings
+from app.models.user import User
+from app.schemas.users import UserRead
+
+logger = logging.getLogger(__name__)
+
+# Stored for IDs that do not exist, so enumeration scans stay off the DB
+NOT_FOUND_MARKER = b"-"
+# Left by invalidate() for a few seconds: reads treat it as a miss, and
+# fills only add to empty keys, so a read that started before a write
+# cannot put the pre-write row back once the write has invalidated it
+TOMBSTONE = b"!"
+
+
+class UserNotFoundMarker:
+    pass
+
+
+USER_NOT_FOUND = UserNotFoundMarker()
+
+
+class UserCache:
+    """Read-through cache of serialized ``UserRead`` payloads by ID."""
+
+    def __init__(
+        self,
+        backend: Optional[Union[MemoryCache, RedisCache]],
+        stats: CacheStats,
+        ttl: float,
+        not_found_ttl: float,
+        tombstone_ttl: float = 5.0,
+    ):
+        self.backend = backend
+        self.stats = stats
+        self.ttl = ttl
+        self.not_found_ttl = not_found_ttl
+        self.tombstone_ttl = tombstone_ttl
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    def get(
+        self, user_id: int
+    ) -> Optional[Union[UserRead, UserNotFoundMarker]]:
+        if self.backend is None:
+            return None
+        try:
+            payload = self.backend.get(f"user:{user_id}")
+        except Exception as exc:
+            logger.warning("User cache read failed: %s", exc)
+            payload = None
+        if payload is None or payload == TOMBSTONE:
+            self.stats.increment("misses")
+            return None
+        self.stats.increment("hits")
+        if payload == NOT_FOUND_MARKER:
+            return USER_NOT_FOUND
+        return UserRead.model_validate_json(payload)
+
+    def get_many(
+        self, user_ids: List[int]
+    ) -> Dict[int, Union[UserRead, UserNotFoundMarker]]:
+        """Cached entries for ``user_ids``; misses are simply absent."""
+        if self.backend is None or not user_ids:
+            return {}
+        try:
+            payloads = self.backend.get_many(
+                [f"user:{user_id}" for user_id in user_ids]
+            )
+        except Exception as exc:
+            logger.warning("User cache read failed: %s", exc)
+            payloads = [None] * len(user_ids)
+        found = {}
+        for user_id, payload in zip(user_ids, payloads):
+            if payload is None or payload == TOMBSTONE:
+                continue
+            if payload == NOT_FOUND_MARKER:
+                found[user_id] = USER_NOT_FOUND
+            else:
+                found[user_id] = UserRead.model_validate_json(payload)
+        self.stats.increment("hits", len(found))
+        self.stats.increment("misses", len(user_ids) - len(found))
+        return found
+
+    def set(self, user: Union[User, UserRead]) -> None:
+        if self.backend is None:
+            return
+        payload = UserRead.model_validate(user).model_dump_json()
+        self._write(user.id, payload.encode("utf-8"), self.ttl)
+
+    def set_not_found(self, user_id: int) -> None:
+        if self.backend is None or self.not_found_ttl <= 0:
+            return
+        self._write(user_id, NOT_FOUND_MARKER, self.not_found_ttl)
+
+    def invalidate(self, user_id: int) -> None:
+        if self.backend is None:
+            return
+        self.stats.increment("invalidations")
+        try:
+            self.backend.set(
+                f"user:{user_id}", TOMBSTONE, self.tombstone_ttl
+            )
+        except Exception as exc:
+            logger.warning("User cache invalidation failed: %s", exc)
+
+    def snapshot(self) -> dict:
+        data = self.stats.snapshot()
+        data["backend"] = settings.user_cache_backend
+        if isinstance(self.backend, MemoryCache):
+            data["entries"] = len(self.backend)
+        return data
+
+    def _write(self, user_id: int, payload: bytes, ttl: float) -> None:
+        try:
+            self.backend.add(f"user:{user_id}", payload, ttl)
+        except Exception as exc:
+            logger.warning("User cache write failed: %s", exc)
+
+
+def build_user_cache() -> UserCache:
+    stats = CacheStats()
+    backend = None
+    if settings.user_cache_backend == "memory":
+        backend = MemoryCache(settings.user_cache_max_entries, stats)
+    elif settings.user_cache_backend == "redis":
+        if settings.database_async:
+            # The async services run on the event loop's thread (see
+            # app/services/users_async.py), where every call of the
+            # blocking client would stall the loop
+            raise RuntimeError(
+                "USER_CACHE_BACKEND=redis is not supported with "
+                "DATABASE_ASYNC; use the memory backend"
+            )
+        backend = RedisCache(
+            redis_client(settings.user_cache_redis_url),
+            stats,
+            prefix=settings.user_cache_redis_prefix,
+        )
+    return UserCache(
+        backend,
+        stats,
+        ttl=settings.user_cache_ttl,
+        not_found_ttl=settings.user_cache_not_found_ttl,
+        tombstone_ttl=settings.user_cache_tombstone_ttl,
+    )
+
+
+user_cache = build_user_cache()
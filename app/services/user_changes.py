@@ -0,0 +1,449 @@
+"""Change feed of user mutations, served at ``GET /users/changes``.
+
+The write services call ``record_change`` with their session; the change
+is published only once that transaction commits, into a ring buffer of
+the last ``CHANGE_FEED_BUFFER_SIZE`` events shared by every subscriber.
+Readers wait on the buffer itself, so a thousand open streams cost no
+database queries.
+
+Event ids are ``<epoch>:<seq>``. On its own a process numbers its events
+itself and ``epoch`` is random, so its ids mean nothing to any other
+process: a client resuming from an id of another epoch, or one older
+than the buffer, is sent a ``reset`` event and should reload what it
+tracks. More than one process therefore needs ``CHANGE_FEED_NOTIFY``.
+
+With ``CHANGE_FEED_NOTIFY`` on Postgres, the writing transaction draws a
+``seq`` per change from the ``user_change_seq`` sequence and sends
+``[seq, kind, user_id]`` with ``pg_notify``; every process appends the
+changes from a ``LISTEN`` connection, loading the changed rows itself,
+and the epoch is shared. Postgres delivers notifications in commit order
+to every listener, so each buffer holds the same events in the same
+order (not necessarily ``seq`` order, as sequence values are drawn
+before commit) and an id resumes at the same point in any process.
+"""
+
+import asyncio
+import logging
+import secrets
+import select
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+import orjson
+from sqlalchemy import event, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel import Session
+from sqlmodel import select as select_rows
+
+from app.core.config import settings
+from app.models.user import User
+from app.schemas.users import UserRead
+
+logger = logging.getLogger(__name__)
+
+CREATED = "created"
+UPDATED = "updated"
+DELETED = "deleted"
+RESET = "reset"
+
+NOTIFY_CHANNEL = "user_changes"
+# Postgres rejects a NOTIFY payload of 8000 bytes or more, which would
+# abort the writing transaction
+NOTIFY_PAYLOAD_LIMIT = 7500
+# Epoch of the ids drawn from user_change_seq, the same in every process
+SHARED_EPOCH = "db"
+PENDING_CHANGES = "pending_user_changes"
+
+USER_FIELDS = tuple(UserRead.model_fields)
+
+
+class ChangeEvent:
+    """A change as buffered: ``seq`` is its id, ``position`` its place
+    in this process's buffer."""
+
+    __slots__ = ("kind", "position", "seq", "time", "user", "user_id")
+
+    def __init__(
+        self,
+        seq: int,
+        position: int,
+        kind: str,
+        user_id: int,
+        user: Optional[dict],
+    ):
+        self.seq = seq
+        self.position = position
+        self.kind = kind
+        self.user_id = user_id
+        self.user = user
+        self.time = datetime.now()
+
+    def as_dict(self, epoch: str) -> dict:
+        return {
+            "id": f"{epoch}:{self.seq}",
+            "type": self.kind,
+            "user_id": self.user_id,
+            "user": self.user,
+            "time": self.time,
+        }
+
+
+class ChangeFeed:
+    """Ring buffer of recent changes with subscribers waiting on it.
+
+    Subscribers track a buffer position; ids are mapped to and from
+    positions, which only coincide while the feed numbers events itself.
+    Appends may come from any thread (sync routes, the NOTIFY listener);
+    waiting subscribers are woken on their own event loop.
+    """
+
+    def __init__(self, size: int):
+        self.epoch = secrets.token_hex(4)
+        self._events: Deque[ChangeEvent] = deque(maxlen=size)
+        self._position = 0
+        # Position 0 (before the first event) until the buffer wraps
+        self._positions: Dict[int, int] = {0: 0}
+        self._lock = threading.Lock()
+        self._waiters: Set[Tuple[asyncio.AbstractEventLoop, Any]] = set()
+        # Connection failures of the NOTIFY listener feeding this buffer
+        self.listener_errors = 0
+
+    def share(self, epoch: str = SHARED_EPOCH) -> None:
+        """Take ids from the writers from now on (NOTIFY mode)."""
+        with self._lock:
+            self.epoch = epoch
+            # Another process's "nothing yet" is not this one's
+            self._positions.pop(0, None)
+
+    @property
+    def last_position(self) -> int:
+        return self._position
+
+    def event_id(self, position: int) -> str:
+        """Id of the event at ``position``, as sent to clients."""
+        with self._lock:
+            seq = 0
+            if self._events and position >= self._events[0].position:
+                index = position - self._events[0].position
+                seq = self._events[min(index, len(self._events) - 1)].seq
+        return f"{self.epoch}:{seq}"
+
+    def parse_event_id(self, event_id: Optional[str]) -> Optional[int]:
+        """Buffer position of an id still in this feed, ``None`` otherwise."""
+        if not event_id:
+            return None
+        epoch, _, seq = event_id.partition(":")
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        with self._lock:
+            return self._positions.get(int(seq))
+
+    def append(
+        self,
+        kind: str,
+        user_id: int,
+        user: Optional[dict] = None,
+        seq: Optional[int] = None,
+    ) -> ChangeEvent:
+        with self._lock:
+            self._position += 1
+            if seq is None:
+                seq = self._position
+            if len(self._events) == self._events.maxlen:
+                evicted = self._events[0]
+                self._positions.pop(evicted.seq, None)
+                # Resuming from before the oldest event is no longer safe
+                self._positions.pop(0, None)
+            change = ChangeEvent(seq, self._position, kind, user_id, user)
+            self._events.append(change)
+            self._positions[seq] = self._position
+            waiters = list(self._waiters)
+            self._waiters.clear()
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, waiter)
+            except RuntimeError:
+                # The subscriber's loop has shut down
+                pass
+        return change
+
+    def _since(self, position: int) -> Optional[List[ChangeEvent]]:
+        if position >= self._position:
+            return []
+        if not self._events or self._events[0].position > position + 1:
+            # Events after ``position`` have already left the buffer
+            return None
+        # Subscribers are usually near the tail: walk back from the newest
+        newer = []
+        for change in reversed(self._events):
+            if change.position <= position:
+                break
+            newer.append(change)
+        newer.reverse()
+        return newer
+
+    def since(self, position: int) -> Optional[List[ChangeEvent]]:
+        """Events after ``position``; ``None`` when some were overwritten."""
+        with self._lock:
+            return self._since(position)
+
+    async def wait(
+        self, position: int, timeout: float
+    ) -> Optional[List[ChangeEvent]]:
+        """Events after ``position``, waiting up to ``timeout`` for the
+        first."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            events = self._since(position)
+            if events != []:
+                return events
+            waiter = loop.create_future()
+            entry = (loop, waiter)
+            self._waiters.add(entry)
+        try:
+            await asyncio.wait({waiter}, timeout=timeout)
+        finally:
+            with self._lock:
+                self._waiters.discard(entry)
+        return self.since(position)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "epoch": self.epoch,
+                "last_id": self._events[-1].seq if self._events else 0,
+                "last_position": self._position,
+                "buffered": len(self._events),
+                "subscribers_waiting": len(self._waiters),
+                "listener_errors": self.listener_errors,
+            }
+
+
+def _wake(waiter) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+change_feed = ChangeFeed(settings.change_feed_buffer_size)
+
+
+def user_data(user: Any) -> dict:
+    return {name: getattr(user, name) for name in USER_FIELDS}
+
+
+def record_change(
+    session: Session, kind: str, user_id: int, user: Any = None
+) -> None:
+    """Queue a change on ``session``; it is published on commit."""
+    session.info.setdefault(PENDING_CHANGES, []).append(
+        (kind, user_id, None if user is None else user_data(user))
+    )
+
+
+def _notify_enabled(session: Session) -> bool:
+    return (
+        settings.change_feed_notify
+        and session.get_bind().dialect.name == "postgresql"
+    )
+
+
+def _notify_payloads(changes: List[tuple]) -> List[bytes]:
+    """Pack changes into as few NOTIFY payloads as fit the size limit."""
+    payloads, current = [], []
+    size = 2
+    for change in changes:
+        encoded = orjson.dumps(change)
+        if current and size + len(encoded) + 1 > NOTIFY_PAYLOAD_LIMIT:
+            payloads.append(b"[" + b",".join(current) + b"]")
+            current, size = [], 2
+        current.append(encoded)
+        size += len(encoded) + 1
+    if current:
+        payloads.append(b"[" + b",".join(current) + b"]")
+    return payloads
+
+
+def _next_seqs(session: Session, count: int) -> List[int]:
+    return sorted(
+        session.execute(
+            text(
+                "SELECT nextval('user_change_seq') "
+                "FROM generate_series(1, :count)"
+            ),
+            {"count": count},
+        ).scalars()
+    )
+
+
+@event.listens_for(Session, "before_commit")
+def _notify_changes(session: Session) -> None:
+    changes = session.info.get(PENDING_CHANGES)
+    if not changes or not _notify_enabled(session):
+        return
+    # Only ids travel: rows could overflow the payload limit, and the
+    # listeners load them anyway
+    rows = [
+        (seq, kind, user_id)
+        for seq, (kind, user_id, _) in zip(
+            _next_seqs(session, len(changes)), changes
+        )
+    ]
+    # NOTIFY is transactional: listeners see it only if the commit lands
+    for payload in _notify_payloads(rows):
+        session.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": NOTIFY_CHANNEL, "payload": payload.decode("utf-8")},
+        )
+    session.info.pop(PENDING_CHANGES)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_changes(session: Session) -> None:
+    for kind, user_id, user in session.info.pop(PENDING_CHANGES, ()):
+        change_feed.append(kind, user_id, user)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_changes(session: Session, previous_transaction) -> None:
+    if not previous_transaction.nested:
+        session.info.pop(PENDING_CHANGES, None)
+
+
+class ChangeListener:
+    """``LISTEN`` on a dedicated connection and append every change
+    notified by any process to the local feed, with the row as it is
+    when the notification arrives."""
+
+    # Failures in a row after which they are logged as errors
+    ESCALATE_AFTER = 3
+
+    def __init__(self, engine, feed: ChangeFeed):
+        self.engine = engine
+        self.feed = feed
+        feed.share()
+        # What a dropped connection or a database restart raises
+        self.connection_errors = (
+            SQLAlchemyError,
+            OSError,
+            engine.dialect.loaded_dbapi.Error,
+        )
+        self._failures = 0
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name="change-listener", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                self._listen()
+            except self.connection_errors as exc:
+                self._failures += 1
+                self.feed.listener_errors += 1
+                level = (
+                    logging.ERROR
+                    if self._failures >= self.ESCALATE_AFTER
+                    else logging.WARNING
+                )
+                logger.log(
+                    level,
+                    "Change listener lost its connection (%d in a row): %s",
+                    self._failures,
+                    exc,
+                )
+                self._stopping.wait(min(self._failures, 30))
+            except Exception:
+                logger.exception("Change listener stopped")
+                raise
+
+    def _listen(self) -> None:
+        connection = self.engine.raw_connection()
+        try:
+            driver_connection = connection.driver_connection
+            driver_connection.autocommit = True
+            with driver_connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+            logger.info("Listening for user changes on %s", NOTIFY_CHANNEL)
+            self._failures = 0
+            while not self._stopping.is_set():
+                ready, _, _ = select.select([driver_connection], [], [], 1.0)
+                if not ready:
+                    continue
+                driver_connection.poll()
+                while driver_connection.notifies:
+                    notify = driver_connection.notifies.pop(0)
+                    self.deliver(orjson.loads(notify.payload))
+        finally:
+            connection.invalidate()
+
+    def _load_users(self, user_ids: Iterable[int]) -> Dict[int, dict]:
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
+        with Session(self.engine) as session:
+            users = session.exec(
+                select_rows(User).where(User.id.in_(user_ids))
+            ).all()
+        return {user.id: user_data(user) for user in users}
+
+    def deliver(self, changes: List[list]) -> None:
+        """Append one notification's ``[seq, kind, user_id]`` changes."""
+        users = self._load_users(
+            {user_id for _, kind, user_id in changes if kind != DELETED}
+        )
+        for seq, kind, user_id in changes:
+            # A row deleted since is sent without data, like a delete
+            user = None if kind == DELETED else users.get(user_id)
+            self.feed.append(kind, user_id, user, seq=seq)
+
+
+def sse_message(
+    change: Optional[ChangeEvent], feed: ChangeFeed, position: int = 0
+) -> bytes:
+    """One ``text/event-stream`` message; ``None`` is a ``reset`` to
+    ``position``."""
+    if change is None:
+        data = {"id": feed.event_id(position), "type": RESET}
+        event_id, kind = data["id"], RESET
+    else:
+        data = change.as_dict(feed.epoch)
+        event_id, kind = data["id"], change.kind
+    return (
+        f"id: {event_id}\nevent: {kind}\ndata: ".encode()
+        + orjson.dumps(data)
+        + b"\n\n"
+    )
+
+
+async def iter_changes(feed: ChangeFeed, last_event_id: Optional[str]):
+    """SSE stream from ``last_event_id`` (or from now), with comment
+    heartbeats so proxies keep idle streams open."""
+    position = feed.parse_event_id(last_event_id)
+    if position is None:
+        # Take the position before yielding, or changes made while the
+        # client reads the reset would be skipped
+        position = feed.last_position
+        if last_event_id:
+            yield sse_message(None, feed, position)
+
+    while True:
+        events = await feed.wait(position, settings.change_feed_heartbeat)
+        if events is None:
+            position = feed.last_position
+            yield sse_message(None, feed, position)
+        elif not events:
+            yield b": keepalive\n\n"
+        else:
+            yield b"".join(sse_message(change, feed) for change in events)
+            position = events[-1].position
@@ -0,0 +1,107 @@
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func, text
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.models.user import User
+from app.schemas.common import TotalMode
+from app.schemas.users import UserFilter
+from app.services.user_query import apply_user_filters, filter_key
+
+logger = logging.getLogger(__name__)
+
+ALL_USERS = "all"
+
+# reltuples is -1 until the table has been vacuumed/analyzed at least once
+ESTIMATE_STATEMENT = text(
+    "SELECT reltuples::bigint FROM pg_class "
+    "WHERE oid = to_regclass(:table_name)"
+)
+
+
+class TotalCountCache:
+    """Process-local cache of exact totals, keyed by query shape."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str = ALL_USERS) -> Optional[int]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            total, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            return total
+
+    def set(self, total: int, key: str = ALL_USERS) -> None:
+        with self._lock:
+            self._entries[key] = (total, time.monotonic() + self.ttl)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+total_count_cache = TotalCountCache(settings.total_count_cache_ttl)
+
+
+def _exact_count(
+    session: Session, filters: Optional[UserFilter] = None
+) -> int:
+    statement = apply_user_filters(
+        select(func.count()).select_from(User), filters
+    )
+    return session.exec(statement).one()
+
+
+def _estimated_count(session: Session) -> Optional[int]:
+    if session.get_bind().dialect.name != "postgresql":
+        return None
+    table_name = f'"{User.__tablename__}"'
+    estimate = session.execute(
+        ESTIMATE_STATEMENT, {"table_name": table_name}
+    ).scalar()
+    if estimate is None or estimate < 0:
+        return None
+    return int(estimate)
+
+
+def count_users(
+    session: Session,
+    mode: TotalMode = TotalMode.exact,
+    filters: Optional[UserFilter] = None,
+) -> Tuple[int, bool]:
+    """Return ``(total, exact)`` for the user table, or the rows matching
+    ``filters``.
+
+    ``cached`` serves a recent exact count (reported as not exact, since
+    another instance may have written since), and ``estimate`` reads the
+    planner statistics on Postgres; both fall back to an exact count.
+    The table-wide estimate cannot be narrowed, so filtered counts are
+    always exact or cached.
+    """
+    key = filter_key(filters)
+    if mode == TotalMode.cached:
+        total = total_count_cache.get(key)
+        if total is not None:
+            return total, False
+        total = _exact_count(session, filters)
+        total_count_cache.set(total, key)
+        return total, True
+
+    if mode == TotalMode.estimate and key == ALL_USERS:
+        total = _estimated_count(session)
+        if total is not None:
+            return total, False
+        logger.debug("Planner estimate unavailable, counting users")
+
+    return _exact_count(session, filters), True
@@ -0,0 +1,112 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from enum import Enum
+from typing import AsyncIterator, Iterable, Iterator, List, Optional
+
+from sqlalchemy import Engine, select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+from app.models.user import RoleEnum, User
+from app.schemas.users import ExportFormat, UserRead
+
+EXPORT_COLUMNS = list(UserRead.model_fields)
+
+MEDIA_TYPES = {
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.csv: "text/csv",
+}
+
+
+def export_statement(
+    role: Optional[RoleEnum] = None,
+    active: Optional[bool] = None,
+    since: Optional[datetime] = None,
+):
+    columns = [User.__table__.c[name] for name in EXPORT_COLUMNS]
+    statement = select(*columns)
+    if role is not None:
+        statement = statement.where(User.role == role)
+    if active is not None:
+        statement = statement.where(User.active == active)
+    if since is not None:
+        # Served by the (updated_at, id) index
+        statement = statement.where(User.updated_at >= since).order_by(
+            User.updated_at, User.id
+        )
+    else:
+        statement = statement.order_by(User.id)
+    return statement.execution_options(yield_per=settings.export_batch_size)
+
+
+def _plain(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def encode_rows(rows: List, export_format: ExportFormat) -> bytes:
+    if export_format == ExportFormat.csv:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerows([[_plain(value) for value in row] for row in rows])
+        return buffer.getvalue().encode("utf-8")
+    return "".join(
+        json.dumps(
+            {name: _plain(value) for name, value in zip(EXPORT_COLUMNS, row)},
+            separators=(",", ":"),
+        )
+        + "\n"
+        for row in rows
+    ).encode("utf-8")
+
+
+def export_header(export_format: ExportFormat) -> bytes:
+    if export_format == ExportFormat.csv:
+        return (",".join(EXPORT_COLUMNS) + "\r\n").encode("utf-8")
+    return b""
+
+
+def iter_export(
+    engine: Engine, statement, export_format: ExportFormat
+) -> Iterator[bytes]:
+    """Stream the export from a server-side cursor, one ``yield_per``
+    batch at a time, so memory does not grow with the table."""
+    yield export_header(export_format)
+    with engine.connect() as connection:
+        result = connection.execute(statement)
+        for rows in result.partitions():
+            yield encode_rows(rows, export_format)
+
+
+async def aiter_export(
+    engine: AsyncEngine, statement, export_format: ExportFormat
+) -> AsyncIterator[bytes]:
+    yield export_header(export_format)
+    async with engine.connect() as connection:
+        result = await connection.stream(statement)
+        async for rows in result.partitions():
+            yield encode_rows(rows, export_format)
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+async def agzip_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
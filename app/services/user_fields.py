@@ -0,0 +1,34 @@
+"""Sparse fieldsets: ``fields=id,username,role`` on the read routes.
+
+The requested names are validated against ``UserRead`` and only those
+columns (plus the key columns a page needs for its cursors) are selected,
+so the rows come back as plain tuples without ORM hydration, and a
+fieldset covered by an index can be answered by an index-only scan.
+"""
+
+from typing import List, Optional, Tuple
+
+from app.exceptions.user_exceptions import InvalidFields
+from app.models.user import User
+from app.schemas.users import UserRead
+
+USER_FIELDS = tuple(UserRead.model_fields)
+
+
+def parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """Requested fields in ``UserRead`` order; ``None`` for all of them."""
+    if fields is None:
+        return None
+    names = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = sorted(names.difference(USER_FIELDS))
+    if unknown or not names:
+        raise InvalidFields(unknown, USER_FIELDS)
+    if len(names) == len(USER_FIELDS):
+        return None
+    return tuple(name for name in USER_FIELDS if name in names)
+
+
+def field_columns(fields: Tuple[str, ...], *required: str) -> List:
+    """Columns to select for ``fields``, plus ``required`` key columns."""
+    names = dict.fromkeys((*required, *fields))
+    return [getattr(User, name) for name in names]
@@ -0,0 +1,182 @@
+"""Filters for the users list and the indexes that serve them.
+
+Only filter/sort combinations with an index that both finds the rows and
+returns them in sort order are accepted, so a list request never falls
+back to a full table scan or a sort of everything it matched:
+
+* no filters: any sort (primary key, ``username``, ``email`` or
+  ``(sort, id)``)
+* ``role`` and/or ``active``: sort by ``id`` on ``(role, id)``,
+  ``(role, active, id)`` or ``(active, id)``
+* a ``created_*`` or ``updated_*`` range: sort by that column on
+  ``(created_at, id)`` / ``(updated_at, id)``
+* a ``username_prefix`` or ``email_prefix`` on its own: sort by that
+  column, case-insensitively, on the ``(lower(column), id)`` prefix index
+"""
+
+from typing import List, Optional
+
+from app.exceptions.user_exceptions import UnsupportedUserFilter
+from app.models.user import User, prefix_key
+from app.schemas.users import UserFilter, UserSortField
+
+RANGE_SORTS = {
+    "created": UserSortField.created_at,
+    "updated": UserSortField.updated_at,
+}
+PREFIX_SORTS = {
+    "username_prefix": UserSortField.username,
+    "email_prefix": UserSortField.email,
+}
+
+
+def _equality_filters(filters: UserFilter) -> List[str]:
+    return [
+        name for name in ("role", "active") if getattr(filters, name) is not None
+    ]
+
+
+def _range_filters(filters: UserFilter) -> List[str]:
+    ranges = [
+        name
+        for name in RANGE_SORTS
+        if getattr(filters, f"{name}_from") is not None
+        or getattr(filters, f"{name}_to") is not None
+    ]
+    prefixes = [
+        name for name in PREFIX_SORTS if getattr(filters, name) is not None
+    ]
+    return ranges + prefixes
+
+
+def plan_user_query(
+    filters: Optional[UserFilter], sort: UserSortField = UserSortField.id
+) -> str:
+    """Name of the index serving ``filters`` sorted by ``sort``.
+
+    Raises ``UnsupportedUserFilter`` for any combination outside the
+    table in the module docstring.
+    """
+    if filters is None:
+        filters = UserFilter()
+    equality = _equality_filters(filters)
+    ranges = _range_filters(filters)
+
+    if len(ranges) > 1:
+        raise UnsupportedUserFilter(
+            "Only one of the created/updated ranges or username/email "
+            "prefixes can be used at a time."
+        )
+    if equality and ranges:
+        raise UnsupportedUserFilter(
+            "role/active filters cannot be combined with range or "
+            "prefix filters."
+        )
+
+    if equality:
+        if sort != UserSortField.id:
+            raise UnsupportedUserFilter(
+                "role/active filters can only be sorted by id."
+            )
+        if filters.role is None:
+            return "ix_user_active_id"
+        if filters.active is None:
+            return "ix_user_role_id"
+        return "ix_user_role_active_id"
+
+    if not ranges:
+        if sort == UserSortField.id:
+            return "user_pkey"
+        if sort in (UserSortField.username, UserSortField.email):
+            return f"ix_user_{sort.value}"
+        return f"ix_user_{sort.value}_id"
+
+    name = ranges[0]
+    if name in RANGE_SORTS:
+        if sort != RANGE_SORTS[name]:
+            raise UnsupportedUserFilter(
+                f"{name}_from/{name}_to filters can only be sorted by "
+                f"{RANGE_SORTS[name].value}."
+            )
+        return f"ix_user_{name}_at_id"
+    if sort != PREFIX_SORTS[name]:
+        raise UnsupportedUserFilter(
+            f"{name} filters can only be sorted by "
+            f"{PREFIX_SORTS[name].value}."
+        )
+    return f"ix_user_{PREFIX_SORTS[name].value}_lower"
+
+
+def sort_columns(
+    sort: UserSortField, filters: Optional[UserFilter] = None
+) -> list:
+    """``ORDER BY`` columns matching the index ``plan_user_query`` picked.
+
+    A prefix search sorts by the lowered column, the order its index
+    keeps.
+    """
+    if sort == UserSortField.id:
+        return [User.id]
+    column = getattr(User, sort.value)
+    if filters is not None and (
+        getattr(filters, f"{sort.value}_prefix", None) is not None
+    ):
+        column = prefix_key(column)
+    return [column, User.id]
+
+
+def _escape_like(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    )
+
+
+def _prefix_upper_bound(prefix: str) -> Optional[str]:
+    """Smallest string above every string starting with ``prefix``."""
+    while prefix and prefix[-1] == chr(0x10FFFF):
+        prefix = prefix[:-1]
+    if not prefix:
+        return None
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def apply_user_filters(statement, filters: Optional[UserFilter]):
+    if filters is None:
+        return statement
+    if filters.role is not None:
+        statement = statement.where(User.role == filters.role)
+    if filters.active is not None:
+        statement = statement.where(User.active == filters.active)
+    if filters.created_from is not None:
+        statement = statement.where(User.created_at >= filters.created_from)
+    if filters.created_to is not None:
+        statement = statement.where(User.created_at < filters.created_to)
+    if filters.updated_from is not None:
+        statement = statement.where(User.updated_at >= filters.updated_from)
+    if filters.updated_to is not None:
+        statement = statement.where(User.updated_at < filters.updated_to)
+    for name in ("username", "email"):
+        prefix = getattr(filters, f"{name}_prefix")
+        if prefix is not None:
+            prefix = prefix.lower()
+            key = prefix_key(getattr(User, name))
+            pattern = _escape_like(prefix) + "%"
+            # The explicit range lets any planner seek the index; LIKE
+            # alone is only turned into one on some databases
+            statement = statement.where(
+                key >= prefix, key.like(pattern, escape="\\")
+            )
+            upper = _prefix_upper_bound(prefix)
+            if upper is not None:
+                statement = statement.where(key < upper)
+    return statement
+
+
+def filter_key(filters: Optional[UserFilter]) -> str:
+    """Stable key for per-filter caches such as the total count."""
+    if filters is None:
+        return "all"
+    values = filters.model_dump(mode="json", exclude_none=True)
+    if not values:
+        return "all"
+    return "&".join(f"{name}={value}" for name, value in sorted(values.items()))
@@ -0,0 +1,419 @@
+"""User statistics served by ``GET /users/stats``.
+
+Counts by role, by active flag and of users created per day. Every write
+path inserts its deltas into ``user_stats_journal`` right before it
+commits, in the same transaction as the change: plain inserts, so
+writers never queue on a shared counter row. Each worker's
+``StatsFolder`` moves the journal into the ``user_stats`` counters every
+``USER_STATS_FOLD_INTERVAL`` seconds; a Postgres advisory lock keeps it
+to one folder at a time. Reads add the folded counters and the pending
+deltas in one statement, so the endpoint never touches ``user``.
+
+``reconcile_user_stats`` recounts ``user`` to repair rows written behind
+the services' back, and fills the counters on the first deploy. It reads
+a consistent snapshot without blocking writers and journals corrections;
+``python -m app.server`` runs it once before forking its workers, and
+``python -m app.services.user_stats`` runs it on demand.
+"""
+
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+)
+
+from sqlalchemy import Engine, delete, func, insert, or_, text, union_all
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, SQLModel, select
+
+from app.core.config import settings
+from app.database.database import create_standalone_engine, get_engine
+from app.models.user import RoleEnum, User
+from app.models.user_stats import UserStat, UserStatDelta
+from app.schemas.users import UserStats
+
+logger = logging.getLogger(__name__)
+
+ROLE = "role"
+ACTIVE = "active"
+CREATED_DAY = "created"
+
+# Columns a write returns so its delta can be computed without a re-read
+STATS_COLUMNS = (User.id, User.role, User.active, User.created_at)
+
+# pg_advisory_lock keys of the folder and the reconciliation
+FOLD_LOCK = 4_201_001
+RECONCILE_LOCK = 4_201_002
+
+StatsKey = Tuple[str, str]
+
+
+def _role(role: Any) -> str:
+    return getattr(role, "value", role)
+
+
+def _active(active: bool) -> str:
+    return "active" if active else "inactive"
+
+
+def stats_keys(row: Any) -> Tuple[StatsKey, ...]:
+    return (
+        (ROLE, _role(row.role)),
+        (ACTIVE, _active(row.active)),
+        (CREATED_DAY, row.created_at.date().isoformat()),
+    )
+
+
+def added(rows: Iterable[Any]) -> Counter:
+    delta: Counter = Counter()
+    for row in rows:
+        for key in stats_keys(row):
+            delta[key] += 1
+    return delta
+
+
+def removed(rows: Iterable[Any]) -> Counter:
+    delta: Counter = Counter()
+    for row in rows:
+        for key in stats_keys(row):
+            delta[key] -= 1
+    return delta
+
+
+def moved(rows: Iterable[Mapping]) -> Counter:
+    """Role/active moves of rows returned by ``execute_tracking_moves``;
+    ``created_at`` never changes."""
+    delta: Counter = Counter()
+    for row in rows:
+        delta[(ROLE, _role(row["old_role"]))] -= 1
+        delta[(ROLE, _role(row["role"]))] += 1
+        delta[(ACTIVE, _active(row["old_active"]))] -= 1
+        delta[(ACTIVE, _active(row["active"]))] += 1
+    return delta
+
+
+def _is_postgres(session: Session) -> bool:
+    return session.get_bind().dialect.name == "postgresql"
+
+
+def moves_stats(changes: dict) -> bool:
+    return "role" in changes or "active" in changes
+
+
+def execute_tracking_moves(
+    session: Session, statement, *criteria
+) -> List[Mapping]:
+    """Run ``statement``, an ``UPDATE ... RETURNING`` of the users
+    matching ``criteria`` that returns ``id``; each returned row also
+    carries its ``old_role``/``old_active``.
+
+    On Postgres the old values come from a ``FROM`` subquery of the same
+    statement, locking the rows the update would lock anyway, so there
+    is no read ahead of it. SQLite cannot return ``FROM`` columns; its
+    single writer makes a read just before the update equivalent.
+    """
+    if _is_postgres(session):
+        old = (
+            select(
+                User.id,
+                User.role.label("old_role"),
+                User.active.label("old_active"),
+            )
+            .where(*criteria)
+            .with_for_update()
+            .subquery("old")
+        )
+        statement = statement.where(User.id == old.c.id).returning(
+            old.c.old_role, old.c.old_active
+        )
+        return session.execute(statement).mappings().all()
+    before = {
+        row.id: row
+        for row in session.execute(
+            select(User.id, User.role, User.active).where(*criteria)
+        )
+    }
+    return [
+        {
+            **row,
+            "old_role": before[row["id"]].role,
+            "old_active": before[row["id"]].active,
+        }
+        for row in session.execute(statement).mappings()
+    ]
+
+
+def record_stats(session: Session, delta: Counter) -> None:
+    """Journal ``delta``; call just before commit."""
+    rows = [
+        {"dimension": dimension, "bucket": bucket, "delta": count}
+        for (dimension, bucket), count in sorted(delta.items())
+        if count
+    ]
+    if rows:
+        session.execute(insert(UserStatDelta), rows)
+
+
+def _counters(since: Optional[str] = None):
+    """Folded counters plus pending deltas as one ``UNION ALL``, so both
+    come from the same snapshot whatever a folder commits meanwhile."""
+    folded = select(
+        UserStat.dimension, UserStat.bucket, UserStat.count.label("count")
+    )
+    pending = select(
+        UserStatDelta.dimension,
+        UserStatDelta.bucket,
+        UserStatDelta.delta.label("count"),
+    )
+    if since is not None:
+        folded = folded.where(
+            or_(UserStat.dimension != CREATED_DAY, UserStat.bucket >= since)
+        )
+        pending = pending.where(
+            or_(
+                UserStatDelta.dimension != CREATED_DAY,
+                UserStatDelta.bucket >= since,
+            )
+        )
+    return union_all(folded, pending)
+
+
+def _sum_counters(session: Session, since: Optional[str] = None) -> Counter:
+    totals: Counter = Counter()
+    for dimension, bucket, count in session.execute(_counters(since)):
+        totals[(dimension, bucket)] += count
+    return totals
+
+
+def get_user_stats(session: Session, days: int) -> UserStats:
+    since = (date.today() - timedelta(days=days - 1)).isoformat()
+    by_role = {role.value: 0 for role in RoleEnum}
+    by_active = {_active(True): 0, _active(False): 0}
+    created_per_day: Dict[str, int] = {}
+    for (dimension, bucket), count in _sum_counters(session, since).items():
+        if dimension == ROLE:
+            by_role[bucket] = count
+        elif dimension == ACTIVE:
+            by_active[bucket] = count
+        elif count:
+            created_per_day[bucket] = count
+    return UserStats(
+        total=sum(by_role.values()),
+        by_role=by_role,
+        by_active=by_active,
+        created_per_day=dict(sorted(created_per_day.items())),
+    )
+
+
+def fold_user_stats(session: Session, batch_size: int) -> int:
+    """Move up to ``batch_size`` journal rows into the counters; returns
+    how many were folded, 0 when another folder holds the lock."""
+    if _is_postgres(session) and not session.execute(
+        select(func.pg_try_advisory_xact_lock(FOLD_LOCK))
+    ).scalar():
+        session.rollback()
+        return 0
+    oldest = (
+        select(UserStatDelta.id)
+        .order_by(UserStatDelta.id)
+        .limit(batch_size)
+        .scalar_subquery()
+    )
+    rows = session.execute(
+        delete(UserStatDelta)
+        .where(UserStatDelta.id.in_(oldest))
+        .returning(
+            UserStatDelta.dimension,
+            UserStatDelta.bucket,
+            UserStatDelta.delta,
+        )
+    ).all()
+    delta: Counter = Counter()
+    for dimension, bucket, count in rows:
+        delta[(dimension, bucket)] += count
+    values = [
+        {"dimension": dimension, "bucket": bucket, "count": count}
+        for (dimension, bucket), count in sorted(delta.items())
+        if count
+    ]
+    if values:
+        if _is_postgres(session):
+            statement = pg_insert(UserStat).values(values)
+        else:
+            statement = sqlite_insert(UserStat).values(values)
+        count = UserStat.__table__.c.count
+        session.execute(
+            statement.on_conflict_do_update(
+                index_elements=["dimension", "bucket"],
+                set_={"count": count + statement.excluded.count},
+            )
+        )
+    session.commit()
+    return len(rows)
+
+
+def _actual_counters(session: Session) -> Counter:
+    """Counters recounted from ``user`` in a single scan."""
+    day = func.date(User.created_at)
+    actual: Counter = Counter()
+    for role, active, created_on, count in session.execute(
+        select(User.role, User.active, day, func.count()).group_by(
+            User.role, User.active, day
+        )
+    ):
+        actual[(ROLE, _role(role))] += count
+        actual[(ACTIVE, _active(active))] += count
+        actual[(CREATED_DAY, str(created_on))] += count
+    return actual
+
+
+def _reconcile(session: Session) -> int:
+    recorded = _sum_counters(session)
+    actual = _actual_counters(session)
+    corrections = Counter(actual)
+    corrections.subtract(recorded)
+    record_stats(session, corrections)
+    session.commit()
+    corrected = sum(1 for count in corrections.values() if count)
+    if corrected:
+        logger.warning(
+            "User stats reconciled: %d counters corrected", corrected
+        )
+    return corrected
+
+
+def reconcile_user_stats(engine: Engine) -> int:
+    """Recount ``user`` and journal what the counters are off by;
+    returns how many counters were.
+
+    Counters and ``user`` are read from one snapshot, in which they only
+    disagree by what was written behind the services' back: every write
+    journals its delta in its own transaction, and folding moves deltas
+    within one. Writers are never blocked. On Postgres an advisory lock,
+    taken before the snapshot, keeps a second run from journaling the
+    same corrections twice; that run is skipped and returns 0.
+    """
+    with engine.connect() as connection:
+        if connection.dialect.name != "postgresql":
+            with Session(bind=connection) as session:
+                return _reconcile(session)
+
+        locked = connection.execute(
+            select(func.pg_try_advisory_lock(RECONCILE_LOCK))
+        ).scalar()
+        connection.commit()
+        if not locked:
+            logger.info("User stats reconciliation already running")
+            return 0
+        try:
+            snapshot = connection.execution_options(
+                isolation_level="REPEATABLE READ"
+            )
+            with Session(bind=snapshot) as session:
+                return _reconcile(session)
+        finally:
+            connection.execute(
+                text("SELECT pg_advisory_unlock(:key)"),
+                {"key": RECONCILE_LOCK},
+            )
+            connection.commit()
+
+
+def reconcile_on_deploy() -> int:
+    """Reconcile through a short-lived engine of its own, e.g. from the
+    server master, which must not fork with open connections."""
+    engine = create_standalone_engine()
+    try:
+        SQLModel.metadata.create_all(engine)
+        return reconcile_user_stats(engine)
+    finally:
+        engine.dispose()
+
+
+class StatsFolder:
+    """Fold the journal every ``interval`` seconds."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        interval: float,
+        batch_size: int,
+    ):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.batch_size = batch_size
+        self.runs = 0
+        self.folded = 0
+        self.last_run: Optional[datetime] = None
+        self.last_duration_ms = 0.0
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._run, name="stats-folder", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def run_once(self) -> int:
+        started = time.perf_counter()
+        folded = 0
+        with self.session_factory() as session:
+            # A backlog is drained in bounded transactions
+            while True:
+                count = fold_user_stats(session, self.batch_size)
+                folded += count
+                if count < self.batch_size:
+                    break
+        self.runs += 1
+        self.folded += folded
+        self.last_run = datetime.now()
+        self.last_duration_ms = (time.perf_counter() - started) * 1000
+        return folded
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Folding the user stats journal failed")
+
+    def snapshot(self) -> dict:
+        return {
+            "interval": self.interval,
+            "batch_size": self.batch_size,
+            "runs": self.runs,
+            "folded": self.folded,
+            "last_run": self.last_run,
+            "last_duration_ms": round(self.last_duration_ms, 3),
+        }
+
+
+stats_folder = StatsFolder(
+    lambda: Session(get_engine()),
+    settings.user_stats_fold_interval,
+    settings.user_stats_fold_batch_size,
+)
+
+
+if __name__ == "__main__":
+    from app.core.logging_config import setup_logging
+
+    setup_logging()
+    print(f"{reconcile_on_deploy()} counters corrected")
@@ -1,110 +1,437 @@
 import logging
 from datetime import datetime
-from typing import List, Tuple
+from typing import Dict, List, Optional, Set, Tuple, Union
 
-from sqlalchemy import func
+from sqlalchemy import delete, insert, literal, or_, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session, select
 
+from app.core.logging_config import SAMPLED
+from app.database.replicas import from_replica
+from app.exceptions.app_exceptions import AppException
 from app.exceptions.user_exceptions import (
     EmailAlreadyExists,
     NoFieldsToUpdate,
     UsernameAlreadyExists,
     UserNotFound,
 )
-from app.models.user import User
-from app.schemas.users import UserCreate, UserRead, UserUpdate
+from app.models.user import User, prefix_key
+from app.schemas.users import (
+    UserCreate,
+    UserFilter,
+    UserRead,
+    UserSortField,
+    UserUpdate,
+)
+from app.services.pagination import (
+    NEXT,
+    PREV,
+    decode_cursor,
+    make_cursor,
+)
+from app.services.user_cache import USER_NOT_FOUND, user_cache
+from app.services.user_changes import (
+    CREATED,
+    DELETED,
+    UPDATED,
+    record_change,
+)
+from app.services.user_count import count_users, total_count_cache
+from app.services.user_fields import field_columns
+from app.services.user_query import (
+    apply_user_filters,
+    plan_user_query,
+    sort_columns,
+)
+from app.services.user_stats import (
+    STATS_COLUMNS,
+    added,
+    execute_tracking_moves,
+    moved,
+    moves_stats,
+    record_stats,
+    removed,
+)
 
 logger = logging.getLogger(__name__)
 
 
-def create_user(user_create: UserCreate, session: Session) -> User:
-    existing_user = session.exec(
-        select(User).where(User.username == user_create.username)
-    ).first()
-    if existing_user:
-        logger.warning(
-            f"Attempt to create user with username {user_create.username}, but already exists"
+def existing_user_keys(
+    user_creates: List[UserCreate], session: Session
+) -> Tuple[Set[str], Set[str]]:
+    """One query for every username/email in the batch already stored."""
+    usernames = [user_create.username for user_create in user_creates]
+    emails = [user_create.email for user_create in user_creates]
+    existing = session.exec(
+        select(User.username, User.email).where(
+            or_(User.username.in_(usernames), User.email.in_(emails))
         )
-        raise UsernameAlreadyExists()
+    ).all()
+    return (
+        {username for username, _ in existing},
+        {email for _, email in existing},
+    )
 
-    existing_email = session.exec(
-        select(User).where(User.email == user_create.email)
-    ).first()
-    if existing_email:
+
+def conflict_for(
+    user_create: UserCreate,
+    taken_usernames: Set[str],
+    taken_emails: Set[str],
+) -> Optional[AppException]:
+    if user_create.username in taken_usernames:
+        return UsernameAlreadyExists()
+    if user_create.email in taken_emails:
+        return EmailAlreadyExists()
+    return None
+
+
+def is_unique_violation(exc: IntegrityError) -> bool:
+    """Other integrity errors (``NOT NULL``, checks) are not conflicts
+    and must not be reported to the client as one."""
+    return "unique" in str(exc.orig).lower()
+
+
+def conflict_from_integrity_error(
+    exc: IntegrityError,
+) -> Optional[AppException]:
+    """Map a unique violation on ``user`` back to the API exception.
+
+    Postgres names the violated index (``ix_user_username``) and SQLite
+    the column (``user.username``), so a substring check covers both.
+    """
+    if not is_unique_violation(exc):
+        return None
+    detail = str(exc.orig).lower()
+    if "username" in detail:
+        return UsernameAlreadyExists()
+    if "email" in detail:
+        return EmailAlreadyExists()
+    return None
+
+
+def _insert_user_statement(session: Session, values: dict):
+    if session.get_bind().dialect.name == "postgresql":
+        # Conflicts come back as "no row" instead of an aborted statement
+        statement = pg_insert(User).values(**values).on_conflict_do_nothing()
+    else:
+        statement = insert(User).values(**values)
+    return statement.returning(*User.__table__.columns)
+
+
+def create_user(user_create: UserCreate, session: Session) -> User:
+    """Create a user with a single ``INSERT ... RETURNING``.
+
+    Uniqueness is enforced by the indexes on ``username``/``email``;
+    the conflicting key is only looked up once an insert is rejected.
+    """
+    now = datetime.now()
+    statement = _insert_user_statement(
+        session,
+        {**user_create.model_dump(), "created_at": now, "updated_at": now},
+    )
+    try:
+        row = session.execute(statement).mappings().first()
+        violation = None
+    except IntegrityError as exc:
+        row = None
+        if not is_unique_violation(exc):
+            session.rollback()
+            raise
+        violation = conflict_from_integrity_error(exc)
+
+    if row is None:
+        session.rollback()
+        # The database reports whichever index it checked first; look the
+        # keys up so a clash on both is reported as the username, as before
+        conflict = (
+            conflict_for(
+                user_create, *existing_user_keys([user_create], session)
+            )
+            or violation
+            or UsernameAlreadyExists()
+        )
         logger.warning(
-            f"Attempt to create user with email {user_create.email}, but already exists"
+            "Attempt to create user %s <%s> failed: %s",
+            user_create.username,
+            user_create.email,
+            conflict.message,
+            extra=SAMPLED,
         )
-        raise EmailAlreadyExists()
+        raise conflict
 
-    user = User(
-        **user_create.model_dump(),
-        created_at=datetime.now(),
-        updated_at=datetime.now(),
-    )
-    session.add(user)
+    user = User(**row)
+    record_stats(session, added([user]))
+    record_change(session, CREATED, user.id, user)
     session.commit()
-    session.refresh(user)
-    logger.info(f"User with ID {user.id} has been created")
+    total_count_cache.invalidate()
+    # Drop a cached 404 left by a lookup that ran ahead of this insert
+    user_cache.invalidate(user.id)
+    logger.info("User with ID %s has been created", user.id)
     return user
 
 
-def get_user_by_id(user_id: int, session: Session) -> UserRead:
-    user = session.get(User, user_id)
+def get_user_by_id(
+    user_id: int,
+    session: Session,
+    fields: Optional[Tuple[str, ...]] = None,
+) -> UserRead:
+    """The user, or with ``fields`` a row of just those columns plus
+    ``id``/``updated_at`` for the validators. Partial rows are served
+    from a cached full user but never written to the cache, nor is a
+    replica's answer: the replica may still lack a write the cache has
+    already been invalidated for.
+    """
+    cached = user_cache.get(user_id)
+    if cached is USER_NOT_FOUND:
+        raise UserNotFound(user_id)
+    if cached is not None:
+        return cached
+
+    if fields is None:
+        user = session.get(User, user_id)
+    else:
+        columns = field_columns(fields, "id", "updated_at")
+        user = session.exec(
+            select(*columns).where(User.id == user_id)
+        ).first()
+    fill_cache = not from_replica(session)
     if not user:
-        logger.warning(f"User with ID {user_id} not found")
+        logger.warning("User with ID %s not found", user_id, extra=SAMPLED)
+        if fill_cache:
+            user_cache.set_not_found(user_id)
         raise UserNotFound(user_id)
+    if fields is None and fill_cache:
+        user_cache.set(user)
     return user
 
 
-def get_users_paginated(
-    session: Session, page: int = 1, limit: int = 10
-) -> Tuple[List[User], int]:
+def get_users_by_ids(
+    user_ids: List[int], session: Session
+) -> Dict[int, Optional[Union[User, UserRead]]]:
+    """Users for ``user_ids`` in request order, ``None`` for unknown ids.
+
+    Cached entries (including cached 404s) are served from
+    ``user_cache``; the rest come from one ``WHERE id IN (...)`` query
+    and are written back to the cache unless read from a replica.
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    cached = user_cache.get_many(user_ids)
+    missing = [user_id for user_id in user_ids if user_id not in cached]
+
+    loaded = {}
+    if missing:
+        loaded = {
+            user.id: user
+            for user in session.exec(
+                select(User).where(User.id.in_(missing))
+            ).all()
+        }
+        for user_id in [] if from_replica(session) else missing:
+            if user_id in loaded:
+                user_cache.set(loaded[user_id])
+            else:
+                user_cache.set_not_found(user_id)
+
+    results = {}
+    for user_id in user_ids:
+        user = cached.get(user_id, loaded.get(user_id))
+        results[user_id] = None if user is USER_NOT_FOUND else user
+    return results
+
+
+def get_user_version(
+    user_id: int, session: Session
+) -> Tuple[int, datetime]:
+    """``(id, updated_at)`` for conditional GETs, without loading the
+    full row when the cache cannot answer."""
+    cached = user_cache.get(user_id)
+    if cached is USER_NOT_FOUND:
+        raise UserNotFound(user_id)
+    if cached is not None:
+        return cached.id, cached.updated_at
+
+    version = session.exec(
+        select(User.id, User.updated_at).where(User.id == user_id)
+    ).first()
+    if version is None:
+        logger.warning("User with ID %s not found", user_id, extra=SAMPLED)
+        if not from_replica(session):
+            user_cache.set_not_found(user_id)
+        raise UserNotFound(user_id)
+    return version.id, version.updated_at
+
+
+def _filtered_select(
+    filters: Optional[UserFilter],
+    sort: UserSortField,
+    fields: Optional[Tuple[str, ...]] = None,
+):
+    index = plan_user_query(filters, sort)
+    logger.debug("Listing users by %s using %s", sort.value, index)
+    if fields is None:
+        statement = select(User)
+    else:
+        # The sort key and id are kept for the page's cursors
+        statement = select(*field_columns(fields, "id", sort.value))
+    return apply_user_filters(statement, filters)
+
+
+def get_users_page(
+    session: Session,
+    page: int = 1,
+    limit: int = 10,
+    sort: UserSortField = UserSortField.id,
+    filters: Optional[UserFilter] = None,
+    fields: Optional[Tuple[str, ...]] = None,
+) -> List[User]:
     offset = (page - 1) * limit
-    statement = select(User).offset(offset).limit(limit)
-    users = session.exec(statement).all()
+    statement = _filtered_select(filters, sort, fields)
+    statement = statement.order_by(*sort_columns(sort, filters))
+    return session.exec(statement.offset(offset).limit(limit)).all()
 
-    total = session.exec(select(func.count()).select_from(User)).one()
+
+def get_users_paginated(
+    session: Session,
+    page: int = 1,
+    limit: int = 10,
+    sort: UserSortField = UserSortField.id,
+    filters: Optional[UserFilter] = None,
+    fields: Optional[Tuple[str, ...]] = None,
+) -> Tuple[List[User], int]:
+    users = get_users_page(session, page, limit, sort, filters, fields)
+    total, _ = count_users(session, filters=filters)
     return users, total
 
 
+def get_users_by_cursor(
+    session: Session,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    sort: UserSortField = UserSortField.id,
+    filters: Optional[UserFilter] = None,
+    fields: Optional[Tuple[str, ...]] = None,
+) -> Tuple[List[User], Optional[str], Optional[str]]:
+    """Keyset pagination: seek past the cursor position on the
+    ``(sort, id)`` index instead of scanning and discarding an OFFSET.
+    """
+    statement = _filtered_select(filters, sort, fields)
+    columns = sort_columns(sort, filters)
+    key = columns[0] if len(columns) == 1 else tuple_(*columns)
+
+    direction = NEXT
+    if cursor:
+        value, last_id, direction = decode_cursor(cursor, sort)
+        if len(columns) == 1:
+            position = last_id
+        elif isinstance(columns[0], prefix_key):
+            # Seek on the lowered value, as the prefix index orders it
+            position = tuple_(prefix_key(literal(value)), last_id)
+        else:
+            position = (value, last_id)
+        if direction == NEXT:
+            statement = statement.where(key > position)
+        else:
+            statement = statement.where(key < position)
+
+    if direction == NEXT:
+        order_by = columns
+    else:
+        order_by = [column.desc() for column in columns]
+
+    # One extra row tells us whether another page exists
+    rows = session.exec(
+        statement.order_by(*order_by).limit(limit + 1)
+    ).all()
+    has_more = len(rows) > limit
+    users = list(rows[:limit])
+    if direction == PREV:
+        users.reverse()
+
+    first = users[0] if users else None
+    last = users[-1] if users else None
+    if direction == NEXT:
+        next_cursor = make_cursor(last, sort, NEXT) if has_more else None
+        prev_cursor = make_cursor(first, sort, PREV) if cursor else None
+    else:
+        next_cursor = make_cursor(last, sort, NEXT)
+        prev_cursor = make_cursor(first, sort, PREV) if has_more else None
+
+    return users, next_cursor, prev_cursor
+
+
+def update_changes(update_data: UserUpdate) -> dict:
+    """Fields the client actually set; ``None`` never clears a column."""
+    return {
+        key: value
+        for key, value in update_data.model_dump(exclude_unset=True).items()
+        if value is not None
+    }
+
+
 def update_user(
     user_id: int, update_data: UserUpdate, session: Session
 ) -> User:
-    user = session.get(User, user_id)
-    if not user:
-        logger.warning(f"User with ID {user_id} not found for update")
-        raise UserNotFound(user_id)
-
-    changes_made = 0
-    update_dict = update_data.model_dump(exclude_unset=True)
-    for key, value in update_dict.items():
-        if value:
-            setattr(user, key, value)
-            changes_made += 1
-
-    if changes_made == 0:
+    """Apply the update with one ``UPDATE ... RETURNING`` statement."""
+    changes = update_changes(update_data)
+    if not changes:
         logger.warning(
-            f"There are nochanges for user with ID {user_id}"
+            "There are nochanges for user with ID %s",
+            user_id,
+            extra=SAMPLED,
         )
         raise NoFieldsToUpdate()
 
-    user.updated_at = datetime.now()
+    statement = (
+        update(User)
+        .where(User.id == user_id)
+        .values(**changes, updated_at=datetime.now())
+        .returning(*User.__table__.columns)
+    )
+    if moves_stats(changes):
+        rows = execute_tracking_moves(session, statement, User.id == user_id)
+        row = rows[0] if rows else None
+    else:
+        row = session.execute(statement).mappings().first()
+    if row is None:
+        session.rollback()
+        logger.warning(
+            "User with ID %s not found for update", user_id, extra=SAMPLED
+        )
+        raise UserNotFound(user_id)
 
-    session.add(user)
+    user = User(**row)
+    if moves_stats(changes):
+        record_stats(session, moved([row]))
+    record_change(session, UPDATED, user_id, user)
     session.commit()
-    session.refresh(user)
-    logger.info(f"User with ID {user_id} updated")
+    if "role" in changes or "active" in changes:
+        # Filtered totals may have moved
+        total_count_cache.invalidate()
+    user_cache.invalidate(user_id)
+    logger.info("User with ID %s updated", user_id)
     return user
 
 
 def delete_user(user_id: int, session: Session) -> None:
-    user = session.get(User, user_id)
-    if not user:
+    statement = (
+        delete(User)
+        .where(User.id == user_id)
+        .returning(*STATS_COLUMNS)
+    )
+    deleted = session.execute(statement).first()
+    if deleted is None:
+        session.rollback()
         logger.warning(
-            f"User with ID {user_id} not found for deletion"
+            "User with ID %s not found for deletion",
+            user_id,
+            extra=SAMPLED,
         )
         raise UserNotFound(user_id)
 
-    session.delete(user)
+    record_stats(session, removed([deleted]))
+    record_change(session, DELETED, user_id)
     session.commit()
-    logger.info(f"User with ID {user_id} deleted")
+    total_count_cache.invalidate()
+    user_cache.invalidate(user_id)
+    logger.info("User with ID %s deleted", user_id)
@@ -0,0 +1,159 @@
+"""Async counterparts of the user services.
+
+Each coroutine runs the sync implementation through
+``AsyncSession.run_sync``: SQLAlchemy drives it on a greenlet, so every
+database round trip is awaited on the event loop instead of blocking a
+threadpool worker, and the query logic lives in one place.
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Union
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models.user import User
+from app.schemas.common import TotalMode
+from app.schemas.users import (
+    BulkUserResult,
+    BulkWriteResult,
+    UserBulkDelete,
+    UserBulkUpdate,
+    UserCreate,
+    UserFilter,
+    UserRead,
+    UserSortField,
+    UserStats,
+    UserUpdate,
+)
+from app.services import user_bulk, user_count, user_stats, users
+
+
+async def create_user(
+    user_create: UserCreate, session: AsyncSession
+) -> User:
+    return await session.run_sync(
+        lambda sync_session: users.create_user(user_create, sync_session)
+    )
+
+
+async def create_users_bulk(
+    rows: List[Tuple[int, UserCreate]], session: AsyncSession
+) -> List[BulkUserResult]:
+    return await session.run_sync(
+        lambda sync_session: user_bulk.create_users_bulk(rows, sync_session)
+    )
+
+
+async def update_users_bulk(
+    bulk_update: UserBulkUpdate, session: AsyncSession, chunk_size: int
+) -> BulkWriteResult:
+    return await session.run_sync(
+        lambda sync_session: user_bulk.update_users_bulk(
+            bulk_update, sync_session, chunk_size
+        )
+    )
+
+
+async def delete_users_bulk(
+    bulk_delete: UserBulkDelete, session: AsyncSession, chunk_size: int
+) -> BulkWriteResult:
+    return await session.run_sync(
+        lambda sync_session: user_bulk.delete_users_bulk(
+            bulk_delete, sync_session, chunk_size
+        )
+    )
+
+
+async def get_user_by_id(
+    user_id: int,
+    session: AsyncSession,
+    fields: Optional[Tuple[str, ...]] = None,
+) -> UserRead:
+    return await session.run_sync(
+        lambda sync_session: users.get_user_by_id(
+            user_id, sync_session, fields
+        )
+    )
+
+
+async def get_users_by_ids(
+    user_ids: List[int], session: AsyncSession
+) -> Dict[int, Optional[Union[User, UserRead]]]:
+    return await session.run_sync(
+        lambda sync_session: users.get_users_by_ids(user_ids, sync_session)
+    )
+
+
+async def get_user_version(
+    user_id: int, session: AsyncSession
+) -> Tuple[int, datetime]:
+    return await session.run_sync(
+        lambda sync_session: users.get_user_version(user_id, sync_session)
+    )
+
+
+async def get_users_page(
+    session: AsyncSession,
+    page: int = 1,
+    limit: int = 10,
+    sort: UserSortField = UserSortField.id,
+    filters: Optional[UserFilter] = None,
+    fields: Optional[Tuple[str, ...]] = None,
+) -> List[User]:
+    return await session.run_sync(
+        users.get_users_page, page, limit, sort, filters, fields
+    )
+
+
+async def get_users_paginated(
+    session: AsyncSession,
+    page: int = 1,
+    limit: int = 10,
+    sort: UserSortField = UserSortField.id,
+    filters: Optional[UserFilter] = None,
+    fields: Optional[Tuple[str, ...]] = None,
+) -> Tuple[List[User], int]:
+    return await session.run_sync(
+        users.get_users_paginated, page, limit, sort, filters, fields
+    )
+
+
+async def get_users_by_cursor(
+    session: AsyncSession,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    sort: UserSortField = UserSortField.id,
+    filters: Optional[UserFilter] = None,
+    fields: Optional[Tuple[str, ...]] = None,
+) -> Tuple[List[User], Optional[str], Optional[str]]:
+    return await session.run_sync(
+        users.get_users_by_cursor, limit, cursor, sort, filters, fields
+    )
+
+
+async def count_users(
+    session: AsyncSession,
+    mode: TotalMode = TotalMode.exact,
+    filters: Optional[UserFilter] = None,
+) -> Tuple[int, bool]:
+    return await session.run_sync(user_count.count_users, mode, filters)
+
+
+async def get_user_stats(session: AsyncSession, days: int) -> UserStats:
+    return await session.run_sync(user_stats.get_user_stats, days)
+
+
+async def update_user(
+    user_id: int, update_data: UserUpdate, session: AsyncSession
+) -> User:
+    return await session.run_sync(
+        lambda sync_session: users.update_user(
+            user_id, update_data, sync_session
+        )
+    )
+
+
+async def delete_user(user_id: int, session: AsyncSession) -> None:
+    return await session.run_sync(
+        lambda sync_session: users.delete_user(user_id, sync_session)
+    )
@@ -0,0 +1,94 @@
+"""Latency summaries and baseline comparison for the endpoint benchmarks."""
+
+import json
+import math
+from pathlib import Path
+from typing import Dict, List, Optional
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> dict:
+    """Summary of one scenario; latencies are in milliseconds."""
+    ordered = sorted(latencies)
+    summary = {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+    }
+    for pct in PERCENTILES:
+        summary[f"p{pct}_ms"] = round(percentile(ordered, pct), 3)
+    return summary
+
+
+def error_rate(summary: dict) -> float:
+    requests = summary.get("requests", 0)
+    return summary.get("errors", 0) / requests if requests else 0.0
+
+
+def compare(
+    current: Dict[str, dict], baseline: Dict[str, dict], threshold: float
+) -> List[str]:
+    """Regressions of ``current`` against ``baseline``.
+
+    A scenario regresses when its p95 grows, or its throughput drops, by
+    more than ``threshold`` (a fraction, e.g. ``0.2`` for 20%), or when
+    more of its requests fail than in the baseline. Failed requests are
+    often the fastest ones, so they would otherwise pass for a speed-up.
+    """
+    regressions = []
+    for name, base in baseline.items():
+        run = current.get(name)
+        if run is None:
+            continue
+        if error_rate(run) > error_rate(base):
+            regressions.append(
+                f"{name}: {run['errors']} errors "
+                f"({error_rate(run):.1%}) vs baseline "
+                f"{base.get('errors', 0)} ({error_rate(base):.1%})"
+            )
+        if base["p95_ms"] and run["p95_ms"] > base["p95_ms"] * (1 + threshold):
+            regressions.append(
+                f"{name}: p95 {run['p95_ms']:.2f}ms vs baseline "
+                f"{base['p95_ms']:.2f}ms"
+            )
+        if run["throughput_rps"] < base["throughput_rps"] * (1 - threshold):
+            regressions.append(
+                f"{name}: {run['throughput_rps']:.1f} req/s vs baseline "
+                f"{base['throughput_rps']:.1f} req/s"
+            )
+    return regressions
+
+
+def load_baseline(path: Path) -> Optional[dict]:
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def save_results(path: Path, results: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n")
+
+
+def format_table(scenarios: Dict[str, dict]) -> str:
+    header = (
+        f"{'scenario':<14}{'reqs':>7}{'errs':>6}{'req/s':>10}"
+        f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    )
+    lines = [header, "-" * len(header)]
+    for name, summary in scenarios.items():
+        lines.append(
+            f"{name:<14}{summary['requests']:>7}{summary['errors']:>6}"
+            f"{summary['throughput_rps']:>10.1f}{summary['p50_ms']:>10.2f}"
+            f"{summary['p95_ms']:>10.2f}{summary['p99_ms']:>10.2f}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,89 @@
+"""Compare the legacy response path with the fast serializer.
+
+    python -m benchmarks.serialization --rows 100 --repeat 2000
+
+The legacy path mirrors what the routes did before: ``model_dump`` each
+user, build the pydantic envelope, let FastAPI re-validate it against
+``response_model`` and encode it with ``jsonable_encoder`` + ``json``.
+"""
+
+import argparse
+import json
+import timeit
+from datetime import datetime
+
+from fastapi.encoders import jsonable_encoder
+
+from app.core import responses
+from app.models.user import RoleEnum, User
+from app.schemas.common import PaginatedResponse
+
+
+def make_users(count: int):
+    now = datetime.now()
+    return [
+        User(
+            id=i,
+            username=f"user{i}",
+            email=f"user{i}@example.com",
+            first_name="Bench",
+            last_name=f"User{i}",
+            role=RoleEnum.user,
+            active=True,
+            created_at=now,
+            updated_at=now,
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def legacy_page(users) -> bytes:
+    envelope = PaginatedResponse(
+        status="success",
+        data=[user.model_dump() for user in users],
+        total=1000,
+        page=1,
+        limit=len(users),
+        message="Users fetched successfully.",
+        response_time=datetime.now(),
+    )
+    validated = PaginatedResponse.model_validate(envelope.model_dump())
+    return json.dumps(jsonable_encoder(validated)).encode("utf-8")
+
+
+def fast_page(users) -> bytes:
+    return responses.paginated_response(
+        responses.users_payload(users),
+        total=1000,
+        total_exact=True,
+        page=1,
+        limit=len(users),
+        next_cursor=None,
+        prev_cursor=None,
+        message="Users fetched successfully.",
+    ).body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    users = make_users(args.rows)
+    assert json.loads(fast_page(users))["data"] == json.loads(
+        legacy_page(users)
+    )["data"]
+
+    results = {}
+    for name, func in (("legacy", legacy_page), ("fast", fast_page)):
+        seconds = min(
+            timeit.repeat(lambda: func(users), number=args.repeat, repeat=3)
+        )
+        results[name] = seconds / args.repeat * 1_000_000
+        print(f"{name:>6}: {results[name]:9.1f} us per {args.rows}-row page")
+    print(f"speedup: {results['legacy'] / results['fast']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
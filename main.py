@@ -3,22 +3,60 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.exceptions import RequestValidationError
 
-from app.api.v1 import users
+from app.api import internal, metrics
+from app.api.v1 import user_changes, users, users_async
+from app.core.config import settings
 from app.core.exception_handler import (
     exception_handler,
     validation_exception_handler,
 )
 from app.core.logging_config import setup_logging
-from app.database.init_db import init_db
+from app.core.metrics import MetricsMiddleware, route_templates
+from app.core.startup import startup_report
+from app.database.database import (
+    database_backend,
+    database_url,
+    get_async_engine,
+    get_engine,
+)
+from app.database.init_db import init_db, init_db_async
 from app.exceptions.app_exceptions import AppException
+from app.services.user_batching import create_batcher
+from app.services.user_changes import ChangeListener, change_feed
+from app.services.user_stats import stats_folder
 
 setup_logging()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    init_db()
+    # Credentials and engines are set up here rather than at import time,
+    # so the process is importable (and its imports timed) without the DB
+    with startup_report.measure("secret fetch"):
+        database_url()
+    with startup_report.measure("engine"):
+        if settings.database_async:
+            get_async_engine()
+        else:
+            get_engine()
+    with startup_report.measure("first connection"):
+        if settings.database_async:
+            await init_db_async()
+        else:
+            init_db()
+    startup_report.log()
+    listener = None
+    if settings.change_feed_notify and database_backend() == "postgresql":
+        listener = ChangeListener(get_engine(), change_feed)
+        listener.start()
+    if settings.user_stats_fold_interval > 0:
+        stats_folder.start()
     yield
+    # Flush creates still waiting for a group commit
+    create_batcher.stop()
+    if listener is not None:
+        listener.stop()
+    stats_folder.stop()
 
 
 app = FastAPI(
@@ -36,4 +74,25 @@ def handle_422(request, exc):
     return validation_exception_handler(request, exc)
 
 
-app.include_router(users.router, prefix="/api/v1/users")
+users_router = users_async.router if settings.database_async else users.router
+# Ahead of the users router so /changes is not taken for a /{user_id}
+app.include_router(user_changes.router, prefix="/api/v1/users")
+app.include_router(users_router, prefix="/api/v1/users")
+if settings.internal_token:
+    app.include_router(
+        internal.router, prefix="/internal", include_in_schema=False
+    )
+
+if settings.metrics_enabled:
+    app.add_middleware(
+        MetricsMiddleware,
+        route_labels={
+            **route_templates(user_changes.router, "/api/v1/users"),
+            **route_templates(users_router, "/api/v1/users"),
+            **route_templates(internal.router, "/internal"),
+            **route_templates(metrics.router),
+        },
+        long_lived={"/api/v1/users/changes"},
+    )
+    if settings.internal_token:
+        app.include_router(metrics.router, include_in_schema=False)
@@ -0,0 +1,69 @@
+import os
+from datetime import datetime, timedelta
+
+# Point app.database at an in-memory SQLite instead of Cloud SQL
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.models.user import RoleEnum, User
+from app.schemas.users import UserCreate
+
+
+@pytest.fixture
+def sqlite_engine():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db_session(sqlite_engine):
+    with Session(sqlite_engine) as session:
+        yield session
+
+
+@pytest.fixture
+def seed_users(db_session):
+    def seed(count: int):
+        start = datetime(2025, 1, 1)
+        users = [
+            User(
+                username=f"user{i:03d}",
+                email=f"user{i:03d}@example.com",
+                first_name="Seed",
+                last_name=f"User{i}",
+                role=RoleEnum.user,
+                active=True,
+                # Pairs of users share a timestamp to exercise tie-breaks
+                created_at=start + timedelta(minutes=i // 2),
+                updated_at=start + timedelta(minutes=i // 2),
+            )
+            for i in range(count)
+        ]
+        db_session.add_all(users)
+        db_session.commit()
+        return users
+
+    return seed
+
+
+@pytest.fixture
+def make_user():
+    def make(username, email=None, role=RoleEnum.user):
+        return UserCreate(
+            username=username,
+            email=email or f"{username}@example.com",
+            first_name="Test",
+            last_name="User",
+            role=role,
+        )
+
+    return make
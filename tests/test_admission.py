@@ -0,0 +1,140 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import admission as admission_module
+from app.core.admission import (
+    CREATE,
+    LIST,
+    LOOKUP,
+    WRITE,
+    AdmissionController,
+    RouteClass,
+    admit,
+    build_admission_controller,
+)
+from app.core.exception_handler import exception_handler
+from app.exceptions.app_exceptions import AppException, ServiceOverloaded
+
+
+def make_controller(capacity=1, lookup=(1, 2), listing=(1, 2), timeout=1.0):
+    return AdmissionController(
+        capacity,
+        queue_timeout=timeout,
+        retry_after=3,
+        classes=[
+            RouteClass(LOOKUP, 0, *lookup),
+            RouteClass(LIST, 1, *listing),
+        ],
+    )
+
+
+@pytest.mark.asyncio
+async def test_full_queue_is_shed_immediately():
+    controller = make_controller(lookup=(1, 0))
+    await controller.acquire(LOOKUP)
+
+    with pytest.raises(ServiceOverloaded) as exc_info:
+        await controller.acquire(LOOKUP)
+
+    assert exc_info.value.headers == {"Retry-After": "3"}
+    assert controller.classes[LOOKUP].shed["queue_full"] == 1
+
+
+@pytest.mark.asyncio
+async def test_freed_slot_goes_to_higher_priority_class():
+    controller = make_controller(capacity=1)
+    await controller.acquire(LIST)
+    order = []
+
+    async def wait_for(name):
+        await controller.acquire(name)
+        order.append(name)
+
+    waiting = [
+        asyncio.create_task(wait_for(LIST)),
+        asyncio.create_task(wait_for(LOOKUP)),
+    ]
+    await asyncio.sleep(0)
+    controller.release(LIST)
+
+    # The lookup queued last but is admitted first
+    assert controller.classes[LOOKUP].in_flight == 1
+    assert len(controller.classes[LIST].waiters) == 1
+    await waiting[1]
+    controller.release(LOOKUP)
+    await waiting[0]
+    assert order == [LOOKUP, LIST]
+
+
+@pytest.mark.asyncio
+async def test_wait_longer_than_timeout_is_shed():
+    controller = make_controller(timeout=0.01)
+    await controller.acquire(LOOKUP)
+
+    with pytest.raises(ServiceOverloaded):
+        await controller.acquire(LOOKUP)
+
+    route_class = controller.classes[LOOKUP]
+    assert route_class.shed["timeout"] == 1
+    assert not route_class.waiters
+    controller.release(LOOKUP)
+    assert controller.in_flight == 0
+
+
+def test_shed_request_uses_api_error_shape(monkeypatch):
+    controller = make_controller(lookup=(0, 0))
+    monkeypatch.setattr(admission_module, "admission", controller)
+    app = FastAPI()
+    app.add_exception_handler(AppException, exception_handler)
+
+    @app.get("/items", dependencies=[admit(LOOKUP)])
+    def read_items():
+        return []
+
+    response = TestClient(app).get("/items")
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "3"
+    assert response.json()["status"] == "error"
+    assert response.json()["data"] is None
+
+
+def test_batched_creates_fill_a_batch_without_using_pool_capacity(
+    monkeypatch,
+):
+    monkeypatch.setattr(admission_module.settings, "create_batching", True)
+    monkeypatch.setattr(
+        admission_module.settings, "create_batch_max_size", 200
+    )
+    controller = build_admission_controller()
+    creates = controller.classes[CREATE]
+
+    assert creates.limit == 200
+    assert not creates.pooled
+    assert controller.classes[WRITE].limit == 20
+    assert controller.capacity < 200
+
+
+@pytest.mark.asyncio
+async def test_unpooled_class_leaves_capacity_to_the_others():
+    controller = AdmissionController(
+        1,
+        queue_timeout=1.0,
+        retry_after=3,
+        classes=[
+            RouteClass(LOOKUP, 0, 1, 1),
+            RouteClass(CREATE, 1, 3, 1, pooled=False),
+        ],
+    )
+    for _ in range(3):
+        await controller.acquire(CREATE)
+    await controller.acquire(LOOKUP)
+
+    assert controller.in_flight == 1
+    assert controller.classes[CREATE].in_flight == 3
+    for _ in range(3):
+        controller.release(CREATE)
+    assert controller.in_flight == 1
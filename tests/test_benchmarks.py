@@ -0,0 +1,84 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from benchmarks import endpoints
+from benchmarks.report import compare, percentile, summarize
+
+
+def test_percentile_nearest_rank():
+    values = [float(n) for n in range(1, 101)]
+
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([7.0], 95) == 7.0
+    assert percentile([], 50) == 0.0
+
+
+def test_summarize_reports_throughput_and_percentiles():
+    summary = summarize([4.0, 1.0, 3.0, 2.0], errors=1, elapsed=2.0)
+
+    assert summary == {
+        "requests": 4,
+        "errors": 1,
+        "throughput_rps": 2.0,
+        "p50_ms": 2.0,
+        "p95_ms": 4.0,
+        "p99_ms": 4.0,
+    }
+
+
+def test_compare_flags_only_regressions_past_threshold():
+    baseline = {
+        "read": {"p95_ms": 10.0, "throughput_rps": 100.0},
+        "list_deep": {"p95_ms": 20.0, "throughput_rps": 50.0},
+        "delete": {"p95_ms": 5.0, "throughput_rps": 200.0},
+    }
+    current = {
+        "read": {"p95_ms": 11.5, "throughput_rps": 85.0},
+        "list_deep": {"p95_ms": 30.0, "throughput_rps": 35.0},
+    }
+
+    regressions = compare(current, baseline, threshold=0.2)
+
+    assert len(regressions) == 2
+    assert all(line.startswith("list_deep") for line in regressions)
+
+
+def test_compare_flags_errors_above_baseline():
+    base = {"p95_ms": 10.0, "throughput_rps": 100.0}
+    baseline = {
+        "read": {**base, "requests": 100, "errors": 0},
+        "write": {**base, "requests": 100, "errors": 2},
+        "list": {**base, "requests": 100, "errors": 2},
+    }
+    current = {
+        # Failing fast looks like a speed-up on latency alone
+        "read": {
+            "p95_ms": 2.0,
+            "throughput_rps": 400.0,
+            "requests": 100,
+            "errors": 1,
+        },
+        "write": {**base, "requests": 200, "errors": 4},
+        "list": {**base, "requests": 100, "errors": 5},
+    }
+
+    regressions = compare(current, baseline, threshold=0.2)
+
+    assert [line.split(":")[0] for line in regressions] == ["read", "list"]
+    assert "1 errors (1.0%) vs baseline 0 (0.0%)" in regressions[0]
+
+
+def test_start_server_fails_fast_when_the_server_exits(monkeypatch):
+    server = MagicMock(returncode=3)
+    server.poll.return_value = 3
+    monkeypatch.setattr(
+        endpoints.subprocess, "Popen", MagicMock(return_value=server)
+    )
+    probe = MagicMock()
+    monkeypatch.setattr(endpoints.httpx, "get", probe)
+
+    with pytest.raises(RuntimeError, match="exited with code 3"):
+        endpoints.start_server("sqlite://", 8123, async_mode=False)
+    probe.assert_not_called()
@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.core.conditional import (
+    http_date,
+    not_modified,
+    page_etag,
+    user_etag,
+)
+from app.exceptions.user_exceptions import UserNotFound
+from app.services.users import get_user_version
+
+
+def request_with(headers):
+    request = MagicMock()
+    request.headers = {key.lower(): value for key, value in headers.items()}
+    return request
+
+
+def test_user_etag_changes_with_updated_at():
+    now = datetime(2025, 4, 11, 20, 0, 0)
+
+    assert user_etag(1, now) == user_etag(1, now)
+    assert user_etag(1, now) != user_etag(1, now + timedelta(microseconds=1))
+    assert user_etag(1, now) != user_etag(2, now)
+
+
+def test_page_etag_tracks_rows_and_total():
+    now = datetime(2025, 4, 11)
+    rows = [(1, now), (2, now)]
+
+    assert page_etag(rows, 10) == page_etag(list(rows), 10)
+    assert page_etag(rows, 10) != page_etag(rows, 11)
+    assert page_etag(rows, 10) != page_etag(rows[:1], 10)
+
+
+def test_not_modified_if_none_match():
+    etag = '"u1-abc"'
+
+    assert not_modified(request_with({"If-None-Match": etag}), etag)
+    assert not_modified(request_with({"If-None-Match": f"W/{etag}"}), etag)
+    assert not_modified(request_with({"If-None-Match": '"x", ' + etag}), etag)
+    assert not not_modified(request_with({"If-None-Match": '"x"'}), etag)
+
+
+def test_if_none_match_takes_precedence_over_if_modified_since():
+    updated = datetime(2025, 4, 11, 20, 0, 0)
+    request = request_with(
+        {
+            "If-None-Match": '"other"',
+            "If-Modified-Since": http_date(updated),
+        }
+    )
+
+    assert not not_modified(request, '"u1-abc"', updated)
+
+
+def test_not_modified_if_modified_since():
+    updated = datetime(2025, 4, 11, 20, 0, 0, 500)
+
+    same = request_with({"If-Modified-Since": http_date(updated)})
+    older = request_with(
+        {"If-Modified-Since": http_date(updated - timedelta(seconds=5))}
+    )
+    garbage = request_with({"If-Modified-Since": "yesterday"})
+
+    assert not_modified(same, '"e"', updated)
+    assert not not_modified(older, '"e"', updated)
+    assert not not_modified(garbage, '"e"', updated)
+
+
+def test_get_user_version_selects_only_version_columns():
+    session = MagicMock()
+    now = datetime.now()
+    session.exec.return_value.first.return_value = MagicMock(
+        id=1, updated_at=now
+    )
+
+    assert get_user_version(1, session) == (1, now)
+    statement = session.exec.call_args.args[0]
+    assert [column.name for column in statement.selected_columns] == [
+        "id",
+        "updated_at",
+    ]
+    session.get.assert_not_called()
+
+
+def test_get_user_version_not_found():
+    session = MagicMock()
+    session.exec.return_value.first.return_value = None
+
+    with pytest.raises(UserNotFound):
+        get_user_version(5, session)
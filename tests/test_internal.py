@@ -0,0 +1,70 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import internal, metrics
+from app.core.config import settings
+from app.core.exception_handler import exception_handler
+from app.core.secrets import secret_cache
+from app.exceptions.app_exceptions import AppException
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_exception_handler(AppException, exception_handler)
+    app.include_router(internal.router, prefix="/internal")
+    app.include_router(metrics.router)
+    return TestClient(app)
+
+
+def test_internal_routes_require_the_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "internal_token", "s3cret")
+
+    assert client.get("/internal/pool").status_code == 401
+    response = client.get(
+        "/internal/pool", headers={"Authorization": "Bearer wrong"}
+    )
+    assert response.status_code == 401
+    assert response.headers["www-authenticate"] == "Bearer"
+
+    response = client.get(
+        "/internal/pool", headers={"Authorization": "Bearer s3cret"}
+    )
+    assert response.status_code == 200
+
+
+def test_internal_routes_refuse_everyone_without_a_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "internal_token", "")
+
+    response = client.get(
+        "/internal/cache", headers={"Authorization": "Bearer "}
+    )
+    assert response.status_code == 401
+
+
+def test_secret_refresh_needs_the_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "internal_token", "s3cret")
+    refreshes = []
+    monkeypatch.setattr(secret_cache, "refresh", lambda: refreshes.append(1))
+
+    assert client.post("/internal/secrets/refresh").status_code == 401
+    assert refreshes == []
+
+    response = client.post(
+        "/internal/secrets/refresh",
+        headers={"Authorization": "Bearer s3cret"},
+    )
+    assert response.status_code == 200
+    assert refreshes == [1]
+
+
+def test_metrics_need_the_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "internal_token", "s3cret")
+
+    assert client.get("/metrics").status_code == 401
+    response = client.get(
+        "/metrics", headers={"Authorization": "Bearer s3cret"}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
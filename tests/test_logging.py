@@ -0,0 +1,73 @@
+import json
+import logging
+import queue
+
+from app.core.logging_config import (
+    DeferredQueueHandler,
+    JSONFormatter,
+    SampledFilter,
+    TextFormatter,
+)
+
+
+def make_record(msg, *args, sampled=True):
+    record = logging.LogRecord(
+        "app.services.users", logging.WARNING, __file__, 1, msg, args, None
+    )
+    if sampled:
+        record.sampled = True
+    return record
+
+
+def test_sampled_filter_limits_burst_per_template():
+    log_filter = SampledFilter(burst=2, interval=60)
+
+    passed = [
+        log_filter.filter(make_record("User with ID %s not found", user_id))
+        for user_id in range(5)
+    ]
+
+    assert passed == [True, True, False, False, False]
+    assert log_filter.filter(make_record("Other message %s", 1))
+    assert log_filter.filter(make_record("Unsampled", sampled=False))
+
+
+def test_sampled_filter_reports_suppressed_count():
+    log_filter = SampledFilter(burst=1, interval=0)
+    log_filter.filter(make_record("User with ID %s not found", 1))
+    log_filter._windows[
+        ("app.services.users", "User with ID %s not found")
+    ][2] = 3
+
+    record = make_record("User with ID %s not found", 2)
+
+    assert log_filter.filter(record)
+    assert record.suppressed == 3
+    assert TextFormatter("%(message)s").format(record) == (
+        "User with ID 2 not found (3 similar messages suppressed)"
+    )
+
+
+def test_json_formatter_interpolates_lazily_formatted_message():
+    record = make_record("User with ID %s not found", 42)
+
+    entry = json.loads(JSONFormatter().format(record))
+
+    assert entry["level"] == "WARNING"
+    assert entry["logger"] == "app.services.users"
+    assert entry["message"] == "User with ID 42 not found"
+
+
+def test_queued_record_keeps_the_arguments_as_logged():
+    records = queue.SimpleQueue()
+    handler = DeferredQueueHandler(records)
+    errors = [{"loc": ["body", "email"]}]
+
+    handler.handle(make_record("Validation failed: %s", errors))
+    errors.append({"loc": ["body", "username"]})
+
+    queued = records.get_nowait()
+    assert queued.getMessage() == (
+        "Validation failed: [{'loc': ['body', 'email']}]"
+    )
+    assert queued.args is None
@@ -0,0 +1,66 @@
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.core import metrics as metrics_module
+from app.core.metrics import (
+    Histogram,
+    MetricsMiddleware,
+    MetricsRegistry,
+    instrument_queries,
+    route_templates,
+)
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value)
+
+    lines = list(histogram.lines("latency", 'route="/"'))
+
+    assert lines == [
+        'latency_bucket{route="/",le="0.1"} 1',
+        'latency_bucket{route="/",le="1.0"} 3',
+        'latency_bucket{route="/",le="+Inf"} 4',
+        'latency_sum{route="/"} 4.250000',
+        'latency_count{route="/"} 4',
+    ]
+
+
+def test_middleware_times_sql_per_request(sqlite_engine, monkeypatch):
+    registry = MetricsRegistry()
+    monkeypatch.setattr(metrics_module, "metrics", registry)
+    instrument_queries(sqlite_engine)
+
+    router = APIRouter()
+
+    @router.get("/{item_id}")
+    def read_item(item_id: int):
+        with sqlite_engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            connection.execute(text("SELECT 2"))
+        return {"id": item_id}
+
+    app = FastAPI()
+    app.include_router(router, prefix="/items")
+    app.add_middleware(
+        MetricsMiddleware, route_labels=route_templates(router, "/items")
+    )
+
+    with TestClient(app) as client:
+        response = client.get("/items/7")
+        client.get("/missing")
+
+    assert response.headers["server-timing"].startswith("db;dur=")
+    assert 'desc="2 queries"' in response.headers["server-timing"]
+    assert registry.requests == {
+        ("GET", "/items/{item_id}", 200): 1,
+        ("GET", "unmatched", 404): 1,
+    }
+    assert registry.queries[("GET", "/items/{item_id}")] == 2
+    rendered = "\n".join(registry.render())
+    assert (
+        'http_request_duration_seconds_count{method="GET",'
+        'route="/items/{item_id}"} 1'
+    ) in rendered
@@ -0,0 +1,84 @@
+import pytest
+
+from app.exceptions.app_exceptions import InvalidCursor
+from app.schemas.users import UserSortField
+from app.services.pagination import NEXT, decode_cursor, encode_cursor
+from app.services.users import get_users_by_cursor
+
+
+def walk_forward(session, limit, sort):
+    ids, cursor = [], None
+    while True:
+        users, next_cursor, _ = get_users_by_cursor(
+            session, limit, cursor, sort
+        )
+        ids.extend(user.id for user in users)
+        if not next_cursor:
+            return ids
+        cursor = next_cursor
+
+
+@pytest.mark.parametrize("sort", list(UserSortField))
+def test_cursor_pages_cover_every_user_once(
+    db_session, seed_users, sort
+):
+    seed_users(11)
+
+    ids = walk_forward(db_session, 3, sort)
+
+    assert len(ids) == 11
+    assert sorted(ids) == list(range(1, 12))
+
+
+def test_cursor_first_page_has_no_prev(db_session, seed_users):
+    seed_users(5)
+
+    users, next_cursor, prev_cursor = get_users_by_cursor(
+        db_session, limit=2
+    )
+
+    assert [user.id for user in users] == [1, 2]
+    assert next_cursor is not None
+    assert prev_cursor is None
+
+
+def test_cursor_prev_returns_previous_page(db_session, seed_users):
+    seed_users(7)
+    sort = UserSortField.created_at
+
+    first, cursor, _ = get_users_by_cursor(db_session, 3, None, sort)
+    _, _, prev_cursor = get_users_by_cursor(
+        db_session, 3, cursor, sort
+    )
+    back, next_cursor, back_prev = get_users_by_cursor(
+        db_session, 3, prev_cursor, sort
+    )
+
+    assert [user.id for user in back] == [user.id for user in first]
+    assert back_prev is None
+    assert next_cursor is not None
+
+
+def test_cursor_last_page_has_no_next(db_session, seed_users):
+    seed_users(4)
+
+    _, cursor, _ = get_users_by_cursor(db_session, 2)
+    users, next_cursor, prev_cursor = get_users_by_cursor(
+        db_session, 2, cursor
+    )
+
+    assert [user.id for user in users] == [3, 4]
+    assert next_cursor is None
+    assert prev_cursor is not None
+
+
+def test_decode_cursor_rejects_garbage():
+    with pytest.raises(InvalidCursor):
+        decode_cursor("not-a-cursor", UserSortField.id)
+
+
+def test_decode_cursor_rejects_sort_mismatch():
+    cursor = encode_cursor(UserSortField.id, 5, 5, NEXT)
+
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, UserSortField.username)
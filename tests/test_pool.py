@@ -0,0 +1,70 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from app.database.pool import (
+    InstrumentedQueuePool,
+    instrument_engine,
+    pool_options,
+    pool_stats,
+)
+
+
+@pytest.fixture
+def pooled_engine(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    yield engine
+    engine.dispose()
+    pool_stats.pop("test", None)
+
+
+def test_instrumented_pool_counts_checkouts(pooled_engine):
+    stats = instrument_engine(pooled_engine, "test")
+
+    for _ in range(3):
+        with pooled_engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+
+    snapshot = stats.snapshot()
+    assert snapshot["connects"] == 1
+    assert snapshot["checkouts"] == 3
+    assert snapshot["checkins"] == 3
+    assert snapshot["peak_checked_out"] == 1
+    assert snapshot["size"] == 1
+    assert snapshot["checked_out"] == 0
+
+
+def test_instrumented_pool_counts_timeouts(pooled_engine):
+    stats = instrument_engine(pooled_engine, "test")
+
+    with pooled_engine.connect():
+        with pytest.raises(PoolTimeoutError):
+            pooled_engine.connect()
+
+    snapshot = stats.snapshot()
+    assert snapshot["timeouts"] == 1
+    assert snapshot["wait_ms_max"] >= 50
+
+
+def test_instrumented_pool_survives_dispose(pooled_engine):
+    stats = instrument_engine(pooled_engine, "test")
+
+    pooled_engine.dispose()
+    with pooled_engine.connect():
+        pass
+
+    assert pooled_engine.pool.stats is stats
+    assert stats.snapshot()["checkouts"] == 1
+
+
+def test_pool_options_skip_sqlite():
+    assert pool_options("sqlite") == {}
+    options = pool_options("postgresql")
+    assert options["poolclass"] is InstrumentedQueuePool
+    assert options["pool_pre_ping"] is True
@@ -0,0 +1,125 @@
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi import Response
+from sqlalchemy import create_engine, text
+
+from app.database import database
+from app.database.replicas import (
+    LAST_WRITE_COOKIE,
+    LAST_WRITE_HEADER,
+    Replica,
+    ReplicaSet,
+    from_replica,
+    pinned_to_primary,
+    remember_write,
+)
+
+
+def make_request(headers=None, cookies=None):
+    request = MagicMock()
+    request.headers = headers or {}
+    request.cookies = cookies or {}
+    return request
+
+
+def test_candidates_rotate_round_robin():
+    replicas = ReplicaSet([Replica("a", None), Replica("b", None)], 30)
+
+    first = [replicas.candidates()[0].name for _ in range(4)]
+
+    assert first == ["a", "b", "a", "b"]
+
+
+def test_replica_marked_down_is_skipped_until_cooldown_ends():
+    replica_a, replica_b = Replica("a", None), Replica("b", None)
+    replicas = ReplicaSet([replica_a, replica_b], cooldown=30)
+
+    replicas.mark_down(replica_a, RuntimeError("refused"))
+
+    assert [replica.name for replica in replicas.candidates()] == ["b"]
+    replica_a.down_until = time.monotonic() - 1
+    assert {replica.name for replica in replicas.candidates()} == {"a", "b"}
+    assert replicas.snapshot()["replicas"]["a"]["failures"] == 1
+
+
+def test_recent_write_pins_reads_to_primary(monkeypatch):
+    monkeypatch.setattr(
+        database.settings, "read_your_writes_window", 5.0
+    )
+    now = time.time()
+
+    assert pinned_to_primary(make_request({LAST_WRITE_HEADER: str(now)}))
+    assert pinned_to_primary(
+        make_request(cookies={LAST_WRITE_COOKIE: str(now - 1)})
+    )
+    assert not pinned_to_primary(
+        make_request({LAST_WRITE_HEADER: str(now - 60)})
+    )
+    assert not pinned_to_primary(make_request({LAST_WRITE_HEADER: "soon"}))
+    # A timestamp from the future would pin the client indefinitely
+    assert not pinned_to_primary(
+        make_request({LAST_WRITE_HEADER: str(now + 3600)})
+    )
+    assert not pinned_to_primary(make_request())
+
+
+def test_remember_write_stamps_response_only_with_replicas(monkeypatch):
+    monkeypatch.setattr(database.settings, "database_replica_urls", "")
+    assert LAST_WRITE_HEADER not in remember_write(Response()).headers
+
+    monkeypatch.setattr(
+        database.settings, "database_replica_urls", "sqlite:///replica.db"
+    )
+    response = remember_write(Response())
+
+    assert float(response.headers[LAST_WRITE_HEADER]) == pytest.approx(
+        time.time(), abs=5
+    )
+    assert LAST_WRITE_COOKIE in response.headers["set-cookie"]
+
+
+def test_read_session_falls_back_to_primary(monkeypatch, tmp_path):
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    dead = Replica(
+        "replica0", create_engine(f"sqlite:///{tmp_path}/missing/r.db")
+    )
+    replicas = ReplicaSet([dead], cooldown=30)
+    monkeypatch.setattr(database, "get_engine", lambda: primary)
+    monkeypatch.setattr(database, "get_replica_set", lambda: replicas)
+
+    sessions = database.get_read_session(make_request())
+    session = next(sessions)
+
+    assert session.get_bind() is primary
+    assert not from_replica(session)
+    assert session.execute(text("SELECT 1")).scalar() == 1
+    assert replicas.fallbacks == 1
+    assert dead.down_until > time.monotonic()
+    sessions.close()
+
+
+def test_read_session_uses_healthy_replica(monkeypatch, tmp_path):
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica = Replica(
+        "replica0", create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    )
+    replicas = ReplicaSet([replica], cooldown=30)
+    monkeypatch.setattr(database, "get_engine", lambda: primary)
+    monkeypatch.setattr(database, "get_replica_set", lambda: replicas)
+
+    sessions = database.get_read_session(make_request())
+    session = next(sessions)
+
+    assert session.get_bind().engine is replica.engine
+    assert from_replica(session)
+    assert replica.reads == 1
+    sessions.close()
+
+    pinned = database.get_read_session(
+        make_request({LAST_WRITE_HEADER: str(time.time())})
+    )
+    assert next(pinned).get_bind() is primary
+    pinned.close()
+
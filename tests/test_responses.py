@@ -0,0 +1,75 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from app.core import responses
+from app.core.config import settings
+from app.models.user import RoleEnum, User
+from app.schemas.users import UserRead
+
+
+@pytest.fixture
+def users():
+    now = datetime(2025, 4, 11, 20, 0, 0, 123456)
+    return [
+        User(
+            id=i,
+            username=f"user{i}",
+            email=f"user{i}@example.com",
+            first_name="Fast",
+            last_name="Path",
+            role=RoleEnum.guest,
+            active=bool(i % 2),
+            created_at=now,
+            updated_at=now,
+        )
+        for i in range(1, 4)
+    ]
+
+
+def render_page(users):
+    response = responses.paginated_response(
+        responses.users_payload(users),
+        total=3,
+        total_exact=True,
+        page=1,
+        limit=3,
+        next_cursor=None,
+        prev_cursor=None,
+        message="Users fetched successfully.",
+        headers={"ETag": '"p-1"'},
+    )
+    body = json.loads(response.body)
+    body.pop("response_time")
+    return response, body
+
+
+def test_fast_and_pydantic_paths_render_the_same_page(users, monkeypatch):
+    monkeypatch.setattr(settings, "fast_responses", True)
+    fast_response, fast_body = render_page(users)
+    monkeypatch.setattr(settings, "fast_responses", False)
+    _, slow_body = render_page(users)
+
+    assert fast_body == slow_body
+    assert list(fast_body["data"][0]) == list(UserRead.model_fields)
+    assert fast_response.headers["content-type"] == "application/json"
+    assert fast_response.headers["etag"] == '"p-1"'
+
+
+def test_user_payload_accepts_cached_user_read(users, monkeypatch):
+    monkeypatch.setattr(settings, "fast_responses", True)
+    cached = UserRead.model_validate(users[0])
+
+    assert responses.user_payload(cached) == responses.user_payload(
+        users[0]
+    )
+
+
+def test_api_response_status_code(users):
+    response = responses.api_response(
+        responses.user_payload(users[0]), "created", status_code=201
+    )
+
+    assert response.status_code == 201
+    assert json.loads(response.body)["data"]["username"] == "user1"
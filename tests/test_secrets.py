@@ -0,0 +1,100 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.core.secrets import SecretCache
+from app.core.startup import StartupReport
+from app.database import database
+
+
+def secret_client(*values):
+    client = MagicMock()
+    client.access_secret_version.side_effect = [
+        value
+        if isinstance(value, Exception)
+        else MagicMock(payload=MagicMock(data=value.encode("utf-8")))
+        for value in values
+    ]
+    return client
+
+
+def test_secret_is_cached_until_refresh():
+    cache = SecretCache(ttl=60)
+    cache._client = secret_client("first", "second")
+
+    assert cache.get("project", "db-password") == "first"
+    assert cache.get("project", "db-password") == "first"
+    cache.refresh()
+    assert cache.get("project", "db-password") == "second"
+    assert cache._client.access_secret_version.call_count == 2
+    assert cache.last_fetch_ms is not None
+
+
+def test_expired_secret_is_fetched_again():
+    cache = SecretCache(ttl=0)
+    cache._client = secret_client("first", "rotated")
+
+    assert cache.get("project", "db-password") == "first"
+    assert cache.get("project", "db-password") == "rotated"
+
+
+def test_failed_refetch_keeps_last_value():
+    cache = SecretCache(ttl=0)
+    cache._client = secret_client("first", RuntimeError("unavailable"))
+
+    assert cache.get("project", "db-password") == "first"
+    assert cache.get("project", "db-password") == "first"
+
+
+def test_failed_first_fetch_returns_none():
+    cache = SecretCache(ttl=60)
+    cache._client = secret_client(RuntimeError("unavailable"))
+
+    assert cache.get("project", "db-password") is None
+
+
+def test_forked_worker_builds_its_own_client():
+    cache = SecretCache(ttl=60)
+    inherited = secret_client("first")
+    cache._client = inherited
+    assert cache.get("project", "db-password") == "first"
+
+    cache.after_fork()
+    cache._secret_client = lambda: secret_client("fresh")
+
+    assert cache._client is None
+    assert cache.get("project", "db-password") == "fresh"
+    assert inherited.access_secret_version.call_count == 1
+
+
+def test_database_url_requires_cloud_sql_settings(monkeypatch):
+    monkeypatch.setattr(database.settings, "database_url", None)
+    monkeypatch.setattr(database, "DB_USER", None)
+
+    with pytest.raises(Exception, match="Unable to init database engine"):
+        database.database_url()
+
+
+def test_database_url_leaves_password_to_connect(monkeypatch):
+    monkeypatch.setattr(database.settings, "database_url", None)
+    monkeypatch.setattr(database, "DB_USER", "api")
+    monkeypatch.setattr(database, "DB_HOST", "/cloudsql/instance")
+    monkeypatch.setattr(database, "DB_NAME", "users")
+    monkeypatch.setattr(database, "DB_PASSWORD_SECRET_ID", None)
+    monkeypatch.setattr(database, "DB_PASSWORD", "s3cret")
+
+    url = database.database_url()
+
+    assert url.startswith("postgresql+psycopg2://api@/")
+    assert "s3cret" not in url
+
+
+def test_startup_report_measures_phases():
+    report = StartupReport()
+
+    with report.measure("engine"):
+        pass
+    report.record("imports", 12.5)
+
+    assert list(report.phases) == ["engine", "imports"]
+    assert report.phases["imports"] == 12.5
@@ -0,0 +1,100 @@
+from app.core.config import settings
+from app.database import database
+from app.server import (
+    apply_pool_budget,
+    available_cpus,
+    cgroup_cpu_limit,
+    share_change_feed,
+    split_pool,
+    worker_count,
+)
+
+
+def test_cgroup_v2_quota(tmp_path):
+    (tmp_path / "cpu.max").write_text("150000 100000\n")
+    assert cgroup_cpu_limit(str(tmp_path)) == 1.5
+
+    (tmp_path / "cpu.max").write_text("max 100000\n")
+    assert cgroup_cpu_limit(str(tmp_path)) is None
+
+
+def test_cgroup_v1_quota(tmp_path):
+    cpu = tmp_path / "cpu"
+    cpu.mkdir()
+    (cpu / "cpu.cfs_period_us").write_text("100000\n")
+    (cpu / "cpu.cfs_quota_us").write_text("200000\n")
+    assert cgroup_cpu_limit(str(tmp_path)) == 2.0
+
+    (cpu / "cpu.cfs_quota_us").write_text("-1\n")
+    assert cgroup_cpu_limit(str(tmp_path)) is None
+
+
+def test_available_cpus_rounds_the_quota_up(tmp_path, monkeypatch):
+    monkeypatch.setattr("os.sched_getaffinity", lambda pid: set(range(8)))
+    (tmp_path / "cpu.max").write_text("150000 100000\n")
+    assert available_cpus(str(tmp_path)) == 2
+
+    (tmp_path / "cpu.max").write_text("max 100000\n")
+    assert available_cpus(str(tmp_path)) == 8
+
+
+def test_split_pool_keeps_settings_that_fit():
+    assert split_pool(4, 0, 10, 20) == (10, 20)
+    assert split_pool(2, 100, 10, 20) == (10, 20)
+
+
+def test_split_pool_divides_the_budget():
+    pool_size, max_overflow = split_pool(4, 50, 10, 20)
+    assert (pool_size, max_overflow) == (4, 8)
+    assert 4 * (pool_size + max_overflow) <= 50
+
+    pool_size, max_overflow = split_pool(4, 50, 10, 20, reserved=1)
+    assert 4 * (pool_size + max_overflow + 1) <= 50
+
+
+def test_split_pool_leaves_every_worker_a_connection():
+    assert split_pool(8, 8, 10, 20) == (1, 0)
+
+
+def test_split_pool_divides_the_share_between_engines():
+    pool_size, max_overflow = split_pool(4, 50, 10, 20, engines=2)
+    assert (pool_size, max_overflow) == (2, 4)
+    assert 4 * 2 * (pool_size + max_overflow) <= 50
+
+
+def test_async_mode_budgets_the_sync_engine_too(monkeypatch):
+    monkeypatch.setattr(settings, "database_async", True)
+    monkeypatch.setattr(settings, "change_feed_notify", False)
+    monkeypatch.setattr(settings, "db_max_connections", 40)
+    monkeypatch.setattr(settings, "db_pool_size", 10)
+    monkeypatch.setattr(settings, "db_max_overflow", 20)
+
+    apply_pool_budget(4)
+
+    per_engine = settings.db_pool_size + settings.db_max_overflow
+    assert 4 * 2 * per_engine <= 40
+
+
+def test_worker_count_is_capped_by_the_connection_budget(monkeypatch):
+    monkeypatch.setattr(settings, "web_concurrency", 6)
+    assert worker_count() == 6
+    assert worker_count(max_connections=4) == 4
+    assert worker_count(max_connections=6, per_worker=2) == 3
+
+
+def test_several_workers_share_the_feed_through_notify(monkeypatch):
+    monkeypatch.setattr(settings, "change_feed_notify", False)
+    monkeypatch.setattr(database, "database_backend", lambda: "postgresql")
+
+    assert share_change_feed(1) == 1
+    assert not settings.change_feed_notify
+    assert share_change_feed(4) == 4
+    assert settings.change_feed_notify
+
+
+def test_feed_without_notify_runs_a_single_worker(monkeypatch):
+    monkeypatch.setattr(settings, "change_feed_notify", False)
+    monkeypatch.setattr(database, "database_backend", lambda: "sqlite")
+
+    assert share_change_feed(4) == 1
+    assert not settings.change_feed_notify
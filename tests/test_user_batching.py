@@ -0,0 +1,84 @@
+import pytest
+from sqlmodel import Session
+
+from app.exceptions.user_exceptions import (
+    EmailAlreadyExists,
+    UsernameAlreadyExists,
+)
+from app.models.user import User
+from app.services.user_batching import CreateBatcher
+
+
+@pytest.fixture
+def make_batcher(sqlite_engine):
+    batchers = []
+
+    def make(max_batch_size=10, linger=0.2):
+        batcher = CreateBatcher(
+            lambda: Session(sqlite_engine), max_batch_size, linger
+        )
+        batchers.append(batcher)
+        return batcher
+
+    yield make
+    for batcher in batchers:
+        batcher.stop()
+
+
+def batch_counts(batcher):
+    return sum(batcher.batch_sizes.counts)
+
+
+def test_concurrent_creates_share_one_commit(make_batcher, make_user):
+    batcher = make_batcher()
+
+    futures = [batcher.submit(make_user(f"flash{i}")) for i in range(3)]
+    users = [future.result(timeout=5) for future in futures]
+
+    assert [user.username for user in users] == ["flash0", "flash1", "flash2"]
+    assert all(isinstance(user, User) and user.id for user in users)
+    assert batch_counts(batcher) == 1
+    assert batcher.batch_sizes.sum == 3
+
+
+def test_each_request_gets_its_own_conflict(
+    make_batcher, seed_users, make_user
+):
+    seed_users(1)
+    batcher = make_batcher()
+
+    futures = [
+        batcher.submit(make_user("user000", "new@example.com")),
+        batcher.submit(make_user("fresh", "user000@example.com")),
+        batcher.submit(make_user("twice")),
+        batcher.submit(make_user("twice", "other@example.com")),
+    ]
+
+    with pytest.raises(UsernameAlreadyExists):
+        futures[0].result(timeout=5)
+    with pytest.raises(EmailAlreadyExists):
+        futures[1].result(timeout=5)
+    assert futures[2].result(timeout=5).username == "twice"
+    with pytest.raises(UsernameAlreadyExists):
+        futures[3].result(timeout=5)
+    assert (batcher.created, batcher.failed) == (1, 3)
+
+
+def test_batches_are_capped_at_max_size(make_batcher, make_user):
+    batcher = make_batcher(max_batch_size=2)
+
+    futures = [batcher.submit(make_user(f"cap{i}")) for i in range(5)]
+    for future in futures:
+        future.result(timeout=5)
+
+    assert batch_counts(batcher) == 3
+    assert batcher.batch_sizes.sum == 5
+
+
+def test_stop_flushes_pending_creates(make_batcher, make_user):
+    batcher = make_batcher(linger=60)
+    future = batcher.submit(make_user("late"))
+
+    batcher.stop()
+
+    assert future.result(timeout=0).username == "late"
@@ -0,0 +1,163 @@
+import pytest
+from sqlalchemy import event
+
+from app.exceptions.user_exceptions import InvalidBulkSelection
+from app.models.user import RoleEnum, User
+from app.schemas.users import (
+    BulkUserResult,
+    UserBulkDelete,
+    UserBulkUpdate,
+    UserFilter,
+    UserUpdate,
+)
+from app.services import user_bulk
+from app.services.user_bulk import (
+    create_users_bulk,
+    delete_users_bulk,
+    update_users_bulk,
+    validate_bulk_row,
+)
+
+
+def test_create_users_bulk_inserts_chunk(db_session, make_user):
+    rows = [(i, make_user(f"bulk{i}")) for i in range(3)]
+
+    results = create_users_bulk(rows, db_session)
+
+    assert [result.status for result in results] == ["created"] * 3
+    assert [result.index for result in results] == [0, 1, 2]
+    assert len({result.id for result in results}) == 3
+
+
+def test_create_users_bulk_reports_conflicts_per_row(
+    db_session, seed_users, make_user
+):
+    seed_users(1)
+    rows = [
+        (0, make_user("user000", "fresh@example.com")),
+        (1, make_user("fresh", "user000@example.com")),
+        (2, make_user("dup")),
+        (3, make_user("dup", "other@example.com")),
+        (4, make_user("ok")),
+    ]
+
+    results = create_users_bulk(rows, db_session)
+
+    assert [(result.status, result.error) for result in results] == [
+        ("error", "UsernameAlreadyExists"),
+        ("error", "EmailAlreadyExists"),
+        ("created", None),
+        ("error", "UsernameAlreadyExists"),
+        ("created", None),
+    ]
+
+
+def test_create_users_bulk_falls_back_on_race(
+    db_session, seed_users, monkeypatch, make_user
+):
+    seed_users(1)
+    # Simulate a concurrent insert landing after the pre-check
+    monkeypatch.setattr(
+        user_bulk,
+        "existing_user_keys",
+        lambda user_creates, session: (set(), set()),
+    )
+    rows = [(0, make_user("user000", "x@example.com")), (1, make_user("new"))]
+
+    results = create_users_bulk(rows, db_session)
+
+    assert results[0].error == "UsernameAlreadyExists"
+    assert results[1].status == "created"
+
+
+def test_validate_bulk_row_reports_validation_errors():
+    result = validate_bulk_row(7, {"username": "x", "email": "nope"})
+
+    assert isinstance(result, BulkUserResult)
+    assert result.index == 7
+    assert result.error == "ValidationError"
+    assert "email" in result.message
+
+
+def test_update_users_bulk_by_ids_reports_missing(db_session, seed_users):
+    users = seed_users(3)
+    bulk_update = UserBulkUpdate(
+        ids=[users[2].id, users[0].id, 999],
+        changes=UserUpdate(role=RoleEnum.guest),
+    )
+
+    result = update_users_bulk(bulk_update, db_session, chunk_size=10)
+
+    assert result.affected == 2
+    assert result.ids == [users[0].id, users[2].id]
+    assert result.not_found == [999]
+    db_session.expire_all()
+    assert db_session.get(User, users[1].id).role == RoleEnum.user
+    assert db_session.get(User, users[2].id).role == RoleEnum.guest
+
+
+def test_update_users_bulk_by_filter_runs_one_update_per_chunk(
+    db_session, sqlite_engine, seed_users
+):
+    seed_users(5)
+    statements = []
+
+    @event.listens_for(sqlite_engine, "before_cursor_execute")
+    def capture(connection, cursor, statement, *args):
+        statements.append(statement)
+
+    bulk_update = UserBulkUpdate(
+        filter=UserFilter(role=RoleEnum.user),
+        changes=UserUpdate(active=False),
+    )
+    result = update_users_bulk(bulk_update, db_session, chunk_size=2)
+
+    assert result.affected == 5
+    assert result.not_found == []
+    updates = [s for s in statements if s.startswith("UPDATE")]
+    assert len(updates) == 3
+    assert db_session.exec(
+        User.__table__.select().where(User.active.is_(True))
+    ).all() == []
+
+
+def test_delete_users_bulk_soft_deactivates(db_session, seed_users):
+    users = seed_users(2)
+
+    result = delete_users_bulk(
+        UserBulkDelete(ids=[users[0].id], soft=True), db_session, 10
+    )
+
+    assert result.ids == [users[0].id]
+    db_session.expire_all()
+    assert db_session.get(User, users[0].id).active is False
+    assert db_session.get(User, users[1].id).active is True
+
+
+def test_delete_users_bulk_by_filter(db_session, seed_users):
+    seed_users(4)
+
+    result = delete_users_bulk(
+        UserBulkDelete(filter=UserFilter(username_prefix="user00")),
+        db_session,
+        chunk_size=3,
+    )
+
+    assert result.affected == 4
+    assert db_session.exec(User.__table__.select()).all() == []
+
+
+@pytest.mark.parametrize(
+    "selection",
+    [
+        {},
+        {"ids": []},
+        {"filter": {}},
+        {"ids": [1], "filter": {"role": "user"}},
+    ],
+)
+def test_bulk_writes_reject_ambiguous_selection(db_session, selection):
+    with pytest.raises(InvalidBulkSelection):
+        delete_users_bulk(
+            UserBulkDelete.model_validate(selection), db_session, 10
+        )
@@ -0,0 +1,212 @@
+from datetime import datetime
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.core import cache as cache_module
+from app.core.cache import CacheStats, MemoryCache, RedisCache
+from app.core.config import settings
+from app.database.replicas import REPLICA_SESSION
+from app.exceptions.user_exceptions import UserNotFound
+from app.models.user import RoleEnum, User
+from app.schemas.users import UserRead, UserUpdate
+from app.services import users
+from app.services.user_cache import (
+    USER_NOT_FOUND,
+    UserCache,
+    build_user_cache,
+)
+
+
+class FakeRedis:
+    """Local stand-in for the subset of the Redis API the cache uses."""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def set(self, key, value, px=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def scan_iter(self, match):
+        prefix = match.rstrip("*")
+        return [key for key in self.data if key.startswith(prefix)]
+
+
+@pytest.fixture(params=["memory", "redis"])
+def user_cache(request, monkeypatch):
+    stats = CacheStats()
+    if request.param == "memory":
+        backend = MemoryCache(100, stats)
+    else:
+        backend = RedisCache(FakeRedis(), stats, prefix="test:")
+    cache = UserCache(backend, stats, ttl=60, not_found_ttl=5)
+    monkeypatch.setattr(users, "user_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def stored_user():
+    now = datetime.now()
+    return User(
+        id=1,
+        username="cached",
+        email="cached@example.com",
+        first_name="Cached",
+        last_name="User",
+        role=RoleEnum.user,
+        active=True,
+        created_at=now,
+        updated_at=now,
+    )
+
+
+def test_get_user_by_id_reads_through_cache(user_cache, stored_user):
+    session = MagicMock(info={})
+    session.get.return_value = stored_user
+
+    first = users.get_user_by_id(1, session)
+    second = users.get_user_by_id(1, session)
+
+    assert first.username == second.username == "cached"
+    assert isinstance(second, UserRead)
+    session.get.assert_called_once()
+    assert user_cache.stats.snapshot()["hits"] == 1
+    assert user_cache.stats.snapshot()["misses"] == 1
+
+
+def test_get_user_by_id_caches_not_found(user_cache):
+    session = MagicMock(info={})
+    session.get.return_value = None
+
+    for _ in range(3):
+        with pytest.raises(UserNotFound):
+            users.get_user_by_id(99, session)
+
+    session.get.assert_called_once()
+    assert user_cache.get(99) is USER_NOT_FOUND
+
+
+def test_get_users_by_ids_queries_only_cache_misses(
+    user_cache, stored_user
+):
+    user_cache.set(stored_user)
+    user_cache.set_not_found(5)
+    session = MagicMock(info={})
+    other = stored_user.model_copy(update={"id": 2, "username": "other"})
+    session.exec.return_value.all.return_value = [other]
+
+    found = users.get_users_by_ids([2, 1, 5, 3, 2], session)
+
+    assert list(found) == [2, 1, 5, 3]
+    assert found[1].username == "cached"
+    assert found[2].username == "other"
+    assert found[3] is None and found[5] is None
+    session.exec.assert_called_once()
+    # The lookup fills the cache for the next batch, 404s included
+    assert user_cache.get(2).username == "other"
+    assert user_cache.get(3) is USER_NOT_FOUND
+
+
+def test_update_and_delete_invalidate_cache(user_cache, stored_user):
+    session = MagicMock(info={})
+    user_cache.set(stored_user)
+    result = MagicMock()
+    result.mappings.return_value.first.return_value = {
+        **stored_user.model_dump(),
+        "first_name": "Changed",
+    }
+    result.scalar.return_value = 1
+    session.execute.return_value = result
+
+    users.update_user(1, UserUpdate(first_name="Changed"), session)
+    assert user_cache.get(1) is None
+
+    user_cache.set(stored_user)
+    users.delete_user(1, session)
+    assert user_cache.get(1) is None
+
+
+def test_replica_reads_do_not_fill_the_cache(user_cache, stored_user):
+    session = MagicMock(info={REPLICA_SESSION: True})
+    session.get.side_effect = [stored_user, None]
+    session.exec.return_value.all.return_value = [stored_user]
+
+    users.get_user_by_id(1, session)
+    # A user the replica has not seen yet is not cached as a 404 either
+    with pytest.raises(UserNotFound):
+        users.get_user_by_id(2, session)
+    users.get_users_by_ids([1, 3], session)
+
+    assert user_cache.get(1) is None
+    assert user_cache.get(2) is None
+    assert user_cache.get(3) is None
+
+
+def test_read_started_before_a_write_does_not_refill_the_cache(
+    user_cache, stored_user
+):
+    stale = stored_user.model_copy()
+    session = MagicMock(info={})
+
+    def read_then_write(model, user_id):
+        # A write lands while this read is in flight
+        user_cache.invalidate(user_id)
+        return stale
+
+    session.get.side_effect = read_then_write
+
+    users.get_user_by_id(1, session)
+
+    assert user_cache.get(1) is None
+    session.get.side_effect = None
+    session.get.return_value = stored_user
+    users.get_user_by_id(1, session)
+    assert session.get.call_count == 2
+
+
+def test_memory_cache_evicts_least_recently_used():
+    stats = CacheStats()
+    cache = MemoryCache(2, stats)
+
+    cache.set("a", b"1", 60)
+    cache.set("b", b"2", 60)
+    cache.get("a")
+    cache.set("c", b"3", 60)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1"
+    assert stats.snapshot()["evictions"] == 1
+
+
+def test_memory_cache_expires_entries(monkeypatch):
+    stats = CacheStats()
+    cache = MemoryCache(10, stats)
+    clock = [0.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: clock[0])
+
+    cache.set("a", b"1", 5)
+    clock[0] = 6
+
+    assert cache.get("a") is None
+    assert stats.snapshot()["expirations"] == 1
+
+
+def test_redis_backend_is_rejected_in_async_mode(monkeypatch):
+    monkeypatch.setattr(settings, "user_cache_backend", "redis")
+    monkeypatch.setattr(settings, "database_async", True)
+
+    with pytest.raises(RuntimeError, match="DATABASE_ASYNC"):
+        build_user_cache()
@@ -0,0 +1,209 @@
+import sqlite3
+import threading
+
+import orjson
+import pytest
+
+from app.exceptions.user_exceptions import UsernameAlreadyExists
+from app.models.user import RoleEnum, User
+from app.schemas.users import UserUpdate
+from app.services import user_changes
+from app.services.user_changes import (
+    NOTIFY_PAYLOAD_LIMIT,
+    SHARED_EPOCH,
+    ChangeFeed,
+    ChangeListener,
+    _notify_payloads,
+    change_feed,
+    iter_changes,
+)
+from app.services.users import create_user, delete_user, update_user
+
+
+def test_feed_returns_events_after_a_position():
+    feed = ChangeFeed(size=3)
+    for user_id in range(5):
+        feed.append("created", user_id)
+
+    assert [change.seq for change in feed.since(3)] == [4, 5]
+    assert feed.since(5) == []
+    # Events 2 and 3 have been overwritten
+    assert feed.since(1) is None
+
+
+def test_feed_only_resumes_its_own_ids():
+    feed = ChangeFeed(size=10)
+    feed.append("created", 1)
+
+    assert feed.parse_event_id(feed.event_id(1)) == 1
+    assert feed.parse_event_id("other:1") is None
+    assert feed.parse_event_id(f"{feed.epoch}:7") is None
+
+
+def test_shared_feeds_resume_each_others_ids():
+    # Sequence values are drawn before commit, so they can arrive out of
+    # order; every listener gets them in the same (commit) order
+    first, second = ChangeFeed(size=10), ChangeFeed(size=10)
+    for feed in (first, second):
+        feed.share()
+    second.append("created", 1, seq=4)
+    for seq in (5, 7, 6):
+        first.append("updated", seq, seq=seq)
+        second.append("updated", seq, seq=seq)
+
+    position = first.parse_event_id(f"{SHARED_EPOCH}:5")
+    resume_id = first.since(position)[0].as_dict(first.epoch)["id"]
+
+    resumed = second.since(second.parse_event_id(resume_id))
+    assert [change.seq for change in resumed] == [6]
+    assert [
+        change.seq
+        for change in second.since(second.parse_event_id("db:5"))
+    ] == [7, 6]
+    # Another process's "nothing yet" cannot be resumed from
+    assert second.parse_event_id("db:0") is None
+
+
+def test_buffer_wrap_forgets_evicted_ids():
+    feed = ChangeFeed(size=2)
+    assert feed.parse_event_id(f"{feed.epoch}:0") == 0
+    for user_id in range(3):
+        feed.append("created", user_id)
+
+    assert feed.parse_event_id(f"{feed.epoch}:0") is None
+    assert feed.parse_event_id(f"{feed.epoch}:1") is None
+    assert feed.parse_event_id(f"{feed.epoch}:2") == 2
+    assert feed.event_id(feed.last_position) == f"{feed.epoch}:3"
+
+
+@pytest.mark.asyncio
+async def test_waiting_subscriber_is_woken_from_another_thread():
+    feed = ChangeFeed(size=10)
+    timer = threading.Timer(0.05, feed.append, ("updated", 9))
+    timer.start()
+
+    events = await feed.wait(0, timeout=5)
+
+    assert [(change.kind, change.user_id) for change in events] == [
+        ("updated", 9)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_stream_resets_unknown_ids_then_sends_events():
+    feed = ChangeFeed(size=10)
+    stream = iter_changes(feed, "stale:4")
+
+    reset = await stream.__anext__()
+    feed.append("deleted", 3)
+    message = await stream.__anext__()
+    await stream.aclose()
+
+    assert b"event: reset" in reset
+    assert message.startswith(f"id: {feed.epoch}:1\nevent: deleted".encode())
+
+
+def test_writes_are_published_on_commit(db_session, make_user):
+    start = change_feed.last_position
+
+    user = create_user(make_user("feed"), db_session)
+    update_user(user.id, UserUpdate(role=RoleEnum.admin), db_session)
+    with pytest.raises(UsernameAlreadyExists):
+        create_user(make_user("feed"), db_session)
+    delete_user(user.id, db_session)
+
+    events = change_feed.since(start)
+    assert [(change.kind, change.user_id) for change in events] == [
+        ("created", user.id),
+        ("updated", user.id),
+        ("deleted", user.id),
+    ]
+    assert events[1].user["role"] == RoleEnum.admin
+
+
+def test_rolled_back_changes_are_dropped(db_session, seed_users):
+    (user,) = seed_users(1)
+    start = change_feed.last_position
+
+    db_session.delete(db_session.get(User, user.id))
+    db_session.flush()
+    user_changes.record_change(db_session, "deleted", user.id)
+    db_session.rollback()
+    db_session.commit()
+
+    assert change_feed.since(start) == []
+
+
+def test_notify_payloads_stay_under_the_limit():
+    changes = [(seq, "updated", seq) for seq in range(2000)]
+
+    payloads = _notify_payloads(changes)
+
+    assert len(payloads) > 1
+    assert all(len(payload) <= NOTIFY_PAYLOAD_LIMIT for payload in payloads)
+    decoded = [
+        change for payload in payloads for change in orjson.loads(payload)
+    ]
+    assert [change[0] for change in decoded] == list(range(2000))
+
+
+def test_listener_loads_the_notified_rows(
+    sqlite_engine, db_session, seed_users
+):
+    first, second = seed_users(2)
+    feed = ChangeFeed(size=10)
+    listener = ChangeListener(sqlite_engine, feed)
+
+    listener.deliver(
+        [
+            [12, "updated", first.id],
+            [11, "created", second.id],
+            [13, "deleted", 99],
+            # Deleted again before the notification arrived
+            [14, "created", 98],
+        ]
+    )
+
+    events = feed.since(0)
+    assert feed.epoch == SHARED_EPOCH
+    assert [change.seq for change in events] == [12, 11, 13, 14]
+    assert events[0].user["username"] == first.username
+    assert events[1].user["id"] == second.id
+    assert events[2].user is None and events[3].user is None
+
+
+def test_listener_counts_and_escalates_connection_errors(
+    sqlite_engine, monkeypatch, caplog
+):
+    feed = ChangeFeed(size=10)
+    listener = ChangeListener(sqlite_engine, feed)
+    attempts = []
+
+    def lost_connection():
+        attempts.append(1)
+        if len(attempts) == 4:
+            listener._stopping.set()
+        raise sqlite3.OperationalError("server closed the connection")
+
+    monkeypatch.setattr(listener, "_listen", lost_connection)
+    monkeypatch.setattr(listener._stopping, "wait", lambda timeout: None)
+
+    listener._run()
+
+    assert feed.listener_errors == 4
+    assert feed.snapshot()["listener_errors"] == 4
+    levels = [record.levelname for record in caplog.records]
+    assert levels == ["WARNING", "WARNING", "ERROR", "ERROR"]
+
+
+def test_listener_stops_on_unexpected_errors(sqlite_engine, monkeypatch):
+    listener = ChangeListener(sqlite_engine, ChangeFeed(size=10))
+
+    def broken():
+        raise KeyError("payload")
+
+    monkeypatch.setattr(listener, "_listen", broken)
+
+    with pytest.raises(KeyError):
+        listener._run()
+    assert listener.feed.listener_errors == 0
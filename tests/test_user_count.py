@@ -0,0 +1,75 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.schemas.common import TotalMode
+from app.services import user_count
+from app.services.user_count import TotalCountCache, count_users
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    cache = TotalCountCache(ttl=60)
+    monkeypatch.setattr(user_count, "total_count_cache", cache)
+    return cache
+
+
+def test_count_users_exact(db_session, seed_users):
+    seed_users(3)
+
+    assert count_users(db_session) == (3, True)
+
+
+def test_count_users_cached_serves_recent_total(
+    db_session, seed_users, fresh_cache
+):
+    seed_users(3)
+
+    assert count_users(db_session, TotalMode.cached) == (3, True)
+    db_session.exec = MagicMock()
+
+    assert count_users(db_session, TotalMode.cached) == (3, False)
+    db_session.exec.assert_not_called()
+
+
+def test_count_cache_invalidate_and_expiry(monkeypatch):
+    cache = TotalCountCache(ttl=10)
+    clock = [100.0]
+    monkeypatch.setattr(
+        user_count.time, "monotonic", lambda: clock[0]
+    )
+
+    cache.set(42)
+    assert cache.get() == 42
+    clock[0] += 11
+    assert cache.get() is None
+
+    cache.set(42)
+    cache.invalidate()
+    assert cache.get() is None
+
+
+def test_count_users_estimate_falls_back_off_postgres(
+    db_session, seed_users
+):
+    seed_users(2)
+
+    assert count_users(db_session, TotalMode.estimate) == (2, True)
+
+
+def test_count_users_estimate_uses_planner_stats():
+    session = MagicMock()
+    session.get_bind.return_value.dialect.name = "postgresql"
+    session.execute.return_value.scalar.return_value = 1_000_000
+
+    assert count_users(session, TotalMode.estimate) == (1_000_000, False)
+    session.exec.assert_not_called()
+
+
+def test_count_users_estimate_unanalyzed_table_counts():
+    session = MagicMock()
+    session.get_bind.return_value.dialect.name = "postgresql"
+    session.execute.return_value.scalar.return_value = -1
+    session.exec.return_value.one.return_value = 7
+
+    assert count_users(session, TotalMode.estimate) == (7, True)
@@ -0,0 +1,59 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime
+
+from app.models.user import RoleEnum
+from app.schemas.users import ExportFormat
+from app.services.user_export import (
+    EXPORT_COLUMNS,
+    export_statement,
+    gzip_chunks,
+    iter_export,
+)
+
+
+def test_export_ndjson_streams_every_user(
+    sqlite_engine, seed_users, monkeypatch
+):
+    seed_users(5)
+    statement = export_statement().execution_options(yield_per=2)
+
+    chunks = list(iter_export(sqlite_engine, statement, ExportFormat.ndjson))
+    lines = b"".join(chunks).decode().splitlines()
+
+    # Header chunk plus one chunk per yield_per batch
+    assert len(chunks) == 1 + 3
+    assert [json.loads(line)["id"] for line in lines] == [1, 2, 3, 4, 5]
+    assert list(json.loads(lines[0])) == EXPORT_COLUMNS
+
+
+def test_export_csv_applies_filters(sqlite_engine, seed_users):
+    users = seed_users(6)
+    statement = export_statement(
+        role=RoleEnum.user, active=True, since=users[4].updated_at
+    )
+
+    body = b"".join(iter_export(sqlite_engine, statement, ExportFormat.csv))
+    rows = list(csv.reader(io.StringIO(body.decode())))
+
+    assert rows[0] == EXPORT_COLUMNS
+    assert [row[0] for row in rows[1:]] == ["5", "6"]
+
+
+def test_export_since_without_matches(sqlite_engine, seed_users):
+    seed_users(2)
+    statement = export_statement(since=datetime(2100, 1, 1))
+
+    body = b"".join(iter_export(sqlite_engine, statement, ExportFormat.ndjson))
+
+    assert body == b""
+
+
+def test_gzip_chunks_round_trip():
+    chunks = [b"first\n", b"", b"second\n"]
+
+    compressed = b"".join(gzip_chunks(chunks))
+
+    assert gzip.decompress(compressed) == b"first\nsecond\n"
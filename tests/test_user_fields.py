@@ -0,0 +1,83 @@
+import pytest
+from sqlalchemy import event
+
+from app.core.responses import user_payload, users_payload
+from app.exceptions.user_exceptions import InvalidFields
+from app.schemas.users import UserSortField
+from app.services import users
+from app.services.user_fields import parse_fields
+from app.services.users import get_users_by_cursor, get_users_page
+
+
+@pytest.fixture
+def statements(sqlite_engine):
+    captured = []
+
+    @event.listens_for(sqlite_engine, "before_cursor_execute")
+    def capture(connection, cursor, statement, *args):
+        captured.append(statement)
+
+    return captured
+
+
+def test_parse_fields_keeps_userread_order():
+    assert parse_fields("role, id,username") == ("id", "username", "role")
+    assert parse_fields(None) is None
+    # Asking for every field is the same as asking for none
+    assert parse_fields(
+        "id,username,email,first_name,last_name,role,"
+        "created_at,updated_at,active"
+    ) is None
+
+
+@pytest.mark.parametrize("fields", ["id,password", "", " , "])
+def test_parse_fields_rejects_unknown_or_empty(fields):
+    with pytest.raises(InvalidFields):
+        parse_fields(fields)
+
+
+def test_users_page_selects_only_requested_columns(
+    db_session, seed_users, statements
+):
+    seed_users(3)
+    fields = ("username", "role")
+
+    rows = get_users_page(db_session, limit=2, fields=fields)
+
+    assert "first_name" not in statements[-1]
+    assert "email" not in statements[-1]
+    assert users_payload(rows, fields) == [
+        {"username": "user000", "role": "user"},
+        {"username": "user001", "role": "user"},
+    ]
+
+
+def test_cursor_pages_with_fields_keep_their_keys(db_session, seed_users):
+    seed_users(4)
+    fields = ("email",)
+
+    first, cursor, _ = get_users_by_cursor(
+        db_session, 2, None, UserSortField.created_at, fields=fields
+    )
+    rest, _, _ = get_users_by_cursor(
+        db_session, 2, cursor, UserSortField.created_at, fields=fields
+    )
+
+    assert [row.email for row in first + rest] == [
+        f"user{i:03d}@example.com" for i in range(4)
+    ]
+
+
+def test_user_by_id_with_fields_skips_cache_write(
+    db_session, seed_users, statements, monkeypatch
+):
+    (user,) = seed_users(1)
+    written = []
+    monkeypatch.setattr(users.user_cache, "set", written.append)
+
+    row = users.get_user_by_id(user.id, db_session, ("username",))
+
+    assert user_payload(row, ("username",)) == {"username": "user000"}
+    assert row.updated_at == user.updated_at
+    assert "first_name" not in statements[-1]
+    assert written == []
@@ -0,0 +1,297 @@
+from datetime import datetime
+from typing import List
+
+import pytest
+from sqlalchemy import event, text
+
+from app.database.init_db import ensure_indexes
+from app.exceptions.user_exceptions import UnsupportedUserFilter
+from app.models.user import RoleEnum, User
+from app.schemas.common import TotalMode
+from app.schemas.users import UserFilter, UserSortField
+from app.services.user_count import count_users, total_count_cache
+from app.services.user_query import filter_key, plan_user_query
+from app.services.users import get_users_by_cursor, get_users_page
+
+
+@pytest.fixture(autouse=True)
+def clear_count_cache():
+    total_count_cache.invalidate()
+    yield
+    total_count_cache.invalidate()
+
+
+@pytest.fixture
+def mixed_users(db_session, seed_users):
+    users = seed_users(6)
+    users[1].role = RoleEnum.admin
+    users[3].role = RoleEnum.admin
+    users[3].active = False
+    users[4].active = False
+    users[5].username = "Alice_Smith"
+    users[5].email = "Alice@Example.com"
+    db_session.add_all(users)
+    db_session.commit()
+    return users
+
+
+@pytest.mark.parametrize(
+    "filters, sort, index",
+    [
+        (None, UserSortField.username, "ix_user_username"),
+        (UserFilter(), UserSortField.updated_at, "ix_user_updated_at_id"),
+        (
+            UserFilter(role=RoleEnum.admin, active=True),
+            UserSortField.id,
+            "ix_user_role_active_id",
+        ),
+        (UserFilter(role=RoleEnum.admin), UserSortField.id, "ix_user_role_id"),
+        (UserFilter(active=False), UserSortField.id, "ix_user_active_id"),
+        (
+            UserFilter(updated_from=datetime(2025, 1, 1)),
+            UserSortField.updated_at,
+            "ix_user_updated_at_id",
+        ),
+        (
+            UserFilter(email_prefix="ali"),
+            UserSortField.email,
+            "ix_user_email_lower",
+        ),
+    ],
+)
+def test_plan_picks_serving_index(filters, sort, index):
+    assert plan_user_query(filters, sort) == index
+
+
+@pytest.mark.parametrize(
+    "filters, sort",
+    [
+        (UserFilter(role=RoleEnum.admin), UserSortField.created_at),
+        (
+            UserFilter(active=True, created_from=datetime(2025, 1, 1)),
+            UserSortField.created_at,
+        ),
+        (
+            UserFilter(created_to=datetime(2025, 1, 1)),
+            UserSortField.updated_at,
+        ),
+        (
+            UserFilter(username_prefix="a", email_prefix="a"),
+            UserSortField.username,
+        ),
+        (UserFilter(username_prefix="a"), UserSortField.id),
+        (UserFilter(email_prefix="a"), UserSortField.username),
+    ],
+)
+def test_plan_rejects_unindexed_combinations(filters, sort):
+    with pytest.raises(UnsupportedUserFilter):
+        plan_user_query(filters, sort)
+
+
+def test_page_filters_by_role_and_active(db_session, mixed_users):
+    users = get_users_page(
+        db_session,
+        limit=10,
+        filters=UserFilter(role=RoleEnum.admin, active=True),
+    )
+
+    assert [user.id for user in users] == [2]
+
+
+def test_page_prefix_is_case_insensitive_and_literal(
+    db_session, mixed_users
+):
+    users = get_users_page(
+        db_session,
+        limit=10,
+        sort=UserSortField.username,
+        filters=UserFilter(username_prefix="ALICE_"),
+    )
+    assert [user.username for user in users] == ["Alice_Smith"]
+
+    # "_" is not a LIKE wildcard here
+    assert get_users_page(
+        db_session,
+        limit=10,
+        sort=UserSortField.username,
+        filters=UserFilter(username_prefix="user_"),
+    ) == []
+
+
+def test_cursor_walks_prefix_matches_case_insensitively(
+    db_session, seed_users
+):
+    users = seed_users(4)
+    users[1].username = "USER005"
+    db_session.add(users[1])
+    db_session.commit()
+    filters = UserFilter(username_prefix="user00")
+
+    first, cursor, _ = get_users_by_cursor(
+        db_session, 2, None, UserSortField.username, filters
+    )
+    rest, next_cursor, _ = get_users_by_cursor(
+        db_session, 2, cursor, UserSortField.username, filters
+    )
+
+    assert [user.username for user in first + rest] == [
+        "user000",
+        "user002",
+        "user003",
+        "USER005",
+    ]
+    assert next_cursor is None
+
+
+def test_page_orders_by_sort_key(db_session, mixed_users):
+    users = get_users_page(db_session, limit=10, sort=UserSortField.username)
+
+    assert [user.username for user in users] == sorted(
+        user.username for user in mixed_users
+    )
+
+
+def test_cursor_walks_updated_range(db_session, seed_users):
+    seed_users(10)
+    filters = UserFilter(
+        updated_from=datetime(2025, 1, 1, 0, 1),
+        updated_to=datetime(2025, 1, 1, 0, 4),
+    )
+
+    first, cursor, _ = get_users_by_cursor(
+        db_session, 4, None, UserSortField.updated_at, filters
+    )
+    rest, next_cursor, _ = get_users_by_cursor(
+        db_session, 4, cursor, UserSortField.updated_at, filters
+    )
+
+    assert [user.id for user in first + rest] == [3, 4, 5, 6, 7, 8]
+    assert next_cursor is None
+
+
+def test_count_users_applies_filters(db_session, mixed_users):
+    filters = UserFilter(active=False)
+
+    assert count_users(db_session, filters=filters) == (2, True)
+    assert count_users(db_session, TotalMode.estimate, filters) == (2, True)
+
+
+def test_cached_counts_are_keyed_by_filter(db_session, mixed_users):
+    admins = UserFilter(role=RoleEnum.admin)
+
+    assert count_users(db_session, TotalMode.cached, admins) == (2, True)
+    assert count_users(db_session, TotalMode.cached) == (6, True)
+    assert count_users(db_session, TotalMode.cached, admins) == (2, False)
+    assert filter_key(admins) == "role=admin"
+    assert filter_key(UserFilter()) == "all"
+
+
+def test_user_table_has_filter_indexes():
+    names = {index.name for index in User.__table__.indexes}
+
+    assert {
+        "ix_user_role_id",
+        "ix_user_role_active_id",
+        "ix_user_active_id",
+        "ix_user_username_lower",
+        "ix_user_email_lower",
+    } <= names
+
+
+def test_ensure_indexes_adds_them_to_an_existing_table(sqlite_engine):
+    # A table created before the indexes were added to the model
+    dropped = ["ix_user_role_id", "ix_user_username_lower"]
+    with sqlite_engine.begin() as connection:
+        for name in dropped:
+            connection.execute(text(f"DROP INDEX {name}"))
+
+    ensure_indexes(sqlite_engine)
+    # Nothing left to do the second time
+    ensure_indexes(sqlite_engine)
+
+    with sqlite_engine.connect() as connection:
+        names = set(
+            connection.execute(
+                text("SELECT name FROM sqlite_master WHERE type = 'index'")
+            ).scalars()
+        )
+    assert {index.name for index in User.__table__.indexes} <= names
+
+
+def _query_plans(db_session, run) -> List[str]:
+    """SQLite's plan for every list query ``run`` executes."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, *args):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        run()
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    connection = db_session.connection().connection
+    return [
+        " / ".join(
+            row[-1]
+            for row in connection.execute(
+                "EXPLAIN QUERY PLAN " + statement, parameters
+            )
+        )
+        for statement, parameters in statements
+    ]
+
+
+@pytest.mark.parametrize(
+    "filters, sort",
+    [
+        (None, UserSortField.id),
+        (None, UserSortField.username),
+        (None, UserSortField.email),
+        (None, UserSortField.created_at),
+        (None, UserSortField.updated_at),
+        (UserFilter(role=RoleEnum.admin), UserSortField.id),
+        (UserFilter(role=RoleEnum.admin, active=True), UserSortField.id),
+        (UserFilter(active=False), UserSortField.id),
+        (
+            UserFilter(
+                created_from=datetime(2025, 1, 1),
+                created_to=datetime(2025, 1, 2),
+            ),
+            UserSortField.created_at,
+        ),
+        (
+            UserFilter(updated_from=datetime(2025, 1, 1)),
+            UserSortField.updated_at,
+        ),
+        (UserFilter(username_prefix="User0"), UserSortField.username),
+        (UserFilter(email_prefix="user0"), UserSortField.email),
+    ],
+)
+def test_planned_queries_use_their_index_in_order(
+    db_session, mixed_users, filters, sort
+):
+    index = plan_user_query(filters, sort)
+
+    def run():
+        _, cursor, _ = get_users_by_cursor(db_session, 2, None, sort, filters)
+        get_users_by_cursor(db_session, 2, cursor, sort, filters)
+        get_users_page(db_session, 2, 2, sort, filters)
+
+    plans = _query_plans(db_session, run)
+
+    assert len(plans) == 3
+    for plan in plans:
+        # Sorting the matches would need a temporary B-tree
+        assert "TEMP B-TREE" not in plan
+        if filters is not None:
+            # Seeks the matches instead of walking the whole index
+            assert plan.startswith("SEARCH user")
+        if index == "user_pkey":
+            assert plan.startswith(("SCAN user", "SEARCH user"))
+        else:
+            assert f"USING INDEX {index} " in plan + " " or (
+                f"USING COVERING INDEX {index}" in plan
+            )
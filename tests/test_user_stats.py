@@ -0,0 +1,186 @@
+from datetime import date, timedelta
+
+from sqlalchemy import event, func
+from sqlmodel import select
+
+from app.models.user import RoleEnum
+from app.models.user_stats import UserStat, UserStatDelta
+from app.schemas.users import (
+    UserBulkDelete,
+    UserBulkUpdate,
+    UserFilter,
+    UserUpdate,
+)
+from app.services.user_bulk import (
+    create_users_bulk,
+    delete_users_bulk,
+    update_users_bulk,
+)
+from app.services.user_stats import (
+    StatsFolder,
+    fold_user_stats,
+    get_user_stats,
+    reconcile_user_stats,
+)
+from app.services.users import create_user, delete_user, update_user
+
+
+def test_writes_keep_the_counters_in_step(
+    db_session, sqlite_engine, make_user
+):
+    admin = create_user(make_user("admin1", role=RoleEnum.admin), db_session)
+    guest = create_user(make_user("guest1", role=RoleEnum.guest), db_session)
+    create_user(make_user("user1"), db_session)
+
+    update_user(guest.id, UserUpdate(role=RoleEnum.user), db_session)
+    update_user(admin.id, UserUpdate(active=False), db_session)
+    update_user(admin.id, UserUpdate(first_name="Renamed"), db_session)
+    delete_user(guest.id, db_session)
+
+    stats = get_user_stats(db_session, days=30)
+    assert stats.total == 2
+    assert stats.by_role == {"admin": 1, "user": 1, "guest": 0}
+    assert stats.by_active == {"active": 1, "inactive": 1}
+    assert stats.created_per_day == {date.today().isoformat(): 2}
+    # Nothing for the recount to correct
+    assert reconcile_user_stats(sqlite_engine) == 0
+
+
+def test_bulk_writes_keep_the_counters_in_step(
+    db_session, sqlite_engine, make_user
+):
+    results = create_users_bulk(
+        [(i, make_user(f"bulk{i}", role=RoleEnum.guest)) for i in range(6)],
+        db_session,
+    )
+    ids = [result.id for result in results]
+
+    update_users_bulk(
+        UserBulkUpdate(ids=ids[:3], changes=UserUpdate(role=RoleEnum.admin)),
+        db_session,
+        chunk_size=2,
+    )
+    delete_users_bulk(
+        UserBulkDelete(filter=UserFilter(role=RoleEnum.admin), soft=True),
+        db_session,
+        chunk_size=2,
+    )
+    delete_users_bulk(UserBulkDelete(ids=ids[4:]), db_session, chunk_size=2)
+
+    stats = get_user_stats(db_session, days=30)
+    assert stats.total == 4
+    assert stats.by_role == {"admin": 3, "user": 0, "guest": 1}
+    assert stats.by_active == {"active": 1, "inactive": 3}
+    assert reconcile_user_stats(sqlite_engine) == 0
+
+
+def test_reconcile_counts_rows_written_outside_the_services(
+    db_session, sqlite_engine, seed_users
+):
+    seed_users(5)
+    assert get_user_stats(db_session, days=30).total == 0
+
+    assert reconcile_user_stats(sqlite_engine) > 0
+
+    stats = get_user_stats(db_session, days=1000)
+    assert stats.total == 5
+    assert stats.by_role["user"] == 5
+    assert stats.by_active == {"active": 5, "inactive": 0}
+    assert stats.created_per_day == {"2025-01-01": 5}
+
+
+def test_created_per_day_is_limited_to_recent_days(
+    db_session, sqlite_engine, seed_users, make_user
+):
+    seed_users(2)
+    reconcile_user_stats(sqlite_engine)
+    create_user(make_user("today"), db_session)
+
+    stats = get_user_stats(db_session, days=7)
+    assert stats.total == 3
+    assert stats.created_per_day == {date.today().isoformat(): 1}
+    since = date.today() - date(2025, 1, 1) + timedelta(days=1)
+    assert "2025-01-01" in get_user_stats(
+        db_session, days=since.days
+    ).created_per_day
+
+
+def test_reading_stats_never_touches_the_user_table(db_session, make_user):
+    create_user(make_user("reader"), db_session)
+    statements = []
+    event.listen(
+        db_session.get_bind(),
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+
+    get_user_stats(db_session, days=30)
+
+    assert len(statements) == 1
+    assert "user_stats" in statements[0]
+    assert 'FROM "user"' not in statements[0]
+
+
+def _journal_size(session):
+    return session.execute(
+        select(func.count()).select_from(UserStatDelta)
+    ).scalar()
+
+
+def test_folding_moves_the_journal_into_the_counters(db_session, make_user):
+    for i in range(3):
+        create_user(make_user(f"fold{i}", role=RoleEnum.guest), db_session)
+    before = get_user_stats(db_session, days=30)
+    assert _journal_size(db_session) == 9
+
+    # Two rows per transaction: the first batches leave the rest pending
+    assert fold_user_stats(db_session, 2) == 2
+    assert get_user_stats(db_session, days=30) == before
+    folder = StatsFolder(lambda: db_session, interval=0, batch_size=2)
+    assert folder.run_once() == 7
+
+    assert _journal_size(db_session) == 0
+    assert get_user_stats(db_session, days=30) == before
+    counters = {
+        (stat.dimension, stat.bucket): stat.count
+        for stat in db_session.exec(select(UserStat))
+    }
+    assert counters[("role", "guest")] == 3
+    assert folder.snapshot()["folded"] == 7
+
+
+def test_writes_only_insert_into_the_journal(db_session, make_user):
+    user = create_user(make_user("mover"), db_session)
+    statements = []
+    event.listen(
+        db_session.get_bind(),
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+
+    # A change that leaves the counters alone journals nothing
+    update_user(user.id, UserUpdate(first_name="Same"), db_session)
+    assert not any("user_stats" in statement for statement in statements)
+
+    statements.clear()
+    update_user(user.id, UserUpdate(role=RoleEnum.admin), db_session)
+    stats_writes = [
+        statement for statement in statements if "user_stats" in statement
+    ]
+    assert stats_writes
+    assert all(
+        statement.startswith("INSERT INTO user_stats_journal")
+        for statement in stats_writes
+    )
+
+
+def test_reconcile_journals_corrections_without_touching_counters(
+    db_session, sqlite_engine, seed_users
+):
+    seed_users(2)
+    reconcile_user_stats(sqlite_engine)
+
+    assert db_session.exec(select(UserStat)).all() == []
+    assert _journal_size(db_session) > 0
+    # A second run finds the corrections already journaled
+    assert reconcile_user_stats(sqlite_engine) == 0
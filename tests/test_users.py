@@ -2,6 +2,9 @@ from datetime import datetime
 from unittest.mock import MagicMock
 
 import pytest
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError
 
 from app.exceptions.user_exceptions import (
     EmailAlreadyExists,
@@ -11,10 +14,12 @@ from app.exceptions.user_exceptions import (
 )
 from app.models.user import RoleEnum, User
 from app.schemas.users import UserCreate, UserUpdate
+from app.services import users as user_services
 from app.services.users import (
     create_user,
     delete_user,
     get_user_by_id,
+    get_users_by_ids,
     get_users_paginated,
     update_user,
 )
@@ -22,7 +27,9 @@ from app.services.users import (
 
 @pytest.fixture
 def mock_session(monkeypatch):
-    session = MagicMock()
+    # Stats upkeep has its own statements, covered in test_user_stats.py
+    monkeypatch.setattr(user_services, "record_stats", MagicMock())
+    session = MagicMock(info={})
     monkeypatch.setattr(session, "exec", MagicMock())
     monkeypatch.setattr(session, "get", MagicMock())
     monkeypatch.setattr(session, "add", MagicMock())
@@ -61,17 +68,19 @@ def existing_user_data():
 def test_create_user_success(
     mock_session, sample_user_create_data, monkeypatch
 ):
-    mock_exec_result = MagicMock()
-    mock_exec_result.first.return_value = None
+    def execute_side_effect(statement):
+        params = statement.compile().params
+        row = {**params, "id": 1}
+        result = MagicMock()
+        result.mappings.return_value.first.return_value = row
+        return result
+
     monkeypatch.setattr(
-        mock_session, "exec", MagicMock(return_value=mock_exec_result)
+        mock_session,
+        "execute",
+        MagicMock(side_effect=execute_side_effect),
     )
 
-    def refresh_side_effect(user_obj):
-        user_obj.id = 1
-
-    mock_session.refresh.side_effect = refresh_side_effect
-
     created_user = create_user(sample_user_create_data, mock_session)
 
     assert created_user is not None
@@ -87,55 +96,110 @@ def test_create_user_success(
     assert isinstance(created_user.created_at, datetime)
     assert isinstance(created_user.updated_at, datetime)
 
-    assert mock_session.exec.call_count == 2
-    mock_session.add.assert_called_once()
+    mock_session.execute.assert_called_once()
     mock_session.commit.assert_called_once()
-    mock_session.refresh.assert_called_once()
-    mock_session.refresh.assert_called_once_with(created_user)
+    mock_session.exec.assert_not_called()
+    mock_session.add.assert_not_called()
+    mock_session.refresh.assert_not_called()
+
+
+def integrity_error(detail):
+    return IntegrityError("INSERT INTO user ...", {}, Exception(detail))
 
 
 def test_create_user_username_exists(
     mock_session,
     sample_user_create_data,
-    existing_user_data,
     monkeypatch,
 ):
-    mock_exec_result = MagicMock()
-    mock_exec_result.first.return_value = existing_user_data
     monkeypatch.setattr(
-        mock_session, "exec", MagicMock(return_value=mock_exec_result)
+        mock_session,
+        "execute",
+        MagicMock(
+            side_effect=integrity_error(
+                "UNIQUE constraint failed: user.username"
+            )
+        ),
     )
 
     with pytest.raises(UsernameAlreadyExists):
         create_user(sample_user_create_data, mock_session)
 
+    mock_session.execute.assert_called_once()
+    mock_session.rollback.assert_called_once()
     mock_session.exec.assert_called_once()
-    mock_session.add.assert_not_called()
     mock_session.commit.assert_not_called()
-    mock_session.refresh.assert_not_called()
 
 
 def test_create_user_email_exists(
     mock_session,
     sample_user_create_data,
-    existing_user_data,
+    monkeypatch,
 ):
-    mock_exec_username_check = MagicMock()
-    mock_exec_username_check.first.return_value = None
-    mock_exec_email_check = MagicMock()
-    mock_exec_email_check.first.return_value = existing_user_data
-    mock_session.exec.side_effect = [
-        mock_exec_username_check,
-        mock_exec_email_check,
+    monkeypatch.setattr(
+        mock_session,
+        "execute",
+        MagicMock(
+            side_effect=integrity_error(
+                'duplicate key value violates unique constraint "ix_user_email"'
+            )
+        ),
+    )
+
+    with pytest.raises(EmailAlreadyExists):
+        create_user(sample_user_create_data, mock_session)
+
+    mock_session.execute.assert_called_once()
+    mock_session.exec.assert_called_once()
+    mock_session.commit.assert_not_called()
+
+
+def test_create_user_reraises_other_integrity_errors(
+    mock_session,
+    sample_user_create_data,
+    monkeypatch,
+):
+    error = integrity_error("NOT NULL constraint failed: user.first_name")
+    monkeypatch.setattr(
+        mock_session, "execute", MagicMock(side_effect=error)
+    )
+
+    with pytest.raises(IntegrityError):
+        create_user(sample_user_create_data, mock_session)
+
+    mock_session.rollback.assert_called_once()
+    # Not a conflict, so no lookup of the taken keys either
+    mock_session.exec.assert_not_called()
+
+
+def test_create_user_on_conflict_do_nothing_looks_up_conflict(
+    mock_session,
+    sample_user_create_data,
+    monkeypatch,
+):
+    mock_session.get_bind.return_value.dialect.name = "postgresql"
+    insert_result = MagicMock()
+    insert_result.mappings.return_value.first.return_value = None
+    monkeypatch.setattr(
+        mock_session, "execute", MagicMock(return_value=insert_result)
+    )
+    lookup_result = MagicMock()
+    lookup_result.all.return_value = [
+        ("someoneelse", sample_user_create_data.email)
     ]
+    monkeypatch.setattr(
+        mock_session, "exec", MagicMock(return_value=lookup_result)
+    )
 
     with pytest.raises(EmailAlreadyExists):
         create_user(sample_user_create_data, mock_session)
 
-    assert mock_session.exec.call_count == 2
-    mock_session.add.assert_not_called()
+    statement = mock_session.execute.call_args.args[0]
+    assert "ON CONFLICT DO NOTHING" in str(
+        statement.compile(dialect=postgresql.dialect())
+    )
+    mock_session.exec.assert_called_once()
     mock_session.commit.assert_not_called()
-    mock_session.refresh.assert_not_called()
 
 
 def test_get_user_by_id_success(
@@ -219,6 +283,15 @@ def test_get_users_paginated_success(mock_session, monkeypatch):
     assert mock_session.exec.call_count == 2
 
 
+def returning_result(row):
+    result = MagicMock()
+    result.mappings.return_value.first.return_value = row
+    result.mappings.return_value.all.return_value = [row] if row else []
+    result.scalar.return_value = row["id"] if row else None
+    result.first.return_value = User(**row) if row else None
+    return result
+
+
 def test_update_user_success(
     mock_session, existing_user_data, monkeypatch
 ):
@@ -229,92 +302,93 @@ def test_update_user_success(
         role=RoleEnum.user,
         active=False,
     )
-
-    mock_user_instance = MagicMock(spec=User)
-    mock_user_instance.id = existing_user_data.id
-    mock_user_instance.first_name = existing_user_data.first_name
-    mock_user_instance.last_name = existing_user_data.last_name
-    mock_user_instance.role = existing_user_data.role
-    mock_user_instance.active = existing_user_data.active
-
+    updated_row = {
+        **existing_user_data.model_dump(),
+        **update_payload.model_dump(),
+        "updated_at": datetime.now(),
+        # Role and active change, so the update returns the old values
+        "old_role": existing_user_data.role,
+        "old_active": existing_user_data.active,
+    }
+    mock_session.get_bind.return_value.dialect.name = "postgresql"
     monkeypatch.setattr(
         mock_session,
-        "get",
-        MagicMock(return_value=mock_user_instance),
+        "execute",
+        MagicMock(return_value=returning_result(updated_row)),
     )
 
     updated_user = update_user(user_id, update_payload, mock_session)
 
-    assert updated_user == mock_user_instance
-    assert mock_user_instance.first_name == update_payload.first_name
-    assert mock_user_instance.last_name == update_payload.last_name
-    assert mock_user_instance.role == update_payload.role
-    assert hasattr(mock_user_instance, "updated_at")
-    assert isinstance(mock_user_instance.updated_at, datetime)
-
-    mock_session.get.assert_called_once_with(User, user_id)
-    mock_session.add.assert_called_once_with(mock_user_instance)
+    assert updated_user.id == user_id
+    assert updated_user.first_name == update_payload.first_name
+    assert updated_user.last_name == update_payload.last_name
+    assert updated_user.role == update_payload.role
+    assert updated_user.active is False
+    assert isinstance(updated_user.updated_at, datetime)
+
+    statement = mock_session.execute.call_args.args[0]
+    params = statement.compile().params
+    assert params["first_name"] == update_payload.first_name
+    assert params["active"] is False
+    assert isinstance(params["updated_at"], datetime)
+    mock_session.execute.assert_called_once()
+    user_services.record_stats.assert_called_once()
     mock_session.commit.assert_called_once()
-    mock_session.refresh.assert_called_once_with(mock_user_instance)
+    mock_session.get.assert_not_called()
+    mock_session.refresh.assert_not_called()
 
 
 def test_update_user_not_found(mock_session, monkeypatch):
     user_id = 999
     update_payload = UserUpdate(first_name="newname")
     monkeypatch.setattr(
-        mock_session, "get", MagicMock(return_value=None)
+        mock_session,
+        "execute",
+        MagicMock(return_value=returning_result(None)),
     )
 
     with pytest.raises(UserNotFound) as excinfo:
         update_user(user_id, update_payload, mock_session)
 
     assert str(user_id) in str(excinfo.value)
-    mock_session.get.assert_called_once_with(User, user_id)
-    mock_session.add.assert_not_called()
+    mock_session.execute.assert_called_once()
     mock_session.commit.assert_not_called()
     mock_session.refresh.assert_not_called()
 
 
 def test_update_user_no_fields_to_update(
-    mock_session, existing_user_data, monkeypatch
+    mock_session, existing_user_data
 ):
     user_id = existing_user_data.id
     update_payload = UserUpdate()
 
-    mock_user_instance = MagicMock(
-        spec=User, id=existing_user_data.id
-    )
-    monkeypatch.setattr(
-        mock_session,
-        "get",
-        MagicMock(return_value=mock_user_instance),
-    )
-
     with pytest.raises(NoFieldsToUpdate):
         update_user(user_id, update_payload, mock_session)
 
-    mock_session.get.assert_called_once_with(User, user_id)
-    mock_session.add.assert_not_called()
+    mock_session.execute.assert_not_called()
+    mock_session.get.assert_not_called()
     mock_session.commit.assert_not_called()
-    mock_session.refresh.assert_not_called()
 
 
 def test_delete_user_success(
     mock_session, existing_user_data, monkeypatch
 ):
     user_id = existing_user_data.id
-
     monkeypatch.setattr(
         mock_session,
-        "get",
-        MagicMock(return_value=existing_user_data),
+        "execute",
+        MagicMock(
+            return_value=returning_result(existing_user_data.model_dump())
+        ),
     )
+
     result = delete_user(user_id, mock_session)
 
     assert result is None
 
-    mock_session.get.assert_called_once_with(User, user_id)
-    mock_session.delete.assert_called_once_with(existing_user_data)
+    mock_session.execute.assert_called_once()
+    mock_session.get.assert_not_called()
+    mock_session.delete.assert_not_called()
     mock_session.commit.assert_called_once()
 
 
@@ -322,7 +396,9 @@ def test_delete_user_not_found(mock_session, monkeypatch):
     user_id = 999  # An ID that we expect not to exist
 
     monkeypatch.setattr(
-        mock_session, "get", MagicMock(return_value=None)
+        mock_session,
+        "execute",
+        MagicMock(return_value=returning_result(None)),
     )
 
     with pytest.raises(UserNotFound) as excinfo:
@@ -330,6 +406,23 @@ def test_delete_user_not_found(mock_session, monkeypatch):
 
     assert str(user_id) in str(excinfo.value)
 
-    mock_session.get.assert_called_once_with(User, user_id)
-    mock_session.delete.assert_not_called()
+    mock_session.execute.assert_called_once()
     mock_session.commit.assert_not_called()
+
+
+def test_get_users_by_ids_uses_one_in_query(db_session, seed_users):
+    seed_users(4)
+    statements = []
+    event.listen(
+        db_session.get_bind(),
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+
+    found = get_users_by_ids([3, 99, 1], db_session)
+
+    assert list(found) == [3, 99, 1]
+    assert found[3].username == "user002"
+    assert found[99] is None
+    assert len(statements) == 1
+    assert " IN " in statements[0]
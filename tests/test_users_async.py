@@ -0,0 +1,80 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.database.database import to_async_url
+from app.exceptions.user_exceptions import (
+    UsernameAlreadyExists,
+    UserNotFound,
+)
+from app.schemas.users import UserUpdate
+from app.services.users_async import (
+    count_users,
+    create_user,
+    delete_user,
+    get_user_by_id,
+    get_users_by_cursor,
+    update_user,
+)
+
+
+@pytest_asyncio.fixture
+async def async_session():
+    engine = create_async_engine(
+        "sqlite+aiosqlite://", poolclass=StaticPool
+    )
+    async with engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        yield session
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_async_crud_round_trip(async_session, make_user):
+    created = await create_user(make_user("async1"), async_session)
+    fetched = await get_user_by_id(created.id, async_session)
+    updated = await update_user(
+        created.id, UserUpdate(active=False), async_session
+    )
+    await delete_user(created.id, async_session)
+
+    assert fetched.username == "async1"
+    assert updated.active is False
+    with pytest.raises(UserNotFound):
+        await get_user_by_id(created.id, async_session)
+
+
+@pytest.mark.asyncio
+async def test_async_create_user_conflict(async_session, make_user):
+    await create_user(make_user("async1"), async_session)
+
+    with pytest.raises(UsernameAlreadyExists):
+        await create_user(make_user("async1"), async_session)
+
+
+@pytest.mark.asyncio
+async def test_async_cursor_pagination_and_count(async_session, make_user):
+    for i in range(3):
+        await create_user(make_user(f"async{i}"), async_session)
+
+    users, next_cursor, _ = await get_users_by_cursor(async_session, 2)
+    rest, last_cursor, _ = await get_users_by_cursor(
+        async_session, 2, next_cursor
+    )
+
+    assert [user.id for user in users + rest] == [1, 2, 3]
+    assert last_cursor is None
+    assert await count_users(async_session) == (3, True)
+
+
+def test_to_async_url_swaps_driver():
+    assert to_async_url("sqlite:///./local.db") == (
+        "sqlite+aiosqlite:///./local.db"
+    )
+    assert to_async_url(
+        "postgresql+psycopg2://app:secret@/?host=/cloudsql/x&database=db"
+    ).startswith("postgresql+asyncpg://app:secret@/")